@@ -0,0 +1,9 @@
+"""`python -m backend`: run the API with several worker processes (see serve.py)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from serve import main  # noqa: E402
+
+main()
@@ -0,0 +1,109 @@
+"""Rebuild `booking_slots.remaining` from the bookings already stored.
+
+Slot documents are created lazily by the first reservation, so bookings
+stored before slot capacity was tracked are not counted against it. Run
+from the backend directory, once per environment after deploying:
+
+    python backfill_booking_slots.py [--dry-run]
+
+Every upcoming date and time slot that has bookings gets `remaining` set to
+its capacity less those bookings. Each update matches the value it read, so
+a reservation made while the backfill runs is never overwritten; such slots
+are reported and a re-run picks them up. Re-running is safe.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+from server import BOOKING_CREWS_PER_SLOT, BOOKING_TIME_SLOTS, business_today
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("backfill_booking_slots")
+
+
+def is_valid_date(value) -> bool:
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+async def count_bookings(db, today: date) -> dict:
+    """(date, time) -> bookings stored for that upcoming slot"""
+    pipeline = [
+        {"$match": {"preferred_date": {"$gte": today.isoformat()}, "preferred_time": {"$in": BOOKING_TIME_SLOTS}}},
+        {"$group": {"_id": {"date": "$preferred_date", "time": "$preferred_time"}, "booked": {"$sum": 1}}},
+    ]
+    counts = {}
+    async for row in db.bookings.aggregate(pipeline):
+        if is_valid_date(row["_id"]["date"]):
+            counts[(row["_id"]["date"], row["_id"]["time"])] = row["booked"]
+    return counts
+
+
+async def backfill(db, today: date = None, dry_run: bool = False) -> dict:
+    """Returns counts of slots updated, created, already correct and skipped for a re-run"""
+    today = today or business_today()
+    totals = {"updated": 0, "created": 0, "unchanged": 0, "skipped": 0}
+    for (day, slot), booked in sorted((await count_bookings(db, today)).items()):
+        key = {"date": day, "time": slot}
+        existing = await db.booking_slots.find_one(key, {"_id": 0, "capacity": 1, "remaining": 1})
+        capacity = existing.get("capacity", BOOKING_CREWS_PER_SLOT) if existing else BOOKING_CREWS_PER_SLOT
+        remaining = capacity - booked
+        if remaining < 0:
+            logger.warning(f"{day} {slot}: {booked} bookings exceed capacity {capacity}")
+
+        if existing is None:
+            if not dry_run:
+                try:
+                    await db.booking_slots.insert_one({**key, "capacity": capacity, "remaining": remaining})
+                except DuplicateKeyError:
+                    # A reservation created the slot after we looked
+                    logger.warning(f"{day} {slot}: created concurrently, re-run to recount")
+                    totals["skipped"] += 1
+                    continue
+            totals["created"] += 1
+        elif existing.get("remaining") == remaining:
+            totals["unchanged"] += 1
+        else:
+            if not dry_run:
+                result = await db.booking_slots.update_one(
+                    {**key, "remaining": existing.get("remaining")},
+                    {"$set": {"remaining": remaining, "capacity": capacity}},
+                )
+                if result.modified_count != 1:
+                    logger.warning(f"{day} {slot}: changed concurrently, re-run to recount")
+                    totals["skipped"] += 1
+                    continue
+            totals["updated"] += 1
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="report slots that would change without writing")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        totals = await backfill(client[os.environ['DB_NAME']], dry_run=args.dry_run)
+    finally:
+        client.close()
+    logger.info(
+        f"{totals['created']} slots {'would be ' if args.dry_run else ''}created, "
+        f"{totals['updated']} {'would be ' if args.dry_run else ''}updated, "
+        f"{totals['unchanged']} already correct, {totals['skipped']} changed concurrently"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
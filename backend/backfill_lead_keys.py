@@ -0,0 +1,84 @@
+"""Add the normalized `email_key` and `phone_key` to leads stored without them.
+
+Lead search looks up emails and phone numbers through these keys, which
+only leads created since duplicate suppression carry. Run from the backend
+directory, once per environment:
+
+    python backfill_lead_keys.py [--batch-size 500] [--dry-run]
+
+Only documents missing a key are touched, so the backfill can be
+interrupted and re-run safely.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from server import LEAD_COLLECTIONS, normalize_email, normalize_phone
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("backfill_lead_keys")
+
+MISSING_KEYS = {"$or": [{"email_key": {"$exists": False}}, {"phone_key": {"$exists": False}}]}
+
+
+async def backfill_collection(collection, batch_size: int = 500, dry_run: bool = False) -> int:
+    """Set missing keys in batches; returns the number of documents updated"""
+    updated = 0
+    last_id = None
+    while True:
+        query = dict(MISSING_KEYS)
+        if last_id is not None:
+            # Walk by _id so dry runs can't loop forever
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {"_id": 1, "email": 1, "phone": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        updates = [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"email_key": normalize_email(doc.get("email")), "phone_key": normalize_phone(doc.get("phone"))}},
+            )
+            for doc in batch
+        ]
+        if not dry_run:
+            result = await collection.bulk_write(updates, ordered=False)
+            updated += result.modified_count
+        else:
+            updated += len(updates)
+        logger.info(f"{collection.name}: {updated} documents keyed so far")
+    return updated
+
+
+async def backfill(db, batch_size: int = 500, dry_run: bool = False) -> dict:
+    return {
+        name: await backfill_collection(db[name], batch_size=batch_size, dry_run=dry_run)
+        for name in LEAD_COLLECTIONS.values()
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="count documents that would change without writing")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        totals = await backfill(client[os.environ['DB_NAME']], batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        client.close()
+    for name, count in totals.items():
+        logger.info(f"{name}: {count} documents {'would be ' if args.dry_run else ''}keyed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
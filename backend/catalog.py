@@ -0,0 +1,117 @@
+"""Site catalogs (services, testimonials, gallery) stored in Mongo and served from memory.
+
+Each `CatalogCache` keeps its catalog validated and encoded in process. Every
+admin write bumps a per-catalog version counter in `catalog_versions`; other
+workers compare that counter at most once per `ttl` seconds, in the
+background, and reload only when it moved. Requests themselves never wait
+on Mongo once the catalog has been loaded.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional, Type
+
+from pydantic import BaseModel
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = "catalog_versions"
+CATALOG_SORT = [("position", 1), ("id", 1)]
+
+
+class CatalogCache:
+    def __init__(self, name: str, model: Type[BaseModel], seed: List[dict], build: Callable, ttl: float = 30.0):
+        """`build` turns the validated item list into whatever the routes serve"""
+        self.name = name
+        self.model = model
+        self.seed = seed
+        self.build = build
+        self.ttl = ttl
+        self.db = None
+        self.version: Optional[int] = None
+        self.payload = None
+        self._checked_at = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.name]
+
+    @property
+    def versions(self):
+        return self.db[VERSIONS_COLLECTION]
+
+    async def ensure_seeded(self):
+        """Load the built-in items the first time this catalog is used"""
+        if await self.versions.find_one({"_id": self.name}) is not None:
+            return
+        if self.seed:
+            # $setOnInsert keeps this safe when several workers start at once
+            await self.collection.bulk_write([
+                UpdateOne({"id": item["id"]}, {"$setOnInsert": {**item, "position": position}}, upsert=True)
+                for position, item in enumerate(self.seed)
+            ], ordered=False)
+        await self.versions.update_one({"_id": self.name}, {"$setOnInsert": {"version": 1}}, upsert=True)
+
+    async def _current_version(self) -> int:
+        doc = await self.versions.find_one({"_id": self.name})
+        return doc["version"] if doc else 0
+
+    async def load(self, version: Optional[int] = None):
+        if version is None:
+            version = await self._current_version()
+        docs = await self.collection.find({}, {"_id": 0}).sort(CATALOG_SORT).to_list(None)
+        # Builders may touch the disk (image srcsets), so run them in a thread
+        self.payload = await asyncio.to_thread(self.build, [self.model(**doc).model_dump() for doc in docs])
+        self.version = version
+        self._checked_at = time.monotonic()
+
+    async def warm(self):
+        await self.ensure_seeded()
+        await self.load()
+
+    async def refresh(self):
+        """Reload if another worker changed the catalog since we loaded it"""
+        try:
+            version = await self._current_version()
+            if version != self.version:
+                await self.load(version)
+                logger.info(f"Catalog {self.name} reloaded at version {version}")
+        except Exception as e:
+            logger.warning(f"Catalog {self.name} refresh failed, serving the cached copy: {str(e)}")
+        finally:
+            self._checked_at = time.monotonic()
+
+    async def get(self):
+        if self.payload is None:
+            await self.load()
+        elif time.monotonic() - self._checked_at > self.ttl and (self._refresh is None or self._refresh.done()):
+            # Serve what we have and check the version off the request path
+            self._refresh = asyncio.create_task(self.refresh())
+        return self.payload
+
+    async def changed(self) -> int:
+        """Record an admin write: bump the shared version and reload this worker at once"""
+        doc = await self.versions.find_one_and_update(
+            {"_id": self.name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        await self.load(doc["version"])
+        return doc["version"]
+
+    async def upsert(self, item: BaseModel, position: Optional[int] = None) -> dict:
+        fields = item.model_dump()
+        update = {"$set": fields}
+        if position is not None:
+            update["$set"] = {**fields, "position": position}
+        else:
+            update["$setOnInsert"] = {"position": await self.collection.count_documents({})}
+        await self.collection.update_one({"id": fields["id"]}, update, upsert=True)
+        await self.changed()
+        return fields
+
+    async def delete(self, item_id: str) -> bool:
+        result = await self.collection.delete_one({"id": item_id})
+        if result.deleted_count:
+            await self.changed()
+        return bool(result.deleted_count)
@@ -0,0 +1,160 @@
+"""Response compression with brotli/gzip negotiation.
+
+`CompressionMiddleware` compresses text-like responses above a size
+threshold, choosing brotli when the client accepts it and the optional
+`brotli` package is installed, gzip otherwise. Streamed responses are
+compressed chunk by chunk and flushed, so NDJSON rows still arrive as they
+are produced. Responses that already carry a Content-Encoding (such as
+the precompressed catalogs) pass through untouched.
+"""
+import gzip
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best encoding we support from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, quality: Optional[int] = None) -> bytes:
+    """One-shot compression; `quality` defaults to a level suited to per-request work"""
+    if encoding == "br":
+        return brotli.compress(body, quality=4 if quality is None else quality)
+    return gzip.compress(body, compresslevel=6 if quality is None else quality, mtime=0)
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=4)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.passthrough = False
+        self.stream: Optional[StreamCompressor] = None
+
+    def _eligible(self, headers) -> bool:
+        content_type = ""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        # Event streams flush every few bytes, and some proxies hold compressed ones back
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+    def _headers(self, extra_length: Optional[int]):
+        headers = [(k, v) for k, v in self.start["headers"] if k not in (b"content-length", b"vary")]
+        vary = [v for k, v in self.start["headers"] if k == b"vary"]
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if extra_length is not None:
+            headers.append((b"content-length", str(extra_length).encode("latin-1")))
+        return {**self.start, "headers": headers}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._eligible(message.get("headers", []))
+            if self.passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None and not more_body:
+            # The whole body in one message: compress it only if it is worth it
+            if len(body) < self.minimum_size:
+                await self._send(self.start)
+                await self._send(message)
+                return
+            compressed = compress(body, self.encoding)
+            await self._send(self._headers(len(compressed)))
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.stream is None:
+            self.stream = StreamCompressor(self.encoding)
+            await self._send(self._headers(None))
+        data = self.stream.feed(body) if body else b""
+        if not more_body:
+            data += self.stream.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
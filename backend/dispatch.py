@@ -0,0 +1,214 @@
+"""Daily crew dispatch: one day's bookings turned into a route per crew and time window.
+
+Jobs are located with the offline suburb table (see suburbs.py). Every time
+window's jobs are shared between the crews by a sweep around the depot. The
+jobs are taken in the same angular order in every window, so each crew keeps
+roughly the same part of the region all day. Each crew's jobs in a window
+are ordered by nearest neighbour, starting where the crew finished the
+previous window, and the order is then improved with 2-opt.
+
+Distances are straight lines scaled by a road factor. At suburb precision
+that is good enough to group and sequence work, but not to quote drive times.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from suburbs import geocode
+
+EARTH_RADIUS_KM = 6371.0
+# Minutes on site per service, before travel
+SERVICE_MINUTES = {
+    "tree-removal": 120,
+    "tree-trimming": 90,
+    "stump-grinding": 60,
+    "emergency": 90,
+    "land-clearing": 240,
+}
+DEFAULT_SERVICE_MINUTES = 90
+WINDOW_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AP]M)\s*-\s*(\d{1,2}):(\d{2})\s*([AP]M)\s*$", re.IGNORECASE)
+
+
+def window_minutes(label: str) -> Optional[int]:
+    """Length of a "8:00 AM - 10:00 AM" slot in minutes"""
+    match = WINDOW_PATTERN.match(label or "")
+    if not match:
+        return None
+
+    def minutes(hour, minute, meridiem):
+        return (int(hour) % 12 + (12 if meridiem.upper() == "PM" else 0)) * 60 + int(minute)
+
+    return minutes(*match.group(4, 5, 6)) - minutes(*match.group(1, 2, 3))
+
+
+class Projection:
+    """Local flat projection in km; accurate to well under 1% across the region"""
+
+    def __init__(self, lat0: float):
+        self.kx = math.radians(1) * EARTH_RADIUS_KM * math.cos(math.radians(lat0))
+        self.ky = math.radians(1) * EARTH_RADIUS_KM
+
+    def __call__(self, lat: float, lon: float) -> Tuple[float, float]:
+        return lon * self.kx, lat * self.ky
+
+
+def distance_matrix(points: Sequence[Tuple[float, float]]) -> List[List[float]]:
+    return [[math.hypot(x1 - x2, y1 - y2) for x2, y2 in points] for x1, y1 in points]
+
+
+def nearest_neighbour(dist: List[List[float]], start: int, nodes: Sequence[int]) -> List[int]:
+    path = [start]
+    remaining = set(nodes)
+    while remaining:
+        row = dist[path[-1]]
+        # Ties broken by index, so equal inputs always give the same plan
+        nearest = min(remaining, key=lambda node: (row[node], node))
+        remaining.remove(nearest)
+        path.append(nearest)
+    return path
+
+
+def two_opt(path: List[int], dist: List[List[float]], max_passes: int = 100) -> List[int]:
+    """Improve an open path from a fixed start; the last stop may change"""
+    n = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 2):
+            a, b = path[i], path[i + 1]
+            for j in range(i + 2, n):
+                c = path[j]
+                if j + 1 < n:
+                    d = path[j + 1]
+                    delta = dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d]
+                else:
+                    delta = dist[a][c] - dist[a][b]
+                if delta < -1e-9:
+                    path[i + 1:j + 1] = path[j:i:-1]
+                    b = path[i + 1]
+                    improved = True
+        if not improved:
+            break
+    return path
+
+
+def path_length(path: Sequence[int], dist: List[List[float]]) -> float:
+    return sum(dist[a][b] for a, b in zip(path, path[1:]))
+
+
+def sweep_order(points: Dict[str, Tuple[float, float]], depot: Tuple[float, float]) -> Dict[str, int]:
+    """Rank of each job by angle around the depot, starting after the widest empty sector"""
+    angles = sorted(
+        (math.atan2(y - depot[1], x - depot[0]), job_id) for job_id, (x, y) in points.items()
+    )
+    if not angles:
+        return {}
+    gaps = [
+        ((angles[(i + 1) % len(angles)][0] - angles[i][0]) % (2 * math.pi), i)
+        for i in range(len(angles))
+    ]
+    if len(angles) == 1:
+        start = 0
+    else:
+        start = (max(gaps)[1] + 1) % len(angles)
+    ordered = angles[start:] + angles[:start]
+    return {job_id: rank for rank, (_, job_id) in enumerate(ordered)}
+
+
+def split(items: List, parts: int) -> List[List]:
+    """Contiguous chunks whose sizes differ by at most one"""
+    size, extra = divmod(len(items), parts)
+    chunks, start = [], 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def plan_day(
+    bookings: List[dict],
+    crews: int,
+    windows: Sequence[str],
+    depot: Tuple[float, float],
+    road_factor: float = 1.3,
+    speed_kmh: float = 45.0,
+    service_minutes: Optional[Dict[str, int]] = None,
+) -> dict:
+    """Routes for `crews` crews over one day's bookings; `depot` is (lat, lon)"""
+    service_minutes = service_minutes or SERVICE_MINUTES
+    project = Projection(depot[0])
+    depot_xy = project(*depot)
+
+    jobs, unlocated = {}, []
+    for booking in bookings:
+        location = geocode(booking.get("address"))
+        if location is None:
+            unlocated.append({"booking_id": booking["id"], "address": booking.get("address")})
+            continue
+        jobs[booking["id"]] = (booking, location, project(location.lat, location.lon))
+    rank = sweep_order({job_id: job[2] for job_id, job in jobs.items()}, depot_xy)
+
+    # Known windows in calendar order, then anything unexpected
+    by_window: Dict[str, List[str]] = {}
+    for job_id, (booking, _, _) in jobs.items():
+        by_window.setdefault(booking.get("preferred_time") or "", []).append(job_id)
+    order = [w for w in windows if w in by_window] + sorted(w for w in by_window if w not in windows)
+
+    positions = {crew: depot_xy for crew in range(1, crews + 1)}
+    routes = []
+    for window in order:
+        ranked = sorted(by_window[window], key=rank.__getitem__)
+        for crew, job_ids in zip(range(1, crews + 1), split(ranked, crews)):
+            if not job_ids:
+                continue
+            points = [positions[crew]] + [jobs[job_id][2] for job_id in job_ids]
+            dist = distance_matrix(points)
+            path = two_opt(nearest_neighbour(dist, 0, range(1, len(points))), dist)
+            stops = []
+            for previous, node in zip(path, path[1:]):
+                booking, location, _ = jobs[job_ids[node - 1]]
+                stops.append({
+                    "booking_id": booking["id"],
+                    "name": booking.get("name"),
+                    "phone": booking.get("phone"),
+                    "service": booking.get("service"),
+                    "address": booking.get("address"),
+                    "suburb": location.suburb,
+                    "postcode": location.postcode,
+                    "zone": location.zone,
+                    "lat": location.lat,
+                    "lon": location.lon,
+                    "leg_km": round(dist[previous][node] * road_factor, 2),
+                })
+            distance = path_length(path, dist) * road_factor
+            travel = distance / speed_kmh * 60
+            work = sum(service_minutes.get(stop["service"], DEFAULT_SERVICE_MINUTES) for stop in stops)
+            available = window_minutes(window)
+            routes.append({
+                "crew": crew,
+                "window": window,
+                "stops": stops,
+                "distance_km": round(distance, 2),
+                "travel_minutes": round(travel),
+                "work_minutes": work,
+                "fits_window": None if available is None else travel + work <= available,
+            })
+            positions[crew] = points[path[-1]]
+
+    crew_totals = []
+    for crew in range(1, crews + 1):
+        crew_routes = [route for route in routes if route["crew"] == crew]
+        back = math.hypot(positions[crew][0] - depot_xy[0], positions[crew][1] - depot_xy[1]) * road_factor
+        crew_totals.append({
+            "crew": crew,
+            "jobs": sum(len(route["stops"]) for route in crew_routes),
+            "distance_km": round(sum(route["distance_km"] for route in crew_routes) + back, 2),
+        })
+    routes.sort(key=lambda route: (route["crew"], order.index(route["window"])))
+    return {
+        "crews": crew_totals,
+        "routes": routes,
+        "unlocated": unlocated,
+        "jobs": len(jobs),
+        "distance_km": round(sum(total["distance_km"] for total in crew_totals), 2),
+    }
@@ -0,0 +1,124 @@
+"""Notification email rendering.
+
+The shared layout is compiled once at import. Each lead kind declares the
+fields it shows, and `render_notification` renders the HTML and plain-text
+parts of one message from the same prepared rows, for a single lead or a
+digest of many. Lead values are HTML-escaped automatically.
+"""
+from typing import List
+
+from jinja2 import Environment, StrictUndefined
+
+# kind -> (title, footer, [(label, field)])
+LEAD_KINDS = {
+    "quote": ("New Quote Request", "Lead Notification", [
+        ("Name", "name"),
+        ("Email", "email"),
+        ("Phone", "phone"),
+        ("Service", "service"),
+        ("Address", "address"),
+        ("Message", "message"),
+    ]),
+    "booking": ("New Booking Request", "Booking Notification", [
+        ("Name", "name"),
+        ("Email", "email"),
+        ("Phone", "phone"),
+        ("Service", "service"),
+        ("Address", "address"),
+        ("Preferred Date", "preferred_date"),
+        ("Preferred Time", "preferred_time"),
+        ("Notes", "notes"),
+    ]),
+    "contact": ("New Contact Message", "Contact Notification", [
+        ("Name", "name"),
+        ("Email", "email"),
+        ("Phone", "phone"),
+        ("Subject", "subject"),
+        ("Message", "message"),
+    ]),
+}
+
+DIGEST_TITLES = {
+    "quote": "New Quote Requests",
+    "booking": "New Bookings",
+    "contact": "New Contact Messages",
+}
+
+_html_env = Environment(autoescape=True, undefined=StrictUndefined, trim_blocks=True, lstrip_blocks=True)
+_text_env = Environment(autoescape=False, undefined=StrictUndefined, trim_blocks=True, lstrip_blocks=True)
+
+HTML_LAYOUT = _html_env.from_string("""\
+<html>
+<body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f0;">
+    <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-left: 4px solid #F97316;">
+        <h2 style="color: #1A3C34; margin-bottom: 20px;">{{ title }}</h2>
+        {% for lead in leads %}
+        {% if digest %}
+        <h3 style="color: #1A3C34; margin: 20px 0 10px;">{{ loop.index }}. {{ lead.heading }}</h3>
+        {% endif %}
+        {% for label, value in lead.fields %}
+        <p><strong>{{ label }}:</strong> {{ value }}</p>
+        {% endfor %}
+        {% endfor %}
+        <hr style="border: none; border-top: 1px solid #e5e5e0; margin: 20px 0;">
+        <p style="color: #5A5A55; font-size: 12px;">Illawarra Tree Removal - {{ footer }}</p>
+    </div>
+</body>
+</html>
+""")
+
+TEXT_LAYOUT = _text_env.from_string("""\
+{{ title }}
+
+{% for lead in leads %}
+{% if digest %}
+{{ loop.index }}. {{ lead.heading }}
+{% endif %}
+{% for label, value in lead.fields %}
+{{ label }}: {{ value }}
+{% endfor %}
+
+{% endfor %}
+--
+Illawarra Tree Removal - {{ footer }}
+""")
+
+
+def _single_line(value: str) -> str:
+    # Subjects become mail headers, so never let lead input inject a newline
+    return " ".join(str(value).split())
+
+
+def subject_for(kind: str, leads: List[dict]) -> str:
+    if len(leads) > 1:
+        return f"{len(leads)} {DIGEST_TITLES[kind]}"
+    lead = leads[0]
+    if kind == "contact":
+        return _single_line(f"Contact: {lead.get('subject', '')}")
+    if kind == "booking":
+        return _single_line(f"New Booking from {lead.get('name', '')}")
+    return _single_line(f"New Quote Request from {lead.get('name', '')}")
+
+
+def render_notification(kind: str, leads: List[dict]) -> dict:
+    """Render a notification for one lead, or a digest when given several"""
+    title, footer, field_map = LEAD_KINDS[kind]
+    digest = len(leads) > 1
+    rows = [
+        {
+            "heading": lead.get("name", ""),
+            "fields": [(label, lead.get(field) or "N/A") for label, field in field_map],
+        }
+        for lead in leads
+    ]
+    context = {
+        "title": f"{len(leads)} {DIGEST_TITLES[kind]}" if digest else title,
+        "footer": footer,
+        "digest": digest,
+        "leads": rows,
+    }
+    return {
+        "subject": subject_for(kind, leads),
+        "html": HTML_LAYOUT.render(context),
+        "text": TEXT_LAYOUT.render(context),
+    }
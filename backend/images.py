@@ -0,0 +1,271 @@
+"""Resized WebP/AVIF variants of local source images, kept in an LRU disk cache.
+
+Source files live in one directory, named `<image id>.<jpg|jpeg|png|webp>`.
+A variant is a source re-encoded at one of a few fixed widths, so
+arbitrary `w=` values cannot fill the cache. Variant URLs carry a digest
+of the source, so they can be cached as immutable: replacing a source file
+changes every URL that points at it.
+
+Variants are encoded in a worker thread, at most `max_encodes` at a time,
+and concurrent requests for the same missing variant share one encode.
+The cache directory is shared between workers and trimmed to `max_bytes`,
+least recently served first. Add a source image from the backend directory with:
+
+    python images.py add <path-or-url> <image id>
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+IMAGE_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,127}$")
+# format -> (Pillow encoder, media type, encoder options)
+FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 55, "speed": 6}),
+    "webp": ("WEBP", "image/webp", {"quality": 78, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+# Order of <source> elements: the browser takes the first type it supports
+SRCSET_FORMATS = ("avif", "webp")
+
+
+class SourceImage:
+    def __init__(self, path: Path, digest: str, width: int, height: int):
+        self.path = path
+        self.digest = digest
+        self.width = width
+        self.height = height
+
+
+class DiskLRU:
+    """Byte-bounded file cache; recency survives restarts through file mtimes"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        entries = []
+        for path in self.directory.iterdir():
+            if path.is_file() and not path.name.startswith("."):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._sizes[name] = size
+        self.size = sum(self._sizes.values())
+
+    def get(self, name: str) -> Optional[Path]:
+        path = self.directory / name
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory
+            self.size -= self._sizes.pop(name, 0)
+            return None
+        if name not in self._sizes:
+            self._sizes[name] = path.stat().st_size
+            self.size += self._sizes[name]
+        self._sizes.move_to_end(name)
+        return path
+
+    def put(self, name: str, data: bytes) -> Path:
+        path = self.directory / name
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.size += len(data) - self._sizes.pop(name, 0)
+        self._sizes[name] = len(data)
+        self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: str):
+        while self.size > self.max_bytes and len(self._sizes) > 1:
+            name, size = next(iter(self._sizes.items()))
+            if name == keep:
+                self._sizes.move_to_end(name)
+                continue
+            del self._sizes[name]
+            self.size -= size
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def encode_variant(source: Path, width: int, fmt: str) -> bytes:
+    encoder, _, options = FORMATS[fmt]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        out = io.BytesIO()
+        image.save(out, encoder, **options)
+        return out.getvalue()
+
+
+class ImageStore:
+    def __init__(
+        self,
+        source_dir: Path,
+        cache_dir: Path,
+        widths: Tuple[int, ...] = (320, 640, 960, 1280, 1920),
+        max_cache_bytes: int = 512 * 1024 * 1024,
+        max_encodes: int = 2,
+        base_url: str = "/api/images",
+    ):
+        self.source_dir = Path(source_dir)
+        self.cache_dir = Path(cache_dir)
+        self.widths = tuple(sorted(widths))
+        self.max_cache_bytes = max_cache_bytes
+        self.max_encodes = max_encodes
+        self.base_url = base_url.rstrip("/")
+        self._cache: Optional[DiskLRU] = None
+        # path -> ((mtime_ns, size), SourceImage)
+        self._sources: Dict[Path, tuple] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._encodes: Optional[asyncio.Semaphore] = None
+
+    @property
+    def cache(self) -> DiskLRU:
+        if self._cache is None:
+            self._cache = DiskLRU(self.cache_dir, self.max_cache_bytes)
+        return self._cache
+
+    def source(self, image_id: str) -> Optional[SourceImage]:
+        if not image_id or not IMAGE_ID.match(image_id):
+            return None
+        for ext in SOURCE_EXTENSIONS:
+            path = self.source_dir / f"{image_id}{ext}"
+            try:
+                stat = path.stat()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = self._sources.get(path)
+            if cached and cached[0] == key:
+                return cached[1]
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+            with Image.open(path) as image:
+                width, height = ImageOps.exif_transpose(image).size
+            source = SourceImage(path, digest, width, height)
+            self._sources[path] = (key, source)
+            return source
+        return None
+
+    def bucket(self, source: SourceImage, width: Optional[int]) -> int:
+        """Smallest configured width covering the request, never wider than the source"""
+        widths = sorted({min(w, source.width) for w in self.widths})
+        if not width:
+            return widths[-1]
+        for candidate in widths:
+            if candidate >= width:
+                return candidate
+        return widths[-1]
+
+    def url(self, image_id: str, source: SourceImage, width: int, fmt: str) -> str:
+        return f"{self.base_url}/{image_id}?w={width}&fmt={fmt}&v={source.digest}"
+
+    def sources(self, image_id: str) -> Optional[List[dict]]:
+        """`<source>`-ready srcsets, best format first, or None without a source file"""
+        try:
+            source = self.source(image_id)
+        except OSError as e:
+            logger.warning(f"Unreadable source image {image_id}: {str(e)}")
+            return None
+        if source is None:
+            return None
+        widths = sorted({self.bucket(source, w) for w in self.widths})
+        return [
+            {
+                "type": FORMATS[fmt][1],
+                "srcset": ", ".join(f"{self.url(image_id, source, w, fmt)} {w}w" for w in widths),
+            }
+            for fmt in SRCSET_FORMATS
+        ]
+
+    async def variant(self, image_id: str, width: Optional[int], fmt: str) -> Optional[Tuple[Path, SourceImage, int]]:
+        """Path of the encoded variant, encoding it on a cache miss; None if there is no source"""
+        # A new or changed source is read, hashed and decoded, so keep it off the event loop
+        source = await asyncio.to_thread(self.source, image_id)
+        if source is None:
+            return None
+        bucket = self.bucket(source, width)
+        name = f"{image_id}-{source.digest}-{bucket}.{fmt}"
+        path = self.cache.get(name)
+        if path is not None:
+            return path, source, bucket
+
+        task = self._inflight.get(name)
+        if task is None:
+            # Owned by no request, so a client hanging up can't strand the others waiting on it
+            task = asyncio.ensure_future(self._encode(name, source, bucket, fmt))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return await asyncio.shield(task), source, bucket
+
+    async def _encode(self, name: str, source: SourceImage, width: int, fmt: str) -> Path:
+        if self._encodes is None:
+            self._encodes = asyncio.Semaphore(self.max_encodes)
+        async with self._encodes:
+            data = await asyncio.to_thread(encode_variant, source.path, width, fmt)
+        return self.cache.put(name, data)
+
+
+def add_source(source_dir: Path, location: str, image_id: str) -> Path:
+    if not IMAGE_ID.match(image_id):
+        raise ValueError(f"Invalid image id: {image_id!r}")
+    source_dir.mkdir(parents=True, exist_ok=True)
+    tmp = source_dir / f".{image_id}.download"
+    if re.match(r"^https?://", location):
+        with urllib.request.urlopen(location, timeout=60) as response, open(tmp, "wb") as f:
+            shutil.copyfileobj(response, f)
+    else:
+        shutil.copyfile(location, tmp)
+    with Image.open(tmp) as image:
+        ext = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}.get(image.format)
+    if ext is None:
+        tmp.unlink()
+        raise ValueError(f"Unsupported source format for {location}")
+    for old in SOURCE_EXTENSIONS:
+        (source_dir / f"{image_id}{old}").unlink(missing_ok=True)
+    target = source_dir / f"{image_id}{ext}"
+    os.replace(tmp, target)
+    return target
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="copy or download a source image")
+    add.add_argument("location", help="file path or http(s) URL")
+    add.add_argument("image_id", help="e.g. gallery-1 or services-3 to attach it to that catalog item")
+    args = parser.parse_args()
+
+    source_dir = Path(os.environ.get('IMAGE_SOURCE_DIR', Path(__file__).parent / 'images'))
+    target = add_source(source_dir, args.location, args.image_id)
+    logger.info(f"Stored {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Live feed of new leads for Server-Sent Events clients.
+
+`LeadFeed` is a fan-out hub: one upstream source of insert events is shared
+by every connected client, each of which gets its own bounded queue. The
+upstream is a single Mongo change stream over the lead collections when the
+deployment supports one (replica sets and sharded clusters). On a standalone
+server the handlers publish their own inserts instead, which only reaches
+clients connected to the same process.
+
+Event ids are `<created_at ms>-<lead id>`, matching the `(created_at, id)`
+order the lead collections are indexed on, so a reconnecting client's
+`Last-Event-ID` is resumed with a plain range query whichever upstream is
+in use and however long it was away.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def event_id(doc: dict) -> str:
+    created_at = doc["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    # BSON dates keep milliseconds, so ids from live and replayed events agree
+    return f"{int(created_at.timestamp() * 1000)}-{doc['id']}"
+
+
+def parse_event_id(value: str) -> Optional[Tuple[datetime, str]]:
+    """(created_at, lead id) from a Last-Event-ID; None for anything malformed, so it is ignored"""
+    millis, _, lead_id = (value or "").strip().partition("-")
+    if not millis.isdigit() or not lead_id:
+        return None
+    try:
+        return datetime.fromtimestamp(int(millis) / 1000, timezone.utc), lead_id
+    except (OverflowError, ValueError, OSError):
+        return None
+
+
+def format_sse(event: Optional[str] = None, data: bytes = b"", id: Optional[str] = None, retry: Optional[int] = None) -> bytes:
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}".encode("utf-8"))
+    if event is not None:
+        lines.append(f"event: {event}".encode("utf-8"))
+    if retry is not None:
+        lines.append(f"retry: {retry}".encode("utf-8"))
+    for line in data.split(b"\n") if data else []:
+        lines.append(b"data: " + line)
+    return b"\n".join(lines) + b"\n\n"
+
+
+class Subscription:
+    def __init__(self, kinds: Iterable[str], queue_size: int):
+        self.kinds = set(kinds)
+        self.queue_size = queue_size
+        # One slot beyond the backlog is kept for the close marker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size + 1)
+        # Set when the client fell too far behind; it must reconnect and replay
+        self.overflowed = False
+
+    def offer(self, event: tuple):
+        if self.overflowed or event[1] not in self.kinds:
+            return
+        if self.queue.qsize() >= self.queue_size:
+            # Close after what is already queued, so the client resumes with no gap
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+class LeadFeed:
+    def __init__(
+        self,
+        db,
+        collections: Dict[str, str],
+        hidden_fields: Iterable[str] = ("_id",),
+        mode: str = "auto",
+        queue_size: int = 1000,
+        replay_limit: int = 500,
+        retry_delay: float = 2.0,
+    ):
+        """`collections` maps lead kind to collection name; `mode` is auto, change_stream or local"""
+        self.db = db
+        self.collections = collections
+        self.kinds_by_collection = {name: kind for kind, name in collections.items()}
+        self.hidden_fields = tuple(hidden_fields)
+        self.mode = mode
+        self.queue_size = queue_size
+        self.replay_limit = replay_limit
+        self.retry_delay = retry_delay
+        self.subscribers: set = set()
+        # Lead ids recently fanned out, so an insert seen by both upstreams is sent once
+        self._recent = deque(maxlen=1000)
+        self._recent_ids: set = set()
+        self._watching = False
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def source(self) -> str:
+        return "change_stream" if self._watching else "local"
+
+    def _clean(self, doc: dict) -> dict:
+        return {k: v for k, v in doc.items() if k not in self.hidden_fields}
+
+    def _fan_out(self, kind: str, doc: dict):
+        if doc["id"] in self._recent_ids:
+            return
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_ids.discard(self._recent[0])
+        self._recent.append(doc["id"])
+        self._recent_ids.add(doc["id"])
+        event = (event_id(doc), kind, self._clean(doc))
+        for subscription in list(self.subscribers):
+            subscription.offer(event)
+
+    def publish(self, kind: str, docs: List[dict]):
+        """Called by the handlers after an insert; ignored while the change stream is the upstream"""
+        if self._watching:
+            return
+        for doc in docs:
+            self._fan_out(kind, doc)
+
+    def subscribe(self, kinds: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(kinds or self.collections, self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    async def replay(self, after: Tuple[datetime, str], kinds: Iterable[str]) -> List[tuple]:
+        """Leads stored after an event id, oldest first, at most `replay_limit` of them"""
+        created_at, lead_id = after
+        query = {"$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": lead_id}},
+        ]}
+        projection = {field: 0 for field in self.hidden_fields}
+        batches = await asyncio.gather(*(
+            self.db[self.collections[kind]].find(query, projection)
+            .sort([("created_at", 1), ("id", 1)]).limit(self.replay_limit).to_list(self.replay_limit)
+            for kind in kinds
+        ))
+        events = [(event_id(doc), kind, doc) for kind, docs in zip(kinds, batches) for doc in docs]
+        events.sort(key=lambda event: (event[2]["created_at"], event[2]["id"]))
+        return events[:self.replay_limit]
+
+    async def _watch(self):
+        pipeline = [{"$match": {
+            "operationType": "insert",
+            "ns.coll": {"$in": list(self.kinds_by_collection)},
+        }}]
+        resume_token = None
+        while not self._stopping:
+            try:
+                async with self.db.watch(pipeline, resume_after=resume_token) as stream:
+                    while not self._stopping:
+                        # The first call opens the stream, so only then stop publishing locally
+                        change = await stream.try_next()
+                        if not self._watching:
+                            logger.info("Lead feed following the Mongo change stream")
+                            self._watching = True
+                        resume_token = stream.resume_token
+                        if change is not None:
+                            self._fan_out(self.kinds_by_collection[change["ns"]["coll"]], change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if resume_token is None and self.mode == "auto":
+                    # Standalone servers have no change streams; publish from the handlers instead
+                    logger.info(f"Change streams unavailable, lead feed is process-local: {str(e)}")
+                    self._watching = False
+                    return
+                logger.warning(f"Lead feed change stream failed, reconnecting: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        if self.mode == "local" or (self._task is not None and not self._task.done()):
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._watch())
+
+    def close_streams(self):
+        """End every client stream after what is already queued; clients reconnect and resume"""
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    async def stop(self):
+        self._stopping = True
+        self.close_streams()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._watching = False
+
+    async def stream(
+        self,
+        last_event_id: Optional[str],
+        kinds: List[str],
+        encode: Callable[[dict], bytes],
+        heartbeat: float = 15.0,
+        retry_ms: int = 3000,
+    ):
+        """SSE body for one client: replay since `last_event_id`, then live events"""
+        subscription = self.subscribe(kinds)
+        try:
+            yield format_sse(retry=retry_ms)
+            after = parse_event_id(last_event_id) if last_event_id else None
+            replayed = set()
+            if after is not None:
+                events = await self.replay(after, kinds)
+                for id, kind, doc in events:
+                    replayed.add(doc["id"])
+                    yield format_sse(kind, encode(doc), id=id)
+                if len(events) >= self.replay_limit:
+                    # More history than one replay covers; the client reconnects from the last id
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                id, kind, doc = event
+                if doc["id"] in replayed:
+                    continue
+                yield format_sse(kind, encode(doc), id=id)
+        finally:
+            self.unsubscribe(subscription)
@@ -0,0 +1,223 @@
+"""Prometheus instrumentation for the API.
+
+`PrometheusMiddleware` times every HTTP request by route template,
+`MongoCommandMetrics` is a pymongo command listener that times each Mongo
+round trip, `MongoPoolMetrics` follows the connection pools, and the
+module-level metrics below are shared by the handlers and the email
+dispatcher. Everything is exposed through `metrics_response`.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from pymongo import monitoring
+from starlette.responses import Response
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests, including streamed bodies",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["method"],
+    multiprocess_mode="livesum",
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round-trip time",
+    ["command", "collection", "outcome"], buckets=LATENCY_BUCKETS,
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds", "Time spent in the email provider per message",
+    ["outcome"], buckets=LATENCY_BUCKETS,
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Form submissions rejected by the rate limiter", ["bucket"]
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "Open Mongo connections by pool and state", ["address", "state"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_WAITING = Gauge(
+    "mongo_pool_waiting", "Operations waiting to check out a Mongo connection", ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed Mongo connection checkouts", ["address", "reason"]
+)
+LEAD_STREAM_CLIENTS = Gauge(
+    "lead_stream_clients", "Clients connected to the live lead feed",
+    multiprocess_mode="livesum",
+)
+INSERT_BATCH_DOCUMENTS = Histogram(
+    "lead_insert_batch_documents", "Documents written per grouped lead insert",
+    ["collection"], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+LIST_DOCUMENTS = Histogram(
+    "lead_list_documents", "Documents returned per lead list request",
+    ["collection", "format"], buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 5000, 10000, 50000),
+)
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed until their last chunk"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.labels(method).dec()
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+            HTTP_REQUEST_SECONDS.labels(method, route_path).observe(elapsed)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times Mongo commands; register with `AsyncIOMotorClient(event_listeners=[...])`"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore and friends name the collection separately
+            target = event.command.get("collection", "")
+        self._collections[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event):
+        self._observe(event, "success")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    def _observe(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection, outcome).observe(event.duration_micros / 1e6)
+
+
+class PoolState:
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.cleared = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks each connection pool for Prometheus and for the readiness probe"""
+
+    def __init__(self):
+        self.pools = {}
+
+    def _pool(self, event) -> PoolState:
+        return self.pools.setdefault(event.address, PoolState())
+
+    def _label(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def snapshot(self) -> dict:
+        """Per-address pool counters, plus totals across every server"""
+        pools = {f"{host}:{port}": state.as_dict() for (host, port), state in self.pools.items()}
+        totals = PoolState()
+        for state in self.pools.values():
+            for field, value in vars(state).items():
+                setattr(totals, field, getattr(totals, field) + value)
+        return {"total": totals.as_dict(), "servers": pools}
+
+    def pool_created(self, event):
+        self._pool(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._pool(event).cleared += 1
+
+    def pool_closed(self, event):
+        self.pools.pop(event.address, None)
+
+    def connection_created(self, event):
+        self._pool(event).open += 1
+        MONGO_POOL_CONNECTIONS.labels(self._label(event), "open").inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        # A closed pool reports its connections closing after it is gone
+        pool = self.pools.get(event.address)
+        if pool is not None:
+            pool.open = max(pool.open - 1, 0)
+        MONGO_POOL_CONNECTIONS.labels(self._label(event), "open").dec()
+
+    def connection_check_out_started(self, event):
+        self._pool(event).waiting += 1
+        MONGO_POOL_WAITING.labels(self._label(event)).inc()
+
+    def connection_check_out_failed(self, event):
+        pool = self._pool(event)
+        pool.waiting = max(pool.waiting - 1, 0)
+        pool.checkout_failures += 1
+        MONGO_POOL_WAITING.labels(self._label(event)).dec()
+        MONGO_POOL_CHECKOUT_FAILURES.labels(self._label(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        pool = self._pool(event)
+        pool.waiting = max(pool.waiting - 1, 0)
+        pool.checked_out += 1
+        MONGO_POOL_WAITING.labels(self._label(event)).dec()
+        MONGO_POOL_CONNECTIONS.labels(self._label(event), "in_use").inc()
+
+    def connection_checked_in(self, event):
+        pool = self._pool(event)
+        pool.checked_out = max(pool.checked_out - 1, 0)
+        MONGO_POOL_CONNECTIONS.labels(self._label(event), "in_use").dec()
+
+
+def metrics_response() -> Response:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Several worker processes: aggregate the per-process files
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
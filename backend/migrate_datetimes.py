@@ -0,0 +1,100 @@
+"""Convert ISO-string `created_at` values on lead documents to BSON dates.
+
+Older documents were written with `created_at` as an ISO 8601 string. Run
+from the backend directory, once per environment:
+
+    python migrate_datetimes.py [--batch-size 500] [--dry-run]
+
+The migration is idempotent: only documents whose `created_at` is still a
+string are touched, so it can be interrupted and re-run safely.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+LEAD_COLLECTIONS = ("quotes", "bookings", "contacts")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("migrate_datetimes")
+
+
+def parse_created_at(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_collection(collection, batch_size: int = 500, dry_run: bool = False) -> int:
+    """Rewrite string `created_at` values in batches; returns the number converted"""
+    converted = 0
+    last_id = None
+    while True:
+        query = {"created_at": {"$type": "string"}}
+        if last_id is not None:
+            # Walk by _id so unparseable rows and dry runs can't loop forever
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {"_id": 1, "created_at": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        updates = []
+        for doc in batch:
+            try:
+                created_at = parse_created_at(doc["created_at"])
+            except ValueError:
+                logger.warning(f"{collection.name}: skipping {doc['_id']} with unparseable created_at {doc['created_at']!r}")
+                continue
+            # Match on the old value too, so a concurrent rewrite is never clobbered
+            updates.append(UpdateOne(
+                {"_id": doc["_id"], "created_at": doc["created_at"]},
+                {"$set": {"created_at": created_at}},
+            ))
+
+        if updates and not dry_run:
+            result = await collection.bulk_write(updates, ordered=False)
+            converted += result.modified_count
+        else:
+            converted += len(updates)
+        logger.info(f"{collection.name}: {converted} documents converted so far")
+    return converted
+
+
+async def migrate(db, batch_size: int = 500, dry_run: bool = False) -> dict:
+    return {
+        name: await migrate_collection(db[name], batch_size=batch_size, dry_run=dry_run)
+        for name in LEAD_COLLECTIONS
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="count documents that would change without writing")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        totals = await migrate(client[os.environ['DB_NAME']], batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        client.close()
+    for name, count in totals.items():
+        logger.info(f"{name}: {count} documents {'would be ' if args.dry_run else ''}converted")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
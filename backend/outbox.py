@@ -0,0 +1,206 @@
+"""Mongo-backed outbox for lead notification emails.
+
+Request handlers only insert a row holding the lead data into the outbox
+collection. A background dispatcher claims due rows in batches, renders
+them, hands them to the email sender and retries failures with exponential
+backoff, so the latency of the email provider never shows up in the lead
+form response time. When a claimed batch holds many rows of the same kind,
+they can go out as one digest email.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# A sender receives one rendered message and raises on failure so its rows are retried
+EmailSender = Callable[[dict], Awaitable[Optional[dict]]]
+# A renderer turns (kind, leads) into a message with subject, html and text
+EmailRenderer = Callable[[str, List[dict]], dict]
+
+
+class EmailOutbox:
+    def __init__(
+        self,
+        collection,
+        sender: EmailSender,
+        renderer: EmailRenderer,
+        batch_size: int = 20,
+        digest_threshold: int = 0,
+        max_attempts: int = 6,
+        base_delay: float = 5.0,
+        max_delay: float = 900.0,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 5.0,
+    ):
+        self.collection = collection
+        self.sender = sender
+        self.renderer = renderer
+        self.batch_size = batch_size
+        self.digest_threshold = digest_threshold
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._draining = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, kind: str, leads: List[dict]) -> dict:
+        """Insert a pending notification about `leads` and wake the dispatcher"""
+        now = datetime.now(timezone.utc)
+        doc = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "leads": leads,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "lease_until": None,
+            "last_error": None,
+            "created_at": now,
+            "sent_at": None,
+            "failed_at": None,
+        }
+        await self.collection.insert_one(doc)
+        doc.pop("_id", None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return doc
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, with jitter so retries don't stampede"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(attempts - 1, 0)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _claim(self, now: datetime) -> Optional[dict]:
+        # Rows stuck in "sending" past their lease belonged to a worker that died mid-send
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        doc = await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": "sending", "lease_until": lease_until}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            doc.pop("_id", None)
+        return doc
+
+    async def _claim_batch(self) -> List[dict]:
+        now = datetime.now(timezone.utc)
+        batch = []
+        while len(batch) < self.batch_size:
+            doc = await self._claim(now)
+            if doc is None:
+                break
+            batch.append(doc)
+        return batch
+
+    def _render(self, docs: List[dict]) -> dict:
+        if len(docs) == 1 and "kind" not in docs[0]:
+            # Rows queued before rendering moved into the dispatcher carry their own body
+            return docs[0]
+        return self.renderer(docs[0]["kind"], [lead for doc in docs for lead in doc["leads"]])
+
+    def _messages(self, batch: List[dict]) -> List[Tuple[List[dict], dict]]:
+        """Pair each message to send with the outbox rows it covers"""
+        groups = {}
+        for doc in batch:
+            groups.setdefault(doc.get("kind"), []).append(doc)
+        messages = []
+        for kind, docs in groups.items():
+            if kind and self.digest_threshold and len(docs) >= self.digest_threshold:
+                messages.append((docs, self._render(docs)))
+            else:
+                messages.extend(([doc], self._render([doc])) for doc in docs)
+        return messages
+
+    async def _fail(self, doc: dict, error: Exception):
+        now = datetime.now(timezone.utc)
+        if doc["attempts"] >= self.max_attempts:
+            logger.error(f"Giving up on email {doc['id']} after {doc['attempts']} attempts: {str(error)}")
+            update = {"status": "failed", "failed_at": now, "lease_until": None, "last_error": str(error)}
+        else:
+            retry_at = now + timedelta(seconds=self.backoff(doc["attempts"]))
+            logger.warning(f"Email {doc['id']} failed (attempt {doc['attempts']}), retrying at {retry_at.isoformat()}: {str(error)}")
+            update = {"status": "pending", "next_attempt_at": retry_at, "lease_until": None, "last_error": str(error)}
+        await self.collection.update_one({"id": doc["id"]}, {"$set": update})
+
+    async def _deliver(self, docs: List[dict], message: Optional[dict] = None) -> bool:
+        try:
+            if message is None:
+                message = self._render(docs)
+            await self.sender(message)
+        except Exception as e:
+            for doc in docs:
+                await self._fail(doc, e)
+            return False
+
+        await self.collection.update_many(
+            {"id": {"$in": [doc["id"] for doc in docs]}},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc), "lease_until": None, "last_error": None}},
+        )
+        return True
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch of due rows and send them concurrently; returns the rows claimed"""
+        batch = await self._claim_batch()
+        if batch:
+            try:
+                messages = self._messages(batch)
+            except Exception:
+                # Render each row on its own so one bad row can't hold up the rest
+                messages = [([doc], None) for doc in batch]
+            await asyncio.gather(*(self._deliver(docs, message) for docs, message in messages))
+        return len(batch)
+
+    async def run(self):
+        while not self._stopping or self._draining:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Email outbox dispatch failed: {str(e)}")
+                claimed = 0
+            if self._stopping:
+                # Draining: keep going until nothing is due; rows waiting on a retry stay queued
+                if claimed == 0:
+                    return
+                continue
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            # The event is bound to the running loop, so create it per start
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._draining = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0, drain: bool = False):
+        """Let the in-flight batch finish, then stop the dispatcher; with `drain`, send every due row first"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._draining = drain
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
@@ -0,0 +1,92 @@
+"""Token-bucket rate limiting for the public form endpoints.
+
+Buckets are tracked with GCRA (the generic cell rate algorithm), which
+behaves exactly like a token bucket but only needs one timestamp per key:
+the "theoretical arrival time" at which the bucket would be full again.
+`MemoryRateLimitStore` keeps those timestamps in-process; `MongoRateLimitStore`
+shares them between worker processes through a compare-and-set update.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+
+class RateLimit:
+    """Allows `burst` requests at once, refilled at `per_hour` requests per hour"""
+
+    def __init__(self, burst: int, per_hour: float):
+        self.burst = burst
+        self.interval = 3600.0 / per_hour
+
+    @property
+    def tolerance(self) -> float:
+        return self.interval * self.burst
+
+    def evaluate(self, stored_tat, now: float) -> Tuple[bool, float, float]:
+        """Returns (allowed, new theoretical arrival time, seconds until allowed)"""
+        new_tat = max(stored_tat or now, now) + self.interval
+        overshoot = new_tat - now - self.tolerance
+        if overshoot > 0:
+            return False, stored_tat, overshoot
+        return True, new_tat, 0.0
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class MemoryRateLimitStore:
+    """Per-process buckets, evicting the least recently used keys past `max_keys`"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+
+    async def hit(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        now = time.time()
+        allowed, tat, retry_after = limit.evaluate(self._tats.get(key), now)
+        if allowed:
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self):
+        self._tats.clear()
+
+
+class MongoRateLimitStore:
+    """Buckets shared by every worker, kept in a TTL-indexed collection"""
+
+    def __init__(self, collection, max_retries: int = 3):
+        self.collection = collection
+        self.max_retries = max_retries
+
+    async def hit(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        for _ in range(self.max_retries):
+            now = time.time()
+            doc = await self.collection.find_one({"_id": key})
+            stored = doc["tat"] if doc else None
+            allowed, tat, retry_after = limit.evaluate(stored, now)
+            if not allowed:
+                return False, retry_after
+            update = {"tat": tat, "expires_at": datetime.fromtimestamp(tat, timezone.utc)}
+            if doc is None:
+                try:
+                    await self.collection.insert_one({"_id": key, **update})
+                    return True, 0.0
+                except DuplicateKeyError:
+                    continue
+            # Only wins if no other worker moved the bucket since we read it
+            result = await self.collection.update_one({"_id": key, "tat": stored}, {"$set": update})
+            if result.modified_count:
+                return True, 0.0
+            await asyncio.sleep(0)
+        # Heavy contention on a single key means one client is flooding us
+        return False, limit.interval
@@ -0,0 +1,182 @@
+"""Production launcher: several uvicorn worker processes sharing one socket.
+
+Run it from the repository root with `python -m backend`, or with
+`python serve.py` from the backend directory. The parent process binds the
+listening socket and supervises the workers. Each worker is a fresh
+interpreter that imports the app and opens its own Mongo client in the
+lifespan, so no connection pool or event loop is shared between processes.
+Workers that die are restarted, with a backoff if they keep failing to start.
+
+On SIGTERM or SIGINT every worker stops accepting connections, ends its lead
+streams so dashboards reconnect elsewhere, waits up to SERVER_GRACEFUL_TIMEOUT
+seconds for in-flight requests, then sends the notifications still due (up to
+EMAIL_DRAIN_SECONDS) before closing its Mongo client.
+
+Limits apply per worker, so MONGO_MAX_POOL_SIZE and SERVER_LIMIT_CONCURRENCY
+are multiplied by WEB_CONCURRENCY across the host.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from uvicorn import Config, Server
+# Private uvicorn API, pinned in requirements.txt; tests/test_serve.py fails if it moves
+from uvicorn._subprocess import get_subprocess
+from uvicorn.importer import import_from_string
+
+logger = logging.getLogger("uvicorn.error")
+
+BACKEND_DIR = Path(__file__).resolve().parent
+HANDLED_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class WorkerServer(Server):
+    """uvicorn server that tells the app it is draining as soon as shutdown is signalled"""
+
+    def __init__(self, config: Config, drain_hook: Optional[str] = None):
+        super().__init__(config)
+        self.drain_hook = drain_hook
+
+    def handle_exit(self, sig, frame):
+        if not self.should_exit and self.drain_hook:
+            try:
+                import_from_string(self.drain_hook)()
+            except Exception as e:
+                logger.warning(f"Drain hook {self.drain_hook} failed: {str(e)}")
+        super().handle_exit(sig, frame)
+
+
+class Supervisor:
+    def __init__(self, config: Config, target: Callable, sockets: List, workers: int, stop_timeout: float):
+        self.config = config
+        self.target = target
+        self.sockets = sockets
+        self.workers = workers
+        self.stop_timeout = stop_timeout
+        self.processes: Dict[int, Optional[object]] = {}
+        self.started_at: Dict[int, float] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.should_exit = threading.Event()
+
+    def signal_handler(self, sig, frame):
+        self.should_exit.set()
+
+    def spawn(self, slot: int):
+        process = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+        process.start()
+        self.processes[slot] = process
+        self.started_at[slot] = time.monotonic()
+        logger.info(f"Started worker {process.pid}")
+
+    def reap(self, process):
+        process.join()
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            # Drops the dead worker's live gauges from /metrics
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(process.pid)
+
+    def check_workers(self):
+        now = time.monotonic()
+        for slot, process in list(self.processes.items()):
+            if process is None:
+                if now >= self.restart_at[slot]:
+                    self.spawn(slot)
+                continue
+            if process.is_alive():
+                continue
+            self.reap(process)
+            # A worker that dies soon after starting (Mongo down, bad config) is retried more slowly
+            quick = now - self.started_at[slot] < 60
+            self.failures[slot] = self.failures.get(slot, 0) + 1 if quick else 0
+            delay = min(2 ** self.failures[slot], 60) if quick else 0
+            logger.warning(f"Worker {process.pid} exited with code {process.exitcode}, restarting in {delay}s")
+            self.processes[slot] = None
+            self.restart_at[slot] = now + delay
+
+    def run(self):
+        for sig in HANDLED_SIGNALS:
+            signal.signal(sig, self.signal_handler)
+        logger.info(f"Started parent process {os.getpid()} with {self.workers} workers")
+        for slot in range(self.workers):
+            self.spawn(slot)
+        while not self.should_exit.wait(0.5):
+            self.check_workers()
+        self.shutdown()
+
+    def shutdown(self):
+        alive = [process for process in self.processes.values() if process is not None and process.is_alive()]
+        logger.info(f"Stopping {len(alive)} workers")
+        for process in alive:
+            # SIGTERM: the worker drains and runs its lifespan shutdown
+            process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for process in alive:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.error(f"Worker {process.pid} did not stop within {self.stop_timeout:g}s, killing it")
+                process.kill()
+            self.reap(process)
+        logger.info(f"Stopped parent process {os.getpid()}")
+
+
+def server_config(host: str, port: int, workers: int) -> Config:
+    limit_concurrency = int(os.environ.get('SERVER_LIMIT_CONCURRENCY', '0'))
+    return Config(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        lifespan="on",
+        # Requests beyond this many open connections per worker get a 503 instead of queueing
+        limit_concurrency=limit_concurrency or None,
+        backlog=int(os.environ.get('SERVER_BACKLOG', '2048')),
+        timeout_keep_alive=int(os.environ.get('SERVER_KEEPALIVE_SECONDS', '5')),
+        timeout_graceful_shutdown=int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '30')),
+        forwarded_allow_ips=os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1'),
+        access_log=os.environ.get('SERVER_ACCESS_LOG', 'true').lower() == 'true',
+    )
+
+
+def prepare_metrics_dir(workers: int):
+    """Workers share Prometheus metrics through files; stale ones from a previous run are removed"""
+    if workers < 2 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    directory = Path(os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="prometheus-"))
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.db"):
+        path.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(directory)
+
+
+def main():
+    load_dotenv(BACKEND_DIR / '.env')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', '0')) or os.cpu_count() or 1,
+        help="worker processes (default: WEB_CONCURRENCY, else one per CPU)",
+    )
+    args = parser.parse_args()
+
+    # Spawned workers inherit sys.path, which is how they find server.py
+    sys.path.insert(0, str(BACKEND_DIR))
+    prepare_metrics_dir(args.workers)
+    config = server_config(args.host, args.port, args.workers)
+    server = WorkerServer(config, drain_hook="server:begin_drain")
+    stop_timeout = config.timeout_graceful_shutdown + float(os.environ.get('EMAIL_DRAIN_SECONDS', '10')) + 5
+    supervisor = Supervisor(config, server.run, [config.bind_socket()], args.workers, stop_timeout)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
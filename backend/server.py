@@ -1,32 +1,172 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query, Header, Depends
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 import asyncio
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import json
+import re
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import List, Literal, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import orjson
 import resend
+from compression import CompressionMiddleware, available_encodings, choose_encoding, compress
+from catalog import CatalogCache
+from dispatch import plan_day
+from images import FORMATS as IMAGE_FORMATS, ImageStore
+from lead_feed import LeadFeed
+from outbox import EmailOutbox
+from write_buffer import InsertBuffer
+from email_templates import render_notification
+from metrics import (
+    EMAIL_SEND_SECONDS, LEAD_STREAM_CLIENTS, LIST_DOCUMENTS, RATE_LIMITED,
+    MongoCommandMetrics, MongoPoolMetrics, PrometheusMiddleware, metrics_response,
+)
+from stats import LeadRollups
+from suburbs import service_area
+from rate_limit import MemoryRateLimitStore, MongoRateLimitStore, RateLimit, retry_after_header
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection; the client is created per process when the app starts
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '2'))
+MONGO_MAX_IDLE_MS = int(os.environ.get('MONGO_MAX_IDLE_MS', '300000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '20000'))
+# How long a request may wait for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+# Write concern: a node count or "majority"; empty keeps the server default
+MONGO_WRITE_CONCERN = os.environ.get('MONGO_WRITE_CONCERN', '')
+MONGO_WRITE_TIMEOUT_MS = int(os.environ.get('MONGO_WRITE_TIMEOUT_MS', '5000'))
+MONGO_JOURNAL = os.environ.get('MONGO_JOURNAL', '').lower() == 'true'
+# Startup waits this long for Mongo; readiness fails when a ping is slower than the limit
+MONGO_STARTUP_TIMEOUT = float(os.environ.get('MONGO_STARTUP_TIMEOUT', '30'))
+MONGO_READY_PING_MS = float(os.environ.get('MONGO_READY_PING_MS', '500'))
+client = None
+db = None
+mongo_pool_metrics = MongoPoolMetrics()
 
 # Resend configuration
 resend.api_key = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 NOTIFICATION_EMAIL = os.environ.get('NOTIFICATION_EMAIL', '')
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '20'))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '6'))
+# Send this many same-kind notifications claimed together as one digest (0 disables)
+EMAIL_DIGEST_THRESHOLD = int(os.environ.get('EMAIL_DIGEST_THRESHOLD', '5'))
+# On shutdown, keep sending due notifications for up to this long before leaving them to another worker
+EMAIL_DRAIN_SECONDS = float(os.environ.get('EMAIL_DRAIN_SECONDS', '10'))
+# Outbox rows carry a copy of the lead, so they expire once sent (or given up on) for this long
+EMAIL_OUTBOX_SENT_TTL_SECONDS = int(os.environ.get('EMAIL_OUTBOX_SENT_TTL_SECONDS', str(7 * 86400)))
+EMAIL_OUTBOX_FAILED_TTL_SECONDS = int(os.environ.get('EMAIL_OUTBOX_FAILED_TTL_SECONDS', str(30 * 86400)))
 
-# Create the main app without a prefix
-app = FastAPI()
+# Lead list pagination
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '100'))
+LIST_MAX_PAGE_SIZE = int(os.environ.get('LIST_MAX_PAGE_SIZE', '1000'))
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '500'))
+# Group commit for lead inserts: batch concurrent inserts for up to this many ms or documents
+LEAD_WRITE_BUFFER = os.environ.get('LEAD_WRITE_BUFFER', 'false').lower() == 'true'
+LEAD_WRITE_BUFFER_MS = float(os.environ.get('LEAD_WRITE_BUFFER_MS', '5'))
+LEAD_WRITE_BUFFER_MAX_DOCS = int(os.environ.get('LEAD_WRITE_BUFFER_MAX_DOCS', '100'))
+# Full exports: documents per cursor batch, and bytes buffered per response chunk
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', '65536'))
+
+# Analytics rollups: closed days are rebuilt from the lead collections on this schedule
+STATS_REFRESH_SECONDS = float(os.environ.get('STATS_REFRESH_SECONDS', '3600'))
+STATS_REFRESH_DAYS = int(os.environ.get('STATS_REFRESH_DAYS', '2'))
+STATS_MAX_DAYS = 366
+
+# Live lead feed: auto uses a change stream when Mongo offers one, else in-process events
+LEAD_FEED_MODE = os.environ.get('LEAD_FEED_MODE', 'auto')
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', '1000'))
+SSE_REPLAY_LIMIT = int(os.environ.get('SSE_REPLAY_LIMIT', '500'))
+# Lifetime of the signed ?token= that lets EventSource, which cannot send headers, open the feed
+LEAD_STREAM_TOKEN_SECONDS = int(os.environ.get('LEAD_STREAM_TOKEN_SECONDS', '300'))
+
+# Lead search
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = 100
+# Deepest result reachable by paging; keeps each page to a bounded top-k per collection
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', '500'))
+
+# Duplicate submission suppression
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+DEDUP_WINDOW_SECONDS = int(os.environ.get('DEDUP_WINDOW_SECONDS', '600'))
+
+# Public form rate limits; use the mongo store when running several workers
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+RATE_LIMIT_IP = RateLimit(
+    burst=int(os.environ.get('RATE_LIMIT_IP_BURST', '10')),
+    per_hour=float(os.environ.get('RATE_LIMIT_IP_PER_HOUR', '30')),
+)
+RATE_LIMIT_EMAIL = RateLimit(
+    burst=int(os.environ.get('RATE_LIMIT_EMAIL_BURST', '5')),
+    per_hour=float(os.environ.get('RATE_LIMIT_EMAIL_PER_HOUR', '10')),
+)
+# Number of trusted proxies appending to X-Forwarded-For (0 ignores the header)
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '1'))
+FORM_MAX_BODY_BYTES = int(os.environ.get('FORM_MAX_BODY_BYTES', '16384'))
+
+# Bulk lead ingestion
+BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', '5000'))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '500'))
+
+# Booking capacity
+BUSINESS_TIMEZONE = ZoneInfo(os.environ.get('BUSINESS_TIMEZONE', 'Australia/Sydney'))
+BOOKING_CREWS_PER_SLOT = int(os.environ.get('BOOKING_CREWS_PER_SLOT', '2'))
+AVAILABILITY_CACHE_TTL = float(os.environ.get('AVAILABILITY_CACHE_TTL', '15'))
+AVAILABILITY_MAX_DAYS = 92
+# Days of availability, from today, included in the landing page bootstrap document
+BOOTSTRAP_AVAILABILITY_DAYS = int(os.environ.get('BOOTSTRAP_AVAILABILITY_DAYS', '61'))
+
+# Crew dispatch planning: the yard crews start from and return to, as "lat,lon"
+DISPATCH_DEPOT = tuple(float(v) for v in os.environ.get('DISPATCH_DEPOT', '-34.4250,150.8930').split(','))
+DISPATCH_SPEED_KMH = float(os.environ.get('DISPATCH_SPEED_KMH', '45'))
+# Straight-line distance times this approximates the road distance
+DISPATCH_ROAD_FACTOR = float(os.environ.get('DISPATCH_ROAD_FACTOR', '1.3'))
+
+# HTTP caching for the static catalog endpoints
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=300, stale-while-revalidate=86400')
+# Seconds a worker serves its in-memory catalogs before checking for edits made elsewhere
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '30'))
+# Resized catalog images: sources are <image id>.jpg|png|webp files, e.g. gallery-1.jpg
+IMAGE_SOURCE_DIR = Path(os.environ.get('IMAGE_SOURCE_DIR', ROOT_DIR / 'images'))
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', ROOT_DIR / '.image-cache'))
+IMAGE_CACHE_MAX_MB = int(os.environ.get('IMAGE_CACHE_MAX_MB', '512'))
+IMAGE_WIDTHS = tuple(int(w) for w in os.environ.get('IMAGE_WIDTHS', '320,640,960,1280,1920').split(','))
+IMAGE_MAX_ENCODES = int(os.environ.get('IMAGE_MAX_ENCODES', '2'))
+# Prefix for variant URLs in catalog payloads; point it at a CDN or the public API origin
+IMAGE_BASE_URL = os.environ.get('IMAGE_BASE_URL', '/api/images')
+# Bearer token for the admin endpoints; unset disables them
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN', '')
+# Comma-separated bearer tokens for partner lead feeds (the bulk endpoints); the admin token also works
+PARTNER_API_TOKENS = [t for t in os.environ.get('PARTNER_API_TOKENS', '').split(',') if t]
+
+# Response encoding: orjson for JSON bodies, gzip/brotli for anything larger than the threshold
+FAST_JSON = os.environ.get('FAST_JSON', 'true').lower() == 'true'
+COMPRESSION = os.environ.get('COMPRESSION', 'true').lower() == 'true'
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -49,6 +189,10 @@ class QuoteRequest(BaseModel):
     service: str
     address: str
     message: Optional[str] = ""
+    # Filled from the address by the service-area index; None when outside it
+    suburb: Optional[str] = None
+    postcode: Optional[str] = None
+    zone: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class QuoteRequestCreate(BaseModel):
@@ -71,6 +215,9 @@ class Booking(BaseModel):
     preferred_time: str
     notes: Optional[str] = ""
     status: str = "pending"
+    suburb: Optional[str] = None
+    postcode: Optional[str] = None
+    zone: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class BookingCreate(BaseModel):
@@ -110,6 +257,21 @@ class Testimonial(BaseModel):
     service: str
     date: str
 
+class ImageSource(BaseModel):
+    type: str
+    srcset: str
+
+class Service(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    title: str
+    description: str
+    icon: str
+    image: str
+    # Local source image; defaults to "services-<id>" when that file exists
+    image_id: Optional[str] = None
+    image_sources: Optional[List[ImageSource]] = None
+
 class GalleryItem(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -117,29 +279,970 @@ class GalleryItem(BaseModel):
     description: str
     image_url: str
     category: str
+    # Local source image; defaults to "gallery-<id>" when that file exists
+    image_id: Optional[str] = None
+    image_sources: Optional[List[ImageSource]] = None
+
+# ================ Catalog Data ================
+# Seed content for the catalog collections; edit live catalogs through the admin API
+
+SERVICES = [
+    {
+        "id": "1",
+        "title": "Tree Removal",
+        "description": "Safe and efficient removal of trees of any size. We handle dangerous trees, diseased trees, and trees that need to go for construction or landscaping projects.",
+        "icon": "TreeDeciduous",
+        "image": "https://images.unsplash.com/photo-1669065054992-3151b15aab08?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHwzfHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": "2",
+        "title": "Tree Trimming",
+        "description": "Expert pruning and trimming to maintain tree health, improve appearance, and prevent hazards. Regular maintenance keeps your trees beautiful and safe.",
+        "icon": "Scissors",
+        "image": "https://images.unsplash.com/photo-1765064519883-651c506ec70d?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHw0fHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": "3",
+        "title": "Stump Grinding",
+        "description": "Complete stump removal using professional grinding equipment. Reclaim your yard space and eliminate tripping hazards and pest habitats.",
+        "icon": "CircleDot",
+        "image": "https://images.unsplash.com/photo-1617143520628-86934f404d06?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjAzNzl8MHwxfHNlYXJjaHwyfHx0cmVlJTIwc3R1bXAlMjBncmluZGluZyUyMG1hY2hpbmUlMjBhY3Rpb258ZW58MHx8fHwxNzcxNDgyOTk4fDA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": "4",
+        "title": "Emergency Services",
+        "description": "24/7 emergency response for storm damage, fallen trees, and hazardous situations. We're here when you need us most.",
+        "icon": "AlertTriangle",
+        "image": "https://images.unsplash.com/photo-1765064520245-2baac5e82689?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHwxfHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "id": "5",
+        "title": "Land Clearing",
+        "description": "Complete site preparation for construction, landscaping, or agricultural use. We handle projects of any scale with professional equipment.",
+        "icon": "Mountain",
+        "image": "https://images.unsplash.com/photo-1642005581880-3536a680febf?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjAzNzl8MHwxfHNlYXJjaHwzfHx0cmVlJTIwc3R1bXAlMjBncmluZGluZyUyMG1hY2hpbmUlMjBhY3Rpb258ZW58MHx8fHwxNzcxNDgyOTk4fDA&ixlib=rb-4.1.0&q=85"
+    }
+]
+
+TESTIMONIALS = [
+    {
+        "id": "1",
+        "name": "Sarah Mitchell",
+        "location": "Shellharbour, NSW",
+        "rating": 5,
+        "review": "Illwarra Tree Removal removed a massive oak that was threatening our home. Their crew was professional, efficient, and left our yard spotless. Highly recommend!",
+        "service": "Tree Removal",
+        "date": "December 2025"
+    },
+    {
+        "id": "2",
+        "name": "James Rodriguez",
+        "location": "Oak Flats, NSW",
+        "rating": 5,
+        "review": "After the storm damaged several trees on our property, TimberGuard was there within hours. Their emergency response team saved us from further damage.",
+        "service": "Emergency Services",
+        "date": "June 2025"
+    },
+    {
+        "id": "3",
+        "name": "Emily Chen",
+        "location": "Farmborough Heights, NSW",
+        "rating": 5,
+        "review": "Professional stump grinding service! They removed five old stumps and now our backyard looks incredible. Fair pricing and excellent work.",
+        "service": "Stump Grinding",
+        "date": "October 2025"
+    },
+    {
+        "id": "4",
+        "name": "Michael Thompson",
+        "location": "Thirroul, NSW",
+        "rating": 5,
+        "review": "Regular tree trimming from TimberGuard keeps our property looking pristine. Their arborists really know their craft.",
+        "service": "Tree Trimming",
+        "date": "September 2025"
+    },
+    {
+        "id": "5",
+        "name": "Lisa Anderson",
+        "location": "Warilla, NSW",
+        "rating": 5,
+        "review": "They cleared 2 acres for our new construction project. Professional, on-time, and within budget. Will use again!",
+        "service": "Land Clearing",
+        "date": "August 2024"
+    }
+]
+
+GALLERY = [
+    {
+        "id": "1",
+        "title": "Oak Tree Removal",
+        "description": "Safe removal of a 60-foot oak near residential property",
+        "image_url": "https://images.unsplash.com/photo-1663697317598-319f0b5ef8b4?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwxfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
+        "category": "Tree Removal"
+    },
+    {
+        "id": "2",
+        "title": "Commercial Land Clearing",
+        "description": "5-acre commercial site preparation",
+        "image_url": "https://images.unsplash.com/photo-1634316888962-75074307f81c?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwyfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
+        "category": "Land Clearing"
+    },
+    {
+        "id": "3",
+        "title": "Storm Damage Cleanup",
+        "description": "Emergency response after major windstorm",
+        "image_url": "https://images.unsplash.com/photo-1596481768453-8befafc2d7ae?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwzfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
+        "category": "Emergency Services"
+    },
+    {
+        "id": "4",
+        "title": "Heritage Tree Pruning",
+        "description": "Expert pruning of 100-year-old maple",
+        "image_url": "https://images.unsplash.com/photo-1721217721953-14f4a916e018?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHw0fHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
+        "category": "Tree Trimming"
+    }
+]
+
+# ================ Precomputed Responses ================
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dump_json(payload) -> bytes:
+    if FAST_JSON:
+        return orjson.dumps(payload, default=json_default)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=json_default).encode('utf-8')
+
+def trusted_json(payload, headers: dict = None) -> Response:
+    """Serve data we built or stored ourselves without a second pass through the response model"""
+    if isinstance(payload, BaseModel):
+        body = payload.model_dump_json().encode('utf-8')
+    else:
+        body = dump_json(payload)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+class PrecomputedJSON:
+    """JSON payload encoded once, served with a strong ETag and 304 revalidation.
+
+    Bodies over the compression threshold are also compressed once per supported
+    encoding at the highest level, so these requests never pay for compression;
+    each encoding gets its own ETag as distinct representations must.
+    """
+
+    def __init__(self, payload, cache_control: str = None):
+        self.payload = payload
+        self.body = dump_json(payload)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.cache_control = cache_control or CATALOG_CACHE_CONTROL
+        # encoding -> (compressed body, ETag)
+        self.variants = {}
+        if COMPRESSION and len(self.body) >= COMPRESSION_MIN_BYTES:
+            for encoding in available_encodings():
+                level = 11 if encoding == "br" else 9
+                self.variants[encoding] = (compress(self.body, encoding, level), f'{self.etag[:-1]}-{encoding}"')
+
+    def response(self, request: Request) -> Response:
+        body, etag, encoding = self.body, self.etag, None
+        if self.variants:
+            encoding = choose_encoding(request.headers.get('accept-encoding'))
+            if encoding in self.variants:
+                body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if self.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding in self.variants:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+image_store = ImageStore(
+    IMAGE_SOURCE_DIR,
+    IMAGE_CACHE_DIR,
+    widths=IMAGE_WIDTHS,
+    max_cache_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    max_encodes=IMAGE_MAX_ENCODES,
+    base_url=IMAGE_BASE_URL,
+)
+
+def with_image_sources(catalog: str):
+    """Catalog builder that attaches srcsets for items with a local source image"""
+    def build(items: List[dict]) -> PrecomputedJSON:
+        for item in items:
+            image_id = item.get("image_id") or f"{catalog}-{item['id']}"
+            sources = image_store.sources(image_id)
+            item["image_id"] = image_id if sources else item.get("image_id")
+            item["image_sources"] = sources
+        return PrecomputedJSON(items)
+    return build
+
+# Catalogs are validated and encoded when loaded from Mongo; handlers only pick the cached bytes
+catalogs = {
+    "services": CatalogCache("services", Service, SERVICES, with_image_sources("services"), ttl=CATALOG_CACHE_TTL),
+    "testimonials": CatalogCache("testimonials", Testimonial, TESTIMONIALS, PrecomputedJSON, ttl=CATALOG_CACHE_TTL),
+    "gallery": CatalogCache("gallery", GalleryItem, GALLERY, with_image_sources("gallery"), ttl=CATALOG_CACHE_TTL),
+}
 
 # ================ Email Helper ================
 
-async def send_notification_email(subject: str, html_content: str):
-    """Send notification email using Resend"""
-    if not resend.api_key or not NOTIFICATION_EMAIL:
-        logger.warning("Email not configured - skipping notification")
-        return None
-    
+async def send_notification_email(message: dict):
+    """Send one outbox message using Resend; raises so the outbox can retry"""
     params = {
         "from": SENDER_EMAIL,
         "to": [NOTIFICATION_EMAIL],
-        "subject": subject,
-        "html": html_content
+        "subject": message["subject"],
+        "html": message["html"]
     }
+    if message.get("text"):
+        params["text"] = message["text"]
     
+    started = time.perf_counter()
     try:
         email = await asyncio.to_thread(resend.Emails.send, params)
-        logger.info(f"Email sent successfully: {email.get('id')}")
-        return email
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
+    except Exception:
+        EMAIL_SEND_SECONDS.labels("error").observe(time.perf_counter() - started)
+        raise
+    EMAIL_SEND_SECONDS.labels("success").observe(time.perf_counter() - started)
+    logger.info(f"Email sent successfully: {email.get('id')}")
+    return email
+
+email_outbox = EmailOutbox(
+    None,
+    send_notification_email,
+    render_notification,
+    batch_size=EMAIL_BATCH_SIZE,
+    max_attempts=EMAIL_MAX_ATTEMPTS,
+    digest_threshold=EMAIL_DIGEST_THRESHOLD,
+)
+
+async def queue_notification(kind: str, leads: List[BaseModel]):
+    """Queue a notification about new leads; the dispatcher renders and sends it"""
+    if not resend.api_key or not NOTIFICATION_EMAIL:
+        logger.warning("Email not configured - skipping notification")
         return None
+    return await email_outbox.enqueue(kind, [lead.model_dump() for lead in leads])
+
+# ================ Indexes ================
+
+# Every list query sorts by LEAD_SORT, so filters lead with the equality field
+INDEXES = {
+    "quotes": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("service", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("zone", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("dedup_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("email_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("phone_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel(
+            [("name", TEXT), ("email", TEXT), ("address", TEXT), ("message", TEXT)],
+            weights={"name": 10, "email": 8, "address": 4, "message": 1}, name="lead_search",
+        ),
+    ],
+    "bookings": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("service", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("zone", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("preferred_date", ASCENDING), ("preferred_time", ASCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("dedup_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("email_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("phone_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel(
+            [("name", TEXT), ("email", TEXT), ("address", TEXT), ("notes", TEXT)],
+            weights={"name": 10, "email": 8, "address": 4, "notes": 1}, name="lead_search",
+        ),
+    ],
+    "contacts": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("dedup_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("email_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("phone_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel(
+            [("name", TEXT), ("email", TEXT), ("subject", TEXT), ("message", TEXT)],
+            weights={"name": 10, "email": 8, "subject": 4, "message": 1}, name="lead_search",
+        ),
+    ],
+    "idempotency_keys": [
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel(
+            [("sent_at", ASCENDING)], expireAfterSeconds=EMAIL_OUTBOX_SENT_TTL_SECONDS,
+            partialFilterExpression={"status": "sent"}, name="sent_ttl",
+        ),
+        IndexModel(
+            [("failed_at", ASCENDING)], expireAfterSeconds=EMAIL_OUTBOX_FAILED_TTL_SECONDS,
+            partialFilterExpression={"status": "failed"}, name="failed_ttl",
+        ),
+    ],
+    "booking_slots": [
+        IndexModel([("date", ASCENDING), ("time", ASCENDING)], unique=True),
+    ],
+    "services": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("position", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "testimonials": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("position", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "gallery": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("position", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "lead_daily_stats": [
+        IndexModel([("day", ASCENDING), ("kind", ASCENDING)]),
+    ],
+}
+
+async def ensure_indexes():
+    """Create any missing indexes; existing ones are left untouched"""
+    for name, indexes in INDEXES.items():
+        await db[name].create_indexes(indexes)
+    logger.info(f"Indexes ensured for: {', '.join(INDEXES)}")
+
+# ================ Booking Availability ================
+
+# Crew time windows offered by the booking calendar, in display order
+BOOKING_TIME_SLOTS = [
+    "8:00 AM - 10:00 AM",
+    "10:00 AM - 12:00 PM",
+    "12:00 PM - 2:00 PM",
+    "2:00 PM - 4:00 PM",
+    "4:00 PM - 6:00 PM",
+]
+BOOKING_CLOSED_WEEKDAYS = {6}  # Sunday
+
+# (date_from, date_to) -> (expires_at, PrecomputedJSON); cleared on every reservation
+availability_cache = {}
+
+def business_today() -> date:
+    return datetime.now(BUSINESS_TIMEZONE).date()
+
+def is_bookable_day(day: date) -> bool:
+    return day >= business_today() and day.weekday() not in BOOKING_CLOSED_WEEKDAYS
+
+def parse_booking_slot(preferred_date: str, preferred_time: str) -> date:
+    """Validate a requested slot against the calendar rules"""
+    try:
+        day = date.fromisoformat(preferred_date)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="preferred_date must be formatted YYYY-MM-DD")
+    if preferred_time not in BOOKING_TIME_SLOTS:
+        raise HTTPException(status_code=422, detail="preferred_time is not a bookable time slot")
+    if not is_bookable_day(day):
+        raise HTTPException(status_code=422, detail="preferred_date is not a bookable day")
+    return day
+
+async def reserve_slot(day: date, slot: str) -> bool:
+    """Take one crew from a slot; the capacity check and decrement are a single update"""
+    key = {"date": day.isoformat(), "time": slot}
+    try:
+        await db.booking_slots.update_one(
+            key,
+            {"$setOnInsert": {"capacity": BOOKING_CREWS_PER_SLOT, "remaining": BOOKING_CREWS_PER_SLOT}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # A concurrent request created the slot first
+        pass
+    result = await db.booking_slots.update_one(
+        {**key, "remaining": {"$gt": 0}},
+        {"$inc": {"remaining": -1}},
+    )
+    availability_cache.clear()
+    return result.modified_count == 1
+
+async def release_slot(day: date, slot: str):
+    await db.booking_slots.update_one({"date": day.isoformat(), "time": slot}, {"$inc": {"remaining": 1}})
+    availability_cache.clear()
+
+async def compute_availability(date_from: date, date_to: date) -> dict:
+    remaining = {}
+    cursor = db.booking_slots.find(
+        {"date": {"$gte": date_from.isoformat(), "$lte": date_to.isoformat()}},
+        {"_id": 0, "date": 1, "time": 1, "remaining": 1},
+    )
+    async for slot in cursor:
+        remaining[(slot["date"], slot["time"])] = slot["remaining"]
+
+    days = []
+    for offset in range((date_to - date_from).days + 1):
+        day = (date_from + timedelta(days=offset)).isoformat()
+        bookable = is_bookable_day(date_from + timedelta(days=offset))
+        slots = [
+            {"time": slot, "remaining": max(remaining.get((day, slot), BOOKING_CREWS_PER_SLOT), 0) if bookable else 0}
+            for slot in BOOKING_TIME_SLOTS
+        ]
+        days.append({"date": day, "available": any(s["remaining"] for s in slots), "slots": slots})
+    return {"capacity": BOOKING_CREWS_PER_SLOT, "time_slots": BOOKING_TIME_SLOTS, "days": days}
+
+async def get_cached_availability(date_from: date, date_to: date) -> "PrecomputedJSON":
+    key = (date_from, date_to)
+    cached = availability_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+    payload = PrecomputedJSON(
+        await compute_availability(date_from, date_to),
+        cache_control=f"public, max-age={int(AVAILABILITY_CACHE_TTL)}",
+    )
+    if len(availability_cache) > 256:
+        availability_cache.clear()
+    availability_cache[key] = (now + AVAILABILITY_CACHE_TTL, payload)
+    return payload
+
+# ================ Bootstrap ================
+
+# (ETags of the parts) -> PrecomputedJSON; only the current combination is kept
+bootstrap_cache = {}
+
+async def get_bootstrap() -> PrecomputedJSON:
+    """Catalogs and booking availability as one document, re-encoded only when a part changes"""
+    today = business_today()
+    parts = {name: await cache.get() for name, cache in catalogs.items()}
+    parts["availability"] = await get_cached_availability(
+        today, today + timedelta(days=BOOTSTRAP_AVAILABILITY_DAYS - 1),
+    )
+    key = tuple(part.etag for part in parts.values())
+    document = bootstrap_cache.get(key)
+    if document is None:
+        version = hashlib.sha256("".join(key).encode('utf-8')).hexdigest()[:16]
+        document = PrecomputedJSON(
+            {"version": version, **{name: part.payload for name, part in parts.items()}},
+            # Availability is the most volatile part, so it sets the freshness of the whole
+            cache_control=parts["availability"].cache_control,
+        )
+        bootstrap_cache.clear()
+        bootstrap_cache[key] = document
+    return document
+
+# ================ Duplicate Suppression ================
+
+# Internal lookup keys stored on lead documents but never returned to clients
+LEAD_PROJECTION = {"_id": 0, "email_key": 0, "phone_key": 0, "dedup_key": 0}
+
+def normalize_email(email: str) -> str:
+    return (email or '').strip().lower()
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, with +61 numbers folded into the local 0 prefix"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('61') and len(digits) == 11:
+        digits = '0' + digits[2:]
+    return digits
+
+def lead_keys(obj, *fields: str) -> dict:
+    """Normalized contact keys plus a fingerprint of who asked for what"""
+    email_key = normalize_email(obj.email)
+    phone_key = normalize_phone(obj.phone)
+    parts = [email_key, phone_key] + [' '.join(str(getattr(obj, f) or '').lower().split()) for f in fields]
+    return {
+        "email_key": email_key,
+        "phone_key": phone_key,
+        "dedup_key": hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest(),
+    }
+
+def tag_service_area(lead):
+    """Set a lead's suburb, postcode and zone from its address; out-of-area leads are kept untagged"""
+    location = service_area.locate(lead.address)
+    lead.suburb = location.suburb if location else None
+    lead.postcode = location.postcode if location else None
+    lead.zone = location.zone if location else None
+    return lead
+
+async def find_replay(collection, idempotency_key: Optional[str], dedup_key: str, entity_id: str) -> Optional[dict]:
+    """Return the original lead for a repeated submission, or None once this one may proceed.
+
+    An Idempotency-Key is claimed for `entity_id` so concurrent retries of the
+    same request resolve to a single lead.
+    """
+    claim_id = f"{collection.name}:{idempotency_key}" if idempotency_key else None
+    if claim_id:
+        claim = await db.idempotency_keys.find_one({"_id": claim_id})
+        if claim is None:
+            try:
+                await db.idempotency_keys.insert_one(
+                    {"_id": claim_id, "entity_id": entity_id, "created_at": datetime.now(timezone.utc)}
+                )
+            except DuplicateKeyError:
+                claim = await db.idempotency_keys.find_one({"_id": claim_id})
+        if claim is not None:
+            original = await collection.find_one({"id": claim["entity_id"]}, LEAD_PROJECTION)
+            if original is None:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+            return original
+
+    since = datetime.now(timezone.utc) - timedelta(seconds=DEDUP_WINDOW_SECONDS)
+    duplicate = await collection.find_one(
+        {"dedup_key": dedup_key, "created_at": {"$gte": since}},
+        LEAD_PROJECTION,
+        sort=[("created_at", -1)],
+    )
+    if duplicate is not None and claim_id:
+        await db.idempotency_keys.update_one({"_id": claim_id}, {"$set": {"entity_id": duplicate["id"]}})
+    return duplicate
+
+lead_insert_buffer = InsertBuffer(LEAD_WRITE_BUFFER_MAX_DOCS, LEAD_WRITE_BUFFER_MS / 1000) if LEAD_WRITE_BUFFER else None
+
+async def insert_lead(collection, doc: dict):
+    """insert_one, or a place in the next group commit when LEAD_WRITE_BUFFER is on"""
+    if lead_insert_buffer is not None:
+        await lead_insert_buffer.insert(collection, doc)
+    else:
+        await collection.insert_one(doc)
+
+async def release_idempotency_key(collection, idempotency_key: Optional[str]):
+    """Forget a claim whose request failed, so the client's retry can succeed"""
+    if idempotency_key:
+        await db.idempotency_keys.delete_one({"_id": f"{collection.name}:{idempotency_key}"})
+
+# ================ Access Control ================
+
+def bearer_token_matches(authorization: Optional[str], tokens: List[str]) -> bool:
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return False
+    # Compare against every token so timing says nothing about which one nearly matched
+    matched = False
+    for expected in tokens:
+        matched |= hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+    return matched
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not bearer_token_matches(authorization, [ADMIN_API_TOKEN]):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+def require_partner(authorization: Optional[str] = Header(None)):
+    """Partner feeds write leads in bulk, past the per-client limits, so they need a token"""
+    tokens = PARTNER_API_TOKENS + ([ADMIN_API_TOKEN] if ADMIN_API_TOKEN else [])
+    if not tokens:
+        raise HTTPException(status_code=403, detail="Partner API is disabled")
+    if not bearer_token_matches(authorization, tokens):
+        raise HTTPException(status_code=401, detail="Invalid partner token", headers={"WWW-Authenticate": "Bearer"})
+
+def sign_stream_token(expires: int) -> str:
+    """`<expiry>.<hmac>` keyed on the admin token, so rotating it revokes every stream token"""
+    signature = hmac.new(ADMIN_API_TOKEN.encode('utf-8'), f"lead-stream:{expires}".encode('ascii'), hashlib.sha256)
+    return f"{expires}.{signature.hexdigest()}"
+
+def valid_stream_token(token: str) -> bool:
+    expires, _, _ = token.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), sign_stream_token(int(expires)).encode('utf-8'))
+
+def require_stream_access(
+    token: Optional[str] = Query(None, max_length=200),
+    authorization: Optional[str] = Header(None),
+):
+    """The admin bearer token, or a short-lived stream token in the query string"""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if token and valid_stream_token(token):
+        return
+    require_admin(authorization)
+
+# ================ Rate Limiting ================
+
+if RATE_LIMIT_STORE == 'mongo':
+    rate_limit_store = MongoRateLimitStore(None)
+else:
+    rate_limit_store = MemoryRateLimitStore()
+
+def client_ip(request: Request) -> str:
+    """The address our trusted proxies saw, so a spoofed X-Forwarded-For is ignored"""
+    forwarded = request.headers.get('x-forwarded-for')
+    if forwarded and RATE_LIMIT_PROXY_HOPS:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(RATE_LIMIT_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else 'unknown'
+
+async def enforce_rate_limit(bucket: str, key: str, limit: RateLimit):
+    allowed, retry_after = await rate_limit_store.hit(f"{bucket}:{key}", limit)
+    if not allowed:
+        RATE_LIMITED.labels(bucket).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions, please try again later",
+            headers={"Retry-After": retry_after_header(retry_after)},
+        )
+
+async def limit_lead_submissions(request: Request):
+    """Cheap rejections that run before the body is validated into a model"""
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > FORM_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Request body too large")
+    await enforce_rate_limit("ip", client_ip(request), RATE_LIMIT_IP)
+    try:
+        body = await request.json()
+    except ValueError:
+        # Malformed JSON is reported by the normal validation path
+        return
+    email = body.get('email') if isinstance(body, dict) else None
+    if isinstance(email, str) and email.strip():
+        await enforce_rate_limit("email", normalize_email(email), RATE_LIMIT_EMAIL)
+
+# ================ Lead Listing ================
+
+# Newest first; id breaks ties between leads created in the same instant
+LEAD_SORT = [("created_at", -1), ("id", -1)]
+
+def stored_created_at(value: datetime) -> datetime:
+    """Normalize a datetime to the UTC BSON date stored in `created_at`"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def encode_page_cursor(doc: dict) -> str:
+    created_at = stored_created_at(doc['created_at']).isoformat()
+    raw = json.dumps([created_at, doc['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_page_cursor(token: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, lead_id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(lead_id, str):
+            raise ValueError(token)
+        return stored_created_at(datetime.fromisoformat(created_at)), lead_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def lead_query(
+    service: Optional[str] = None,
+    status: Optional[str] = None,
+    zone: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """Mongo filter for a page of leads, matching the LEAD_SORT keyset"""
+    clauses = []
+    if service:
+        clauses.append({"service": service})
+    if status:
+        clauses.append({"status": status})
+    if zone:
+        clauses.append({"zone": zone})
+    created_range = {}
+    if date_from:
+        created_range["$gte"] = stored_created_at(date_from)
+    if date_to:
+        created_range["$lt"] = stored_created_at(date_to)
+    if created_range:
+        clauses.append({"created_at": created_range})
+    if cursor:
+        created_at, lead_id = decode_page_cursor(cursor)
+        clauses.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": lead_id}},
+        ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+async def list_leads(collection, query: dict, limit: Optional[int], format: str):
+    """Serve stored leads without revalidating them through the response models.
+
+    JSON returns one page and sets `X-Next-Cursor` when more rows follow;
+    NDJSON streams rows straight off the Motor cursor.
+    """
+    if format == "ndjson":
+        cursor = collection.find(query, LEAD_PROJECTION).sort(LEAD_SORT).batch_size(STREAM_BATCH_SIZE)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        async def rows():
+            count = 0
+            try:
+                async for doc in cursor:
+                    count += 1
+                    yield dump_json(doc) + b'\n'
+            finally:
+                LIST_DOCUMENTS.labels(collection.name, format).observe(count)
+
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    limit = limit or LIST_PAGE_SIZE
+    docs = await collection.find(query, LEAD_PROJECTION).sort(LEAD_SORT).limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_page_cursor(docs[-1])
+    LIST_DOCUMENTS.labels(collection.name, format).observe(len(docs))
+    return Response(content=dump_json(docs), media_type="application/json", headers=headers)
+
+# ================ Lead Export ================
+
+EXPORT_MODELS = {"quotes": QuoteRequest, "bookings": Booking, "contacts": ContactMessage}
+
+# Leading characters a spreadsheet would evaluate as a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# Numbers and phone numbers such as "+61 412 345 678" are safe and must reach the CRM untouched
+CSV_PLAIN_NUMBER = re.compile(r'[+-]?[\d\s().-]+')
+
+def csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return stored_created_at(value).isoformat().replace("+00:00", "Z")
+    text = str(value)
+    # Lead fields come from public forms; quote anything that would open as a live formula
+    if isinstance(value, str) and text.startswith(CSV_FORMULA_PREFIXES) and not CSV_PLAIN_NUMBER.fullmatch(text):
+        return "'" + text
+    return text
+
+async def export_chunks(cursor, fields: List[str], format: str, metric_label: str):
+    """Encode rows off the cursor, yielding ~EXPORT_CHUNK_BYTES at a time so memory stays flat"""
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    parts, size = [], 0
+    if format == "csv":
+        writer.writerow(fields)
+    try:
+        async for doc in cursor:
+            count += 1
+            if format == "csv":
+                writer.writerow([csv_value(doc.get(field)) for field in fields])
+                row = buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                row = dump_json(doc) + b'\n'
+            parts.append(row)
+            size += len(row)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield b"".join(parts)
+                parts, size = [], 0
+        if format == "csv":
+            parts.insert(0, buffer.getvalue().encode('utf-8'))
+        yield b"".join(parts)
+    finally:
+        LIST_DOCUMENTS.labels(metric_label, format).observe(count)
+
+# ================ Lead Search ================
+
+LEAD_COLLECTIONS = {"quote": "quotes", "booking": "bookings", "contact": "contacts"}
+# Exact email and phone hits outrank any text match
+SEARCH_KEY_SCORE = 100.0
+SEARCH_PHONE_MIN_DIGITS = 6
+
+def phone_search_prefix(q: str) -> str:
+    digits = re.sub(r'\D', '', q)
+    if digits.startswith('61') and (q.lstrip().startswith('+') or len(digits) == 11):
+        digits = '0' + digits[2:]
+    return digits
+
+def search_filter(q: str) -> tuple:
+    """Returns (filter, uses_text_score) for a search string.
+
+    Email addresses and phone numbers (whole or a leading part) go to the
+    normalized key indexes; everything else is a weighted text search over
+    names, emails, addresses and message bodies. Leads stored before the keys
+    existed are found by their raw email until backfill_lead_keys.py has run.
+    """
+    q = q.strip()
+    if '@' in q and ' ' not in q:
+        email_key = normalize_email(q)
+        return {"$or": [{"email_key": email_key}, {"email": {"$in": sorted({q, email_key})}}]}, False
+    if re.fullmatch(r'[\d\s()+.-]+', q) and len(re.sub(r'\D', '', q)) >= SEARCH_PHONE_MIN_DIGITS:
+        return {"phone_key": {"$regex": f"^{re.escape(phone_search_prefix(q))}"}}, False
+    return {"$text": {"$search": q}}, True
+
+async def search_collection(kind: str, query: dict, scored: bool, fetch: int) -> List[dict]:
+    collection = db[LEAD_COLLECTIONS[kind]]
+    if scored:
+        projection = {**LEAD_PROJECTION, "score": {"$meta": "textScore"}}
+        sort = [("score", {"$meta": "textScore"})] + LEAD_SORT
+    else:
+        projection, sort = LEAD_PROJECTION, LEAD_SORT
+    docs = await collection.find(query, projection).sort(sort).limit(fetch).to_list(fetch)
+    for doc in docs:
+        doc["type"] = kind
+        doc["score"] = round(doc["score"], 3) if scored else SEARCH_KEY_SCORE
+    return docs
+
+async def run_lead_search(q: str, offset: int, limit: int) -> tuple:
+    """Top `offset + limit` matches from each collection, merged by score then recency.
+
+    Returns (page, has_more). Each collection only ever returns its own best
+    rows, so a page never needs more than `offset + limit + 1` rows from any one.
+    """
+    query, scored = search_filter(q)
+    fetch = offset + limit + 1
+    per_kind = await asyncio.gather(*(search_collection(kind, query, scored, fetch) for kind in LEAD_COLLECTIONS))
+    merged = sorted(
+        (doc for docs in per_kind for doc in docs),
+        key=lambda doc: (doc["score"], doc["created_at"], doc["id"]),
+        reverse=True,
+    )
+    return merged[offset:offset + limit], len(merged) > offset + limit
+
+# ================ Analytics ================
+
+lead_rollups = LeadRollups(
+    None,
+    BUSINESS_TIMEZONE,
+    refresh_days=STATS_REFRESH_DAYS,
+    refresh_interval=STATS_REFRESH_SECONDS,
+)
+
+def stats_range(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+) -> tuple:
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= STATS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {STATS_MAX_DAYS} days")
+    return date_from, date_to
+
+# ================ Live Lead Feed ================
+
+lead_feed = LeadFeed(
+    None,
+    LEAD_COLLECTIONS,
+    hidden_fields=LEAD_PROJECTION,
+    mode=LEAD_FEED_MODE,
+    queue_size=SSE_QUEUE_SIZE,
+    replay_limit=SSE_REPLAY_LIMIT,
+)
+
+async def announce_leads(kind: str, leads: List[BaseModel]):
+    """Hand newly stored leads to the rollups, the live feed and the notification queue"""
+    docs = [lead.model_dump() for lead in leads]
+    await lead_rollups.record(kind, docs)
+    lead_feed.publish(kind, docs)
+    await queue_notification(kind, leads)
+
+# ================ Bulk Ingestion ================
+
+async def iter_bulk_rows(request: Request):
+    """Yield (row, error) pairs from a JSON array body or an NDJSON stream.
+
+    NDJSON is parsed line by line as it arrives, so large feeds never sit in
+    memory as a whole.
+    """
+    content_type = request.headers.get('content-type', '')
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        buffer = b''
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield parse_ndjson_line(line)
+        if buffer.strip():
+            yield parse_ndjson_line(buffer)
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for row in rows:
+        yield row, None
+
+def parse_ndjson_line(line: bytes):
+    try:
+        return json.loads(line), None
+    except ValueError:
+        return None, "Line is not valid JSON"
+
+async def ingest_bulk(request: Request, collection, create_model, entity_model, dedup_fields=(), reserve=None, release=None) -> tuple:
+    """Validate rows with `create_model` and insert them in unordered chunks.
+
+    `reserve(obj)` may return an error string to reject a row before insert;
+    `release(obj)` undoes it when the insert fails. Returns the response
+    payload and the list of created entities.
+    """
+    results = []
+    created = []
+    pending = []
+    truncated = False
+
+    async def flush():
+        failed = {}
+        try:
+            await collection.insert_many([doc for _, _, doc in pending], ordered=False)
+        except BulkWriteError as e:
+            failed = {err['index']: err.get('errmsg', 'Write failed') for err in e.details.get('writeErrors', [])}
+        for position, (index, obj, _) in enumerate(pending):
+            if position in failed:
+                results.append({"index": index, "status": "error", "detail": failed[position]})
+                if release:
+                    await release(obj)
+            else:
+                results.append({"index": index, "status": "created", "id": obj.id})
+                created.append(obj)
+        pending.clear()
+
+    index = -1
+    async for row, error in iter_bulk_rows(request):
+        index += 1
+        if index >= BULK_MAX_ROWS:
+            truncated = True
+            break
+        if error:
+            results.append({"index": index, "status": "invalid", "errors": [{"msg": error}]})
+            continue
+        try:
+            obj = entity_model(**create_model.model_validate(row).model_dump())
+            if "zone" in entity_model.model_fields:
+                tag_service_area(obj)
+        except ValidationError as e:
+            results.append({"index": index, "status": "invalid", "errors": json.loads(e.json(include_url=False))})
+            continue
+        if reserve:
+            rejection = await reserve(obj)
+            if rejection:
+                results.append({"index": index, "status": "rejected", "detail": rejection})
+                continue
+        pending.append((index, obj, {**obj.model_dump(), **lead_keys(obj, *dedup_fields)}))
+        if len(pending) >= BULK_CHUNK_SIZE:
+            await flush()
+    if pending:
+        await flush()
+
+    results.sort(key=lambda r: r["index"])
+    payload = {
+        "received": index + 1 - int(truncated),
+        "created": len(created),
+        "failed": len(results) - len(created),
+        "truncated": truncated,
+        "results": results,
+    }
+    return payload, created
 
 # ================ Routes ================
 
@@ -148,244 +1251,462 @@ async def root():
     return {"message": "Illawarra Tree Removal API"}
 
 # Quote Request Routes
-@api_router.post("/quotes", response_model=QuoteRequest)
-async def create_quote_request(input: QuoteRequestCreate):
-    quote_obj = QuoteRequest(**input.model_dump())
-    doc = quote_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+QUOTE_DEDUP_FIELDS = ("service", "address")
+
+@api_router.post("/quotes", response_model=QuoteRequest, dependencies=[Depends(limit_lead_submissions)])
+async def create_quote_request(
+    input: QuoteRequestCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    quote_obj = tag_service_area(QuoteRequest(**input.model_dump()))
+    keys = lead_keys(quote_obj, *QUOTE_DEDUP_FIELDS)
+    original = await find_replay(db.quotes, idempotency_key, keys["dedup_key"], quote_obj.id)
+    if original:
+        return trusted_json(original, headers={"Idempotent-Replayed": "true"})
+
+    doc = {**quote_obj.model_dump(), **keys}
     
-    await db.quotes.insert_one(doc)
+    try:
+        await insert_lead(db.quotes, doc)
+    except Exception:
+        await release_idempotency_key(db.quotes, idempotency_key)
+        raise
     
-    # Send email notification
-    html_content = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f0;">
-        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-left: 4px solid #F97316;">
-            <h2 style="color: #1A3C34; margin-bottom: 20px;">New Quote Request</h2>
-            <p><strong>Name:</strong> {quote_obj.name}</p>
-            <p><strong>Email:</strong> {quote_obj.email}</p>
-            <p><strong>Phone:</strong> {quote_obj.phone}</p>
-            <p><strong>Service:</strong> {quote_obj.service}</p>
-            <p><strong>Address:</strong> {quote_obj.address}</p>
-            <p><strong>Message:</strong> {quote_obj.message or 'N/A'}</p>
-            <hr style="border: none; border-top: 1px solid #e5e5e0; margin: 20px 0;">
-            <p style="color: #5A5A55; font-size: 12px;">Illawarra Tree Removal - Lead Notification</p>
-        </div>
-    </body>
-    </html>
-    """
-    await send_notification_email(f"New Quote Request from {quote_obj.name}", html_content)
+    await announce_leads("quote", [quote_obj])
     
-    return quote_obj
+    return trusted_json(quote_obj)
+
+@api_router.post("/quotes/bulk", dependencies=[Depends(require_partner)])
+async def create_quote_requests_bulk(request: Request):
+    payload, created = await ingest_bulk(
+        request, db.quotes, QuoteRequestCreate, QuoteRequest, dedup_fields=QUOTE_DEDUP_FIELDS,
+    )
+    if created:
+        await announce_leads("quote", created)
+    return payload
 
-@api_router.get("/quotes", response_model=List[QuoteRequest])
-async def get_quotes():
-    quotes = await db.quotes.find({}, {"_id": 0}).to_list(1000)
-    for q in quotes:
-        if isinstance(q.get('created_at'), str):
-            q['created_at'] = datetime.fromisoformat(q['created_at'])
-    return quotes
+@api_router.get("/quotes", response_model=List[QuoteRequest], dependencies=[Depends(require_admin)])
+async def get_quotes(
+    service: Optional[str] = None,
+    zone: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_PAGE_SIZE),
+    format: Literal["json", "ndjson"] = "json",
+):
+    query = lead_query(service=service, zone=zone, date_from=date_from, date_to=date_to, cursor=cursor)
+    return await list_leads(db.quotes, query, limit, format)
 
 # Booking Routes
-@api_router.post("/bookings", response_model=Booking)
-async def create_booking(input: BookingCreate):
-    booking_obj = Booking(**input.model_dump())
-    doc = booking_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+BOOKING_DEDUP_FIELDS = ("service", "address", "preferred_date", "preferred_time")
+
+@api_router.post("/bookings", response_model=Booking, dependencies=[Depends(limit_lead_submissions)])
+async def create_booking(
+    input: BookingCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    day = parse_booking_slot(input.preferred_date, input.preferred_time)
+    booking_obj = tag_service_area(Booking(**input.model_dump()))
+    keys = lead_keys(booking_obj, *BOOKING_DEDUP_FIELDS)
+    original = await find_replay(db.bookings, idempotency_key, keys["dedup_key"], booking_obj.id)
+    if original:
+        return trusted_json(original, headers={"Idempotent-Replayed": "true"})
+
+    if not await reserve_slot(day, input.preferred_time):
+        await release_idempotency_key(db.bookings, idempotency_key)
+        raise HTTPException(status_code=409, detail="That time slot is fully booked, please choose another")
+
+    doc = {**booking_obj.model_dump(), **keys}
     
-    await db.bookings.insert_one(doc)
+    try:
+        await insert_lead(db.bookings, doc)
+    except Exception:
+        await release_slot(day, input.preferred_time)
+        await release_idempotency_key(db.bookings, idempotency_key)
+        raise
     
-    # Send email notification
-    html_content = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f0;">
-        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-left: 4px solid #F97316;">
-            <h2 style="color: #1A3C34; margin-bottom: 20px;">New Booking Request</h2>
-            <p><strong>Name:</strong> {booking_obj.name}</p>
-            <p><strong>Email:</strong> {booking_obj.email}</p>
-            <p><strong>Phone:</strong> {booking_obj.phone}</p>
-            <p><strong>Service:</strong> {booking_obj.service}</p>
-            <p><strong>Address:</strong> {booking_obj.address}</p>
-            <p><strong>Preferred Date:</strong> {booking_obj.preferred_date}</p>
-            <p><strong>Preferred Time:</strong> {booking_obj.preferred_time}</p>
-            <p><strong>Notes:</strong> {booking_obj.notes or 'N/A'}</p>
-            <hr style="border: none; border-top: 1px solid #e5e5e0; margin: 20px 0;">
-            <p style="color: #5A5A55; font-size: 12px;">Illawarra Tree Removal - Booking Notification</p>
-        </div>
-    </body>
-    </html>
-    """
-    await send_notification_email(f"New Booking from {booking_obj.name}", html_content)
+    await announce_leads("booking", [booking_obj])
     
-    return booking_obj
+    return trusted_json(booking_obj)
+
+@api_router.post("/bookings/bulk", dependencies=[Depends(require_partner)])
+async def create_bookings_bulk(request: Request):
+    async def reserve(booking: Booking) -> Optional[str]:
+        try:
+            day = parse_booking_slot(booking.preferred_date, booking.preferred_time)
+        except HTTPException as e:
+            return e.detail
+        if not await reserve_slot(day, booking.preferred_time):
+            return "That time slot is fully booked"
+        return None
+
+    async def release(booking: Booking):
+        await release_slot(date.fromisoformat(booking.preferred_date), booking.preferred_time)
 
-@api_router.get("/bookings", response_model=List[Booking])
-async def get_bookings():
-    bookings = await db.bookings.find({}, {"_id": 0}).to_list(1000)
-    for b in bookings:
-        if isinstance(b.get('created_at'), str):
-            b['created_at'] = datetime.fromisoformat(b['created_at'])
-    return bookings
+    payload, created = await ingest_bulk(
+        request, db.bookings, BookingCreate, Booking, dedup_fields=BOOKING_DEDUP_FIELDS, reserve=reserve, release=release,
+    )
+    if created:
+        await announce_leads("booking", created)
+    return payload
+
+@api_router.get("/bookings", response_model=List[Booking], dependencies=[Depends(require_admin)])
+async def get_bookings(
+    service: Optional[str] = None,
+    status: Optional[str] = None,
+    zone: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_PAGE_SIZE),
+    format: Literal["json", "ndjson"] = "json",
+):
+    query = lead_query(service=service, status=status, zone=zone, date_from=date_from, date_to=date_to, cursor=cursor)
+    return await list_leads(db.bookings, query, limit, format)
+
+# Availability Routes
+@api_router.get("/availability")
+async def get_availability(
+    request: Request,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+):
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {AVAILABILITY_MAX_DAYS} days")
+    payload = await get_cached_availability(date_from, date_to)
+    return payload.response(request)
+
+@api_router.get("/bootstrap")
+async def get_bootstrap_document(request: Request):
+    """Everything the landing page renders on load: services, testimonials, gallery and availability"""
+    return (await get_bootstrap()).response(request)
+
+# Service Area Routes
+def service_area_json(suburb) -> dict:
+    return {"suburb": suburb.name, "postcode": suburb.postcode, "zone": suburb.zone}
+
+@api_router.get("/service-area")
+async def get_service_area(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=20),
+):
+    """Autocomplete a suburb or postcode, and say whether the query is somewhere we service"""
+    exact = service_area.exact(q)
+    if not exact:
+        # A whole typed address: validate the suburb or postcode found in it
+        location = service_area.locate(q)
+        if location and location.suburb:
+            exact = service_area.exact(location.suburb)
+        elif location:
+            exact = service_area.exact(location.postcode)
+    return trusted_json(
+        {
+            "q": q,
+            "serviced": bool(exact),
+            "exact": [service_area_json(suburb) for suburb in exact],
+            "matches": [service_area_json(suburb) for suburb in service_area.search(q, limit)],
+        },
+        headers={"Cache-Control": CATALOG_CACHE_CONTROL},
+    )
 
 # Contact Routes
-@api_router.post("/contact", response_model=ContactMessage)
-async def create_contact(input: ContactMessageCreate):
+CONTACT_DEDUP_FIELDS = ("subject", "message")
+
+@api_router.post("/contact", response_model=ContactMessage, dependencies=[Depends(limit_lead_submissions)])
+async def create_contact(
+    input: ContactMessageCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
     contact_obj = ContactMessage(**input.model_dump())
-    doc = contact_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    keys = lead_keys(contact_obj, *CONTACT_DEDUP_FIELDS)
+    original = await find_replay(db.contacts, idempotency_key, keys["dedup_key"], contact_obj.id)
+    if original:
+        return trusted_json(original, headers={"Idempotent-Replayed": "true"})
+
+    doc = {**contact_obj.model_dump(), **keys}
     
-    await db.contacts.insert_one(doc)
+    try:
+        await insert_lead(db.contacts, doc)
+    except Exception:
+        await release_idempotency_key(db.contacts, idempotency_key)
+        raise
     
-    # Send email notification
-    html_content = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f0;">
-        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-left: 4px solid #F97316;">
-            <h2 style="color: #1A3C34; margin-bottom: 20px;">New Contact Message</h2>
-            <p><strong>Name:</strong> {contact_obj.name}</p>
-            <p><strong>Email:</strong> {contact_obj.email}</p>
-            <p><strong>Phone:</strong> {contact_obj.phone or 'N/A'}</p>
-            <p><strong>Subject:</strong> {contact_obj.subject}</p>
-            <p><strong>Message:</strong> {contact_obj.message}</p>
-            <hr style="border: none; border-top: 1px solid #e5e5e0; margin: 20px 0;">
-            <p style="color: #5A5A55; font-size: 12px;">Illawarra Tree Removal - Contact Notification</p>
-        </div>
-    </body>
-    </html>
-    """
-    await send_notification_email(f"Contact: {contact_obj.subject}", html_content)
+    await announce_leads("contact", [contact_obj])
     
-    return contact_obj
+    return trusted_json(contact_obj)
+
+# Lead Search Routes
+@api_router.get("/leads/search", dependencies=[Depends(require_admin)])
+async def search_leads(
+    q: str = Query(..., min_length=2, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+):
+    """Ranked matches across quotes, bookings and contacts; follow `X-Next-Cursor` for more"""
+    offset = 0
+    if cursor:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = int(cursor)
+    limit = min(limit, max(SEARCH_MAX_RESULTS - offset, 0))
+    if not q.strip() or limit == 0:
+        return trusted_json([])
+    page, has_more = await run_lead_search(q, offset, limit)
+    LIST_DOCUMENTS.labels("leads", "search").observe(len(page))
+    headers = {"X-Next-Cursor": str(offset + limit)} if has_more and offset + limit < SEARCH_MAX_RESULTS else {}
+    return trusted_json(page, headers=headers)
+
+@api_router.post("/leads/stream/token", dependencies=[Depends(require_admin)])
+async def create_stream_token():
+    """A token for `/leads/stream?token=`; it is checked when the stream opens, so fetch a new one to reconnect"""
+    expires = int(time.time()) + LEAD_STREAM_TOKEN_SECONDS
+    return {"token": sign_stream_token(expires), "expires_at": datetime.fromtimestamp(expires, timezone.utc)}
+
+@api_router.get("/leads/stream", dependencies=[Depends(require_stream_access)])
+async def stream_leads(
+    types: Optional[str] = Query(None, description="Comma-separated lead kinds, default all"),
+    last_event_id: Optional[str] = Header(None, max_length=200),
+):
+    """Server-Sent Events feed of new leads, resuming after `Last-Event-ID`"""
+    kinds = [t.strip() for t in types.split(',') if t.strip()] if types else list(LEAD_COLLECTIONS)
+    unknown = [kind for kind in kinds if kind not in LEAD_COLLECTIONS]
+    if unknown or not kinds:
+        raise HTTPException(status_code=400, detail=f"Unknown lead types: {', '.join(unknown)}")
+
+    async def events():
+        LEAD_STREAM_CLIENTS.inc()
+        try:
+            async for chunk in lead_feed.stream(last_event_id, kinds, dump_json, heartbeat=SSE_HEARTBEAT_SECONDS):
+                yield chunk
+        finally:
+            LEAD_STREAM_CLIENTS.dec()
 
-# Testimonials Routes
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Analytics Routes
+@api_router.get("/stats/leads", dependencies=[Depends(require_admin)])
+async def get_lead_stats(
+    date_range: tuple = Depends(stats_range),
+    kind: Optional[Literal["quote", "booking", "contact"]] = None,
+):
+    """Lead counts per business day, kind and service"""
+    return trusted_json(await lead_rollups.daily_counts(*date_range, kind=kind))
+
+@api_router.get("/stats/conversion", dependencies=[Depends(require_admin)])
+async def get_conversion_stats(date_range: tuple = Depends(stats_range)):
+    """Bookings per quote request, overall and per service"""
+    return trusted_json(await lead_rollups.conversion(*date_range))
+
+@api_router.get("/stats/slots", dependencies=[Depends(require_admin)])
+async def get_slot_stats(date_range: tuple = Depends(stats_range)):
+    """Requested booking slots by weekday (0 = Monday) and time, busiest first"""
+    return trusted_json(await lead_rollups.busiest_slots(*date_range))
+
+# Catalog Routes
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials():
-    # Return seeded testimonials
-    testimonials = [
-        Testimonial(
-            id="1",
-            name="Sarah Mitchell",
-            location="Shellharbour, NSW",
-            rating=5,
-            review="Illwarra Tree Removal removed a massive oak that was threatening our home. Their crew was professional, efficient, and left our yard spotless. Highly recommend!",
-            service="Tree Removal",
-            date="December 2025"
-        ),
-        Testimonial(
-            id="2",
-            name="James Rodriguez",
-            location="Oak Flats, NSW",
-            rating=5,
-            review="After the storm damaged several trees on our property, TimberGuard was there within hours. Their emergency response team saved us from further damage.",
-            service="Emergency Services",
-            date="June 2025"
-        ),
-        Testimonial(
-            id="3",
-            name="Emily Chen",
-            location="Farmborough Heights, NSW",
-            rating=5,
-            review="Professional stump grinding service! They removed five old stumps and now our backyard looks incredible. Fair pricing and excellent work.",
-            service="Stump Grinding",
-            date="October 2025"
-        ),
-        Testimonial(
-            id="4",
-            name="Michael Thompson",
-            location="Thirroul, NSW",
-            rating=5,
-            review="Regular tree trimming from TimberGuard keeps our property looking pristine. Their arborists really know their craft.",
-            service="Tree Trimming",
-            date="September 2025"
-        ),
-        Testimonial(
-            id="5",
-            name="Lisa Anderson",
-            location="Warilla, NSW",
-            rating=5,
-            review="They cleared 2 acres for our new construction project. Professional, on-time, and within budget. Will use again!",
-            service="Land Clearing",
-            date="August 2024"
-        )
-    ]
-    return testimonials
+async def get_testimonials(request: Request):
+    return (await catalogs["testimonials"].get()).response(request)
 
-# Gallery Routes
 @api_router.get("/gallery", response_model=List[GalleryItem])
-async def get_gallery():
-    gallery = [
-        GalleryItem(
-            id="1",
-            title="Oak Tree Removal",
-            description="Safe removal of a 60-foot oak near residential property",
-            image_url="https://images.unsplash.com/photo-1663697317598-319f0b5ef8b4?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwxfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
-            category="Tree Removal"
-        ),
-        GalleryItem(
-            id="2",
-            title="Commercial Land Clearing",
-            description="5-acre commercial site preparation",
-            image_url="https://images.unsplash.com/photo-1634316888962-75074307f81c?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwyfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
-            category="Land Clearing"
-        ),
-        GalleryItem(
-            id="3",
-            title="Storm Damage Cleanup",
-            description="Emergency response after major windstorm",
-            image_url="https://images.unsplash.com/photo-1596481768453-8befafc2d7ae?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHwzfHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
-            category="Emergency Services"
-        ),
-        GalleryItem(
-            id="4",
-            title="Heritage Tree Pruning",
-            description="Expert pruning of 100-year-old maple",
-            image_url="https://images.unsplash.com/photo-1721217721953-14f4a916e018?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzB8MHwxfHNlYXJjaHw0fHxiZWF1dGlmdWwlMjBtYW5pY3VyZWQlMjBiYWNreWFyZCUyMGdhcmRlbiUyMGxhbmRzY2FwZXxlbnwwfHx8fDE3NzE0ODMwMDB8MA&ixlib=rb-4.1.0&q=85",
-            category="Tree Trimming"
-        )
-    ]
-    return gallery
+async def get_gallery(request: Request):
+    return (await catalogs["gallery"].get()).response(request)
 
-# Services data endpoint
-@api_router.get("/services")
-async def get_services():
-    services = [
-        {
-            "id": "1",
-            "title": "Tree Removal",
-            "description": "Safe and efficient removal of trees of any size. We handle dangerous trees, diseased trees, and trees that need to go for construction or landscaping projects.",
-            "icon": "TreeDeciduous",
-            "image": "https://images.unsplash.com/photo-1669065054992-3151b15aab08?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHwzfHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "id": "2",
-            "title": "Tree Trimming",
-            "description": "Expert pruning and trimming to maintain tree health, improve appearance, and prevent hazards. Regular maintenance keeps your trees beautiful and safe.",
-            "icon": "Scissors",
-            "image": "https://images.unsplash.com/photo-1765064519883-651c506ec70d?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHw0fHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "id": "3",
-            "title": "Stump Grinding",
-            "description": "Complete stump removal using professional grinding equipment. Reclaim your yard space and eliminate tripping hazards and pest habitats.",
-            "icon": "CircleDot",
-            "image": "https://images.unsplash.com/photo-1617143520628-86934f404d06?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjAzNzl8MHwxfHNlYXJjaHwyfHx0cmVlJTIwc3R1bXAlMjBncmluZGluZyUyMG1hY2hpbmUlMjBhY3Rpb258ZW58MHx8fHwxNzcxNDgyOTk4fDA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "id": "4",
-            "title": "Emergency Services",
-            "description": "24/7 emergency response for storm damage, fallen trees, and hazardous situations. We're here when you need us most.",
-            "icon": "AlertTriangle",
-            "image": "https://images.unsplash.com/photo-1765064520245-2baac5e82689?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjA1NTZ8MHwxfHNlYXJjaHwxfHxhcmJvcmlzdCUyMHRyZWUlMjBjbGltYmVyJTIwc2FmZXR5JTIwZ2VhcnxlbnwwfHx8fDE3NzE0ODI5OTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "id": "5",
-            "title": "Land Clearing",
-            "description": "Complete site preparation for construction, landscaping, or agricultural use. We handle projects of any scale with professional equipment.",
-            "icon": "Mountain",
-            "image": "https://images.unsplash.com/photo-1642005581880-3536a680febf?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NjAzNzl8MHwxfHNlYXJjaHwzfHx0cmVlJTIwc3R1bXAlMjBncmluZGluZyUyMG1hY2hpbmUlMjBhY3Rpb258ZW58MHx8fHwxNzcxNDgyOTk4fDA&ixlib=rb-4.1.0&q=85"
-        }
-    ]
-    return services
+@api_router.get("/services", response_model=List[Service])
+async def get_services(request: Request):
+    return (await catalogs["services"].get()).response(request)
+
+# Image Routes
+IMAGE_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@api_router.get("/images/{image_id}")
+async def get_image(
+    request: Request,
+    image_id: str,
+    w: Optional[int] = Query(None, ge=1, le=8192),
+    fmt: Literal["auto", "avif", "webp", "jpeg"] = "auto",
+    v: Optional[str] = None,
+):
+    """A catalog image resized to the nearest width bucket; URLs with the current `v` never change"""
+    headers = {}
+    if fmt == "auto":
+        accept = request.headers.get('accept', '')
+        fmt = "avif" if "image/avif" in accept else "webp" if "image/webp" in accept else "jpeg"
+        headers["Vary"] = "Accept"
+    result = await image_store.variant(image_id, w, fmt)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, source, width = result
+    headers["ETag"] = f'"{source.digest}-{width}-{fmt}"'
+    # Only a URL naming the current source version may be cached forever
+    headers["Cache-Control"] = IMAGE_IMMUTABLE_CACHE_CONTROL if v == source.digest else CATALOG_CACHE_CONTROL
+    if etag_matches(request.headers.get('if-none-match'), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=IMAGE_FORMATS[fmt][1], headers=headers)
+
+# Catalog Admin Routes
+CatalogName = Literal["services", "testimonials", "gallery"]
+
+@api_router.put("/admin/catalogs/{catalog}/{item_id}", dependencies=[Depends(require_admin)])
+async def put_catalog_item(catalog: CatalogName, item_id: str, request: Request, position: Optional[int] = Query(None, ge=0)):
+    """Create or replace one catalog item; `position` orders the catalog"""
+    cache = catalogs[catalog]
+    try:
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise ValueError("Expected a JSON object")
+        item = cache.model.model_validate({**body, "id": item_id})
+    except ValueError as e:
+        errors = json.loads(e.json(include_url=False)) if isinstance(e, ValidationError) else str(e)
+        raise HTTPException(status_code=422, detail=errors)
+    return trusted_json(await cache.upsert(item, position=position))
+
+@api_router.delete("/admin/catalogs/{catalog}/{item_id}", status_code=204, dependencies=[Depends(require_admin)])
+async def delete_catalog_item(catalog: CatalogName, item_id: str):
+    if not await catalogs[catalog].delete(item_id):
+        raise HTTPException(status_code=404, detail="Catalog item not found")
+    return Response(status_code=204)
+
+# Export Routes
+@api_router.get("/export/{collection}", dependencies=[Depends(require_admin)])
+async def export_leads(
+    collection: Literal["quotes", "bookings", "contacts"],
+    format: Literal["csv", "ndjson"] = "csv",
+    since: Optional[datetime] = Query(None, description="Only leads created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only leads created before this time"),
+):
+    """Every matching lead, oldest first, streamed straight off the cursor (gzip via Accept-Encoding)"""
+    fields = list(EXPORT_MODELS[collection].model_fields)
+    query = lead_query(date_from=since, date_to=until)
+    cursor = (
+        db[collection].find(query, {"_id": 0, **{field: 1 for field in fields}})
+        .sort([("created_at", ASCENDING), ("id", ASCENDING)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return StreamingResponse(
+        export_chunks(cursor, fields, format, collection),
+        media_type="text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection}-{stamp}.{format}"'},
+    )
+
+# Dispatch Routes
+DISPATCH_PROJECTION = {"_id": 0, "id": 1, "name": 1, "phone": 1, "service": 1, "address": 1, "preferred_time": 1}
+
+@api_router.get("/dispatch/plan", dependencies=[Depends(require_admin)])
+async def get_dispatch_plan(
+    day: date = Query(..., alias="date"),
+    crews: int = Query(BOOKING_CREWS_PER_SLOT, ge=1, le=50),
+):
+    """Suggested routes for one day's bookings, per crew and time window"""
+    cursor = db.bookings.find({"preferred_date": day.isoformat()}, DISPATCH_PROJECTION).sort("id", ASCENDING)
+    bookings = await cursor.to_list(None)
+    plan = await asyncio.to_thread(
+        plan_day, bookings, crews, BOOKING_TIME_SLOTS, DISPATCH_DEPOT,
+        road_factor=DISPATCH_ROAD_FACTOR, speed_kmh=DISPATCH_SPEED_KMH,
+    )
+    return trusted_json({"date": day.isoformat(), "depot": {"lat": DISPATCH_DEPOT[0], "lon": DISPATCH_DEPOT[1]}, **plan})
+
+# ================ Database Lifecycle ================
+
+def mongo_client_options() -> dict:
+    options = {
+        "tz_aware": True,
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [MongoCommandMetrics(), mongo_pool_metrics],
+    }
+    if MONGO_WRITE_CONCERN:
+        options["w"] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+        options["wTimeoutMS"] = MONGO_WRITE_TIMEOUT_MS
+    if MONGO_JOURNAL:
+        options["journal"] = True
+    return options
+
+def bind_database(new_client):
+    """Point the module and every component that talks to Mongo at `new_client`"""
+    global client, db
+    client = new_client
+    db = new_client[os.environ['DB_NAME']] if new_client is not None else None
+    email_outbox.collection = db.email_outbox if db is not None else None
+    lead_rollups.db = db
+    lead_feed.db = db
+    for cache in catalogs.values():
+        cache.db = db
+        cache.payload = None
+    if isinstance(rate_limit_store, MongoRateLimitStore):
+        rate_limit_store.collection = db.rate_limits if db is not None else None
+
+async def ping_mongo() -> float:
+    """Round-trip time of a ping in milliseconds"""
+    started = time.perf_counter()
+    await db.command("ping")
+    return (time.perf_counter() - started) * 1000
+
+async def wait_for_mongo():
+    """Block startup until Mongo answers, so a worker never takes traffic with no database"""
+    deadline = time.monotonic() + MONGO_STARTUP_TIMEOUT
+    delay = 0.25
+    while True:
+        try:
+            rtt = await ping_mongo()
+            logger.info(f"Mongo reachable, ping {rtt:.1f} ms")
+            return
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"Mongo unreachable after {MONGO_STARTUP_TIMEOUT:.0f}s: {str(e)}")
+            logger.warning(f"Waiting for Mongo: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+# Set once this worker has been asked to shut down
+draining = False
+
+def begin_drain():
+    """Called by the launcher on SIGTERM, before it waits for in-flight requests"""
+    global draining
+    draining = True
+    # Lead streams never finish by themselves; end them so the grace period isn't spent on them
+    lead_feed.close_streams()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A client bound before startup (tests, benchmarks) is used as is and left open
+    owns_client = client is None
+    if owns_client:
+        bind_database(AsyncIOMotorClient(mongo_url, **mongo_client_options()))
+    try:
+        await wait_for_mongo()
+        await ensure_indexes()
+        for cache in catalogs.values():
+            await cache.warm()
+        email_outbox.start()
+        lead_rollups.start()
+        lead_feed.start()
+        yield
+    finally:
+        if lead_insert_buffer is not None:
+            await lead_insert_buffer.close()
+        await email_outbox.stop(timeout=EMAIL_DRAIN_SECONDS, drain=True)
+        await lead_feed.stop()
+        await lead_rollups.stop()
+        if owns_client:
+            client.close()
+            bind_database(None)
+
+# Create the main app without a prefix
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse if FAST_JSON else JSONResponse)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -396,8 +1717,49 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination and replay headers must be readable by cross-origin dashboards
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+# Added last so it is outermost and times the whole stack
+app.add_middleware(PrometheusMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is serving; never touches Mongo, so an outage doesn't restart workers"""
+    return {"status": "ok", "pid": os.getpid(), "pool": mongo_pool_metrics.snapshot()}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: Mongo answers quickly and this worker's pool has connections to spare"""
+    pool = mongo_pool_metrics.snapshot()
+    problems = ["shutting down"] if draining else []
+    rtt = None
+    try:
+        rtt = round(await asyncio.wait_for(ping_mongo(), timeout=MONGO_READY_PING_MS / 1000), 3)
+    except asyncio.TimeoutError:
+        problems.append(f"ping slower than {MONGO_READY_PING_MS:g} ms")
+    except Exception as e:
+        problems.append(f"ping failed: {str(e)}")
+    total = pool["total"]
+    # Pool counters only exist once the driver has opened a pool
+    if pool["servers"]:
+        if total["checked_out"] >= MONGO_MAX_POOL_SIZE and total["waiting"]:
+            problems.append(f"pool exhausted: {total['checked_out']} in use, {total['waiting']} waiting")
+        if total["open"] < MONGO_MIN_POOL_SIZE:
+            problems.append(f"pool cold: {total['open']} of {MONGO_MIN_POOL_SIZE} connections open")
+    payload = {
+        "status": "unavailable" if problems else "ok",
+        "problems": problems,
+        "mongo_rtt_ms": rtt,
+        "pool": pool,
+        "lead_feed": lead_feed.source,
+    }
+    return Response(content=dump_json(payload), media_type="application/json", status_code=503 if problems else 200)
@@ -0,0 +1,251 @@
+"""Lead analytics backed by a materialized daily rollup.
+
+Every stored lead bumps one counter row in `lead_daily_stats`, keyed by the
+business day it arrived, its kind and service and, for bookings, the weekday
+and time slot that were requested. Dashboard queries aggregate those rows,
+so their cost depends on the date range asked for rather than on how many
+leads have been stored.
+
+`LeadRollups.rebuild_day` recomputes one day from the lead collections with
+an aggregation pipeline. The refresh loop rebuilds recently closed days,
+which corrects any counter that missed an increment; closed days no longer
+receive inserts, so a rebuild never races a live `$inc`. Backfill history
+from the backend directory with:
+
+    python stats.py --days 365
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# kind -> source collection
+LEAD_COLLECTIONS = {"quote": "quotes", "booking": "bookings", "contact": "contacts"}
+
+
+def slot_weekday(preferred_date) -> Optional[int]:
+    try:
+        return date.fromisoformat(preferred_date).weekday()
+    except (TypeError, ValueError):
+        return None
+
+
+def row_id(day: str, kind: str, service: str, weekday: Optional[int], slot: Optional[str]) -> str:
+    return "|".join([day, kind, service, "" if weekday is None else str(weekday), slot or ""])
+
+
+class LeadRollups:
+    def __init__(
+        self,
+        db,
+        tz: ZoneInfo,
+        collection_name: str = "lead_daily_stats",
+        refresh_days: int = 2,
+        refresh_interval: float = 3600.0,
+    ):
+        self.db = db
+        self.tz = tz
+        self.collection_name = collection_name
+        self.refresh_days = refresh_days
+        self.refresh_interval = refresh_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def business_day(self, moment: datetime) -> date:
+        return moment.astimezone(self.tz).date()
+
+    def day_bounds(self, day: date) -> tuple:
+        """UTC start and end of a business day, correct across daylight saving changes"""
+        start = datetime.combine(day, time.min, tzinfo=self.tz)
+        end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=self.tz)
+        return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+    def _row(self, day: date, kind: str, service, preferred_date, preferred_time, count: int) -> dict:
+        weekday = slot_weekday(preferred_date) if kind == "booking" else None
+        slot = preferred_time if kind == "booking" else None
+        service = service or ""
+        return {
+            "_id": row_id(day.isoformat(), kind, service, weekday, slot),
+            "day": day.isoformat(),
+            "kind": kind,
+            "service": service,
+            "slot_weekday": weekday,
+            "slot_time": slot,
+            "count": count,
+        }
+
+    async def record(self, kind: str, leads: List[dict]):
+        """Count newly stored leads; a failure here only costs accuracy until the next rebuild"""
+        counts: Dict[str, dict] = {}
+        for lead in leads:
+            row = self._row(
+                self.business_day(lead["created_at"]), kind, lead.get("service"),
+                lead.get("preferred_date"), lead.get("preferred_time"), 0,
+            )
+            counts.setdefault(row["_id"], row)["count"] += 1
+        if not counts:
+            return
+        ops = [
+            UpdateOne(
+                {"_id": key},
+                {"$inc": {"count": row.pop("count")}, "$setOnInsert": {k: v for k, v in row.items() if k != "_id"}},
+                upsert=True,
+            )
+            for key, row in counts.items()
+        ]
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update {kind} rollups: {str(e)}")
+
+    def rebuild_pipeline(self, day: date) -> list:
+        start, end = self.day_bounds(day)
+        return [
+            {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {"service": "$service", "date": "$preferred_date", "time": "$preferred_time"},
+                "count": {"$sum": 1},
+            }},
+        ]
+
+    async def rebuild_day(self, day: date) -> int:
+        """Recompute one day's rows from the lead collections; returns the rows written"""
+        rows: Dict[str, dict] = {}
+        for kind, source in LEAD_COLLECTIONS.items():
+            async for group in self.db[source].aggregate(self.rebuild_pipeline(day)):
+                key = group["_id"]
+                row = self._row(day, kind, key.get("service"), key.get("date"), key.get("time"), group["count"])
+                # Different preferred dates can fold into the same weekday row
+                if row["_id"] in rows:
+                    rows[row["_id"]]["count"] += row["count"]
+                else:
+                    rows[row["_id"]] = row
+        if rows:
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": key}, row, upsert=True) for key, row in rows.items()],
+                ordered=False,
+            )
+        await self.collection.delete_many({"day": day.isoformat(), "_id": {"$nin": list(rows)}})
+        return len(rows)
+
+    async def refresh(self, days: Optional[int] = None):
+        """Rebuild the most recent closed days"""
+        today = self.business_day(datetime.now(timezone.utc))
+        for offset in range(days or self.refresh_days, 0, -1):
+            await self.rebuild_day(today - timedelta(days=offset))
+
+    async def run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Rollup refresh failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    # Dashboard queries, all served from the rollup rows
+
+    def _range(self, date_from: date, date_to: date, **match) -> dict:
+        return {"$match": {"day": {"$gte": date_from.isoformat(), "$lte": date_to.isoformat()}, **match}}
+
+    async def daily_counts(self, date_from: date, date_to: date, kind: Optional[str] = None) -> List[dict]:
+        pipeline = [
+            self._range(date_from, date_to, **({"kind": kind} if kind else {})),
+            {"$group": {"_id": {"day": "$day", "kind": "$kind", "service": "$service"}, "count": {"$sum": "$count"}}},
+            {"$sort": {"_id.day": 1, "_id.kind": 1, "_id.service": 1}},
+        ]
+        return [{**row["_id"], "count": row["count"]} async for row in self.collection.aggregate(pipeline)]
+
+    async def conversion(self, date_from: date, date_to: date) -> dict:
+        pipeline = [
+            self._range(date_from, date_to, kind={"$in": ["quote", "booking"]}),
+            {"$group": {"_id": {"service": "$service", "kind": "$kind"}, "count": {"$sum": "$count"}}},
+        ]
+        services: Dict[str, dict] = {}
+        async for row in self.collection.aggregate(pipeline):
+            entry = services.setdefault(row["_id"]["service"], {"quotes": 0, "bookings": 0})
+            entry["quotes" if row["_id"]["kind"] == "quote" else "bookings"] += row["count"]
+
+        def with_rate(entry: dict) -> dict:
+            rate = entry["bookings"] / entry["quotes"] if entry["quotes"] else None
+            return {**entry, "conversion_rate": None if rate is None else round(rate, 4)}
+
+        total = {
+            "quotes": sum(e["quotes"] for e in services.values()),
+            "bookings": sum(e["bookings"] for e in services.values()),
+        }
+        return {
+            "total": with_rate(total),
+            "services": [{"service": name, **with_rate(entry)} for name, entry in sorted(services.items())],
+        }
+
+    async def busiest_slots(self, date_from: date, date_to: date) -> List[dict]:
+        pipeline = [
+            self._range(date_from, date_to, kind="booking"),
+            {"$group": {"_id": {"weekday": "$slot_weekday", "time": "$slot_time"}, "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1, "_id.weekday": 1, "_id.time": 1}},
+        ]
+        return [{**row["_id"], "count": row["count"]} async for row in self.collection.aggregate(pipeline)]
+
+
+async def backfill(db, tz: ZoneInfo, days: int):
+    rollups = LeadRollups(db, tz)
+    today = rollups.business_day(datetime.now(timezone.utc))
+    # Includes today, so run it before the API starts recording or expect today to be recounted
+    for offset in range(days, -1, -1):
+        day = today - timedelta(days=offset)
+        rows = await rollups.rebuild_day(day)
+        logger.info(f"{day.isoformat()}: {rows} rollup rows")
+
+
+async def main():
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365, help="days of history to rebuild")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        await backfill(client[os.environ['DB_NAME']], ZoneInfo(os.environ.get('BUSINESS_TIMEZONE', 'Australia/Sydney')), args.days)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
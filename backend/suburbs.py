@@ -0,0 +1,253 @@
+"""Offline table of Illawarra suburbs, with postcodes, zones and approximate centroids.
+
+`SuburbIndex` keeps the table in memory for the lookups the API needs. A
+prefix trie over every word of every suburb name, and over the postcodes,
+serves autocomplete; a dict serves exact postcode hits. The same trie scans
+a free-text address for the suburb in it (`locate`), so address validation,
+lead tagging and dispatch geocoding always agree. Positions are only as
+precise as a suburb centroid, which is enough to group and order jobs.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Suburb(NamedTuple):
+    name: str
+    postcode: str
+    lat: float
+    lon: float
+    # Area of the region, used to split work and report on leads
+    zone: str
+
+
+class Location(NamedTuple):
+    suburb: Optional[str]
+    postcode: str
+    zone: str
+    lat: float
+    lon: float
+    # "suburb" when a suburb name matched, "postcode" for a postcode centroid
+    precision: str
+
+
+SUBURBS = [Suburb(*row) for row in (
+    # Northern suburbs and the escarpment villages
+    ("Otford", "2508", -34.2100, 151.0040, "northern"),
+    ("Helensburgh", "2508", -34.1920, 150.9900, "northern"),
+    ("Stanwell Park", "2508", -34.2270, 150.9860, "northern"),
+    ("Stanwell Tops", "2508", -34.2180, 150.9790, "northern"),
+    ("Coalcliff", "2508", -34.2450, 150.9740, "northern"),
+    ("Clifton", "2515", -34.2590, 150.9690, "northern"),
+    ("Scarborough", "2515", -34.2680, 150.9610, "northern"),
+    ("Wombarra", "2515", -34.2750, 150.9500, "northern"),
+    ("Coledale", "2515", -34.2890, 150.9440, "northern"),
+    ("Austinmer", "2515", -34.3060, 150.9300, "northern"),
+    ("Thirroul", "2515", -34.3170, 150.9210, "northern"),
+    ("Bulli", "2516", -34.3360, 150.9130, "northern"),
+    ("Woonona", "2517", -34.3490, 150.9060, "northern"),
+    ("Russell Vale", "2517", -34.3560, 150.9000, "northern"),
+    ("Bellambi", "2518", -34.3660, 150.9140, "northern"),
+    ("Corrimal", "2518", -34.3730, 150.8970, "northern"),
+    ("East Corrimal", "2518", -34.3760, 150.9100, "northern"),
+    ("Tarrawanna", "2518", -34.3820, 150.8880, "northern"),
+    ("Towradgi", "2518", -34.3840, 150.9030, "northern"),
+    ("Balgownie", "2519", -34.3900, 150.8780, "northern"),
+    ("Fairy Meadow", "2519", -34.3920, 150.8930, "northern"),
+    ("Mount Pleasant", "2519", -34.3960, 150.8640, "northern"),
+    ("Mount Ousley", "2519", -34.4000, 150.8800, "northern"),
+    # Wollongong and the inner suburbs
+    ("North Wollongong", "2500", -34.4090, 150.8960, "wollongong"),
+    ("Mount Keira", "2500", -34.4050, 150.8560, "wollongong"),
+    ("Keiraville", "2500", -34.4150, 150.8720, "wollongong"),
+    ("Gwynneville", "2500", -34.4170, 150.8850, "wollongong"),
+    ("West Wollongong", "2500", -34.4250, 150.8700, "wollongong"),
+    ("Wollongong", "2500", -34.4250, 150.8930, "wollongong"),
+    ("Mount Saint Thomas", "2500", -34.4400, 150.8750, "wollongong"),
+    ("Mangerton", "2500", -34.4390, 150.8700, "wollongong"),
+    ("Coniston", "2500", -34.4370, 150.8860, "wollongong"),
+    ("Spring Hill", "2500", -34.4480, 150.8720, "wollongong"),
+    ("Figtree", "2525", -34.4350, 150.8590, "wollongong"),
+    ("Mount Kembla", "2526", -34.4300, 150.8210, "wollongong"),
+    ("Cordeaux Heights", "2526", -34.4430, 150.8300, "wollongong"),
+    ("Farmborough Heights", "2526", -34.4520, 150.8160, "wollongong"),
+    ("Unanderra", "2526", -34.4540, 150.8470, "wollongong"),
+    ("Kembla Grange", "2526", -34.4720, 150.8150, "wollongong"),
+    ("Port Kembla", "2505", -34.4780, 150.9010, "wollongong"),
+    ("Cringila", "2502", -34.4710, 150.8730, "wollongong"),
+    ("Lake Heights", "2502", -34.4880, 150.8750, "wollongong"),
+    ("Warrawong", "2502", -34.4850, 150.8880, "wollongong"),
+    ("Primbee", "2502", -34.5030, 150.8790, "wollongong"),
+    ("Berkeley", "2506", -34.4800, 150.8450, "wollongong"),
+    # Dapto and the south-west
+    ("Brownsville", "2530", -34.4870, 150.8030, "dapto"),
+    ("Horsley", "2530", -34.4880, 150.7760, "dapto"),
+    ("Wongawilli", "2530", -34.4780, 150.7590, "dapto"),
+    ("Kanahooka", "2530", -34.4930, 150.8090, "dapto"),
+    ("Dapto", "2530", -34.4990, 150.7940, "dapto"),
+    ("Koonawarra", "2530", -34.5020, 150.8070, "dapto"),
+    ("Avondale", "2530", -34.5180, 150.7340, "dapto"),
+    ("Haywards Bay", "2530", -34.5280, 150.7960, "dapto"),
+    ("Yallah", "2530", -34.5370, 150.7820, "dapto"),
+    # Shellharbour
+    ("Windang", "2528", -34.5330, 150.8670, "shellharbour"),
+    ("Lake Illawarra", "2528", -34.5470, 150.8600, "shellharbour"),
+    ("Mount Warrigal", "2528", -34.5490, 150.8420, "shellharbour"),
+    ("Warilla", "2528", -34.5500, 150.8600, "shellharbour"),
+    ("Barrack Heights", "2528", -34.5630, 150.8560, "shellharbour"),
+    ("Barrack Point", "2528", -34.5640, 150.8680, "shellharbour"),
+    ("Albion Park Rail", "2527", -34.5600, 150.7970, "shellharbour"),
+    ("Albion Park", "2527", -34.5720, 150.7770, "shellharbour"),
+    ("Calderwood", "2527", -34.5600, 150.7420, "shellharbour"),
+    ("Tullimbar", "2527", -34.5680, 150.7560, "shellharbour"),
+    ("Oak Flats", "2529", -34.5630, 150.8190, "shellharbour"),
+    ("Blackbutt", "2529", -34.5690, 150.8280, "shellharbour"),
+    ("Shellharbour City Centre", "2529", -34.5640, 150.8400, "shellharbour"),
+    ("Flinders", "2529", -34.5810, 150.8520, "shellharbour"),
+    ("Shellharbour", "2529", -34.5790, 150.8690, "shellharbour"),
+    ("Shell Cove", "2529", -34.5890, 150.8720, "shellharbour"),
+    ("Dunmore", "2529", -34.6060, 150.8390, "shellharbour"),
+    # Kiama
+    ("Minnamurra", "2533", -34.6280, 150.8530, "kiama"),
+    ("Kiama Downs", "2533", -34.6340, 150.8530, "kiama"),
+    ("Jamberoo", "2533", -34.6460, 150.7750, "kiama"),
+    ("Bombo", "2533", -34.6560, 150.8540, "kiama"),
+    ("Kiama", "2533", -34.6710, 150.8540, "kiama"),
+    ("Kiama Heights", "2533", -34.6940, 150.8470, "kiama"),
+    ("Gerringong", "2534", -34.7460, 150.8270, "kiama"),
+    ("Gerroa", "2534", -34.7690, 150.8150, "kiama"),
+)]
+
+# Common shorthand in typed addresses
+ABBREVIATIONS = {"mt": "mount", "nth": "north", "sth": "south", "nsw": ""}
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces, with shorthand expanded"""
+    words = (ABBREVIATIONS.get(word, word) for word in WORD_PATTERN.findall((text or "").lower()))
+    return " ".join(word for word in words if word)
+
+
+def is_postcode(word: str) -> bool:
+    return len(word) == 4 and word.isdigit() and word[0] == "2"
+
+
+class TrieNode:
+    __slots__ = ("children", "suggestions", "suburb")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        # Best completions below this node, best first
+        self.suggestions: List[Suburb] = []
+        # Set where a full suburb name ends
+        self.suburb: Optional[Suburb] = None
+
+
+class SuburbIndex:
+    def __init__(self, suburbs: List[Suburb], max_suggestions: int = 20):
+        self.suburbs = list(suburbs)
+        self.by_name: Dict[str, Suburb] = {normalize(suburb.name): suburb for suburb in self.suburbs}
+        self.by_postcode: Dict[str, List[Suburb]] = {}
+        for suburb in self.suburbs:
+            self.by_postcode.setdefault(suburb.postcode, []).append(suburb)
+        self.root = TrieNode()
+
+        ranked: Dict[int, Dict[Suburb, tuple]] = {}
+        for suburb in self.suburbs:
+            name = normalize(suburb.name)
+            starts = [0] + [i + 1 for i, char in enumerate(name) if char == " "]
+            # A match on the first word beats one on a later word, then alphabetical
+            keys = [(name[start:], (0 if start == 0 else 1, name)) for start in starts]
+            keys.append((suburb.postcode, (2, name)))
+            for key, rank in keys:
+                node = self.root
+                for char in key:
+                    node = node.children.setdefault(char, TrieNode())
+                    best = ranked.setdefault(id(node), {})
+                    best[suburb] = min(best.get(suburb, rank), rank)
+                if key == name:
+                    node.suburb = suburb
+        self._finish(self.root, ranked, max_suggestions)
+
+    def _finish(self, node: TrieNode, ranked: Dict[int, Dict[Suburb, tuple]], limit: int):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            best = ranked.get(id(node), {})
+            node.suggestions = [suburb for suburb, _ in sorted(best.items(), key=lambda item: item[1])[:limit]]
+            stack.extend(node.children.values())
+
+    def _walk(self, key: str) -> Optional[TrieNode]:
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def search(self, query: str, limit: int = 10) -> List[Suburb]:
+        """Autocomplete a partly typed suburb name or postcode"""
+        key = normalize(query)
+        node = self._walk(key) if key else None
+        return node.suggestions[:limit] if node else []
+
+    def exact(self, query: str) -> List[Suburb]:
+        """Suburbs named by the query exactly, or every suburb sharing a postcode"""
+        key = normalize(query)
+        if is_postcode(key):
+            return list(self.by_postcode.get(key, []))
+        suburb = self.by_name.get(key)
+        return [suburb] if suburb else []
+
+    def _scan(self, text: str) -> List[Tuple[int, Suburb]]:
+        """Longest full suburb names in normalized text, left to right, without overlaps"""
+        found = []
+        position, length = 0, len(text)
+        while position < length:
+            node, match, end = self.root, None, position
+            for index in range(position, length):
+                node = node.children.get(text[index])
+                if node is None:
+                    break
+                if node.suburb is not None and (index + 1 == length or text[index + 1] == " "):
+                    match, end = node.suburb, index + 1
+            if match is not None:
+                found.append((position, match))
+                position = end + 1
+            else:
+                next_space = text.find(" ", position)
+                position = length if next_space < 0 else next_space + 1
+        return found
+
+    def postcode_centroid(self, postcode: str) -> Optional[Location]:
+        suburbs = self.by_postcode.get(postcode)
+        if not suburbs:
+            return None
+        lat = sum(suburb.lat for suburb in suburbs) / len(suburbs)
+        lon = sum(suburb.lon for suburb in suburbs) / len(suburbs)
+        return Location(None, postcode, suburbs[0].zone, lat, lon, "postcode")
+
+    def locate(self, address: str) -> Optional[Location]:
+        """Locate a free-text address by the suburb and postcode in it, or None outside the table"""
+        text = normalize(address)
+        postcodes = [word for word in text.split(" ") if is_postcode(word)]
+        postcode = postcodes[-1] if postcodes else None
+        # The suburb follows the street, so the last match is the likeliest ("1 Dapto Rd, Horsley")
+        matches = [suburb for _, suburb in self._scan(text)]
+        if postcode:
+            matches = [suburb for suburb in matches if suburb.postcode == postcode] or (
+                [] if postcode in self.by_postcode else matches
+            )
+        if matches:
+            suburb = matches[-1]
+            return Location(suburb.name, suburb.postcode, suburb.zone, suburb.lat, suburb.lon, "suburb")
+        if postcode:
+            return self.postcode_centroid(postcode)
+        return None
+
+
+service_area = SuburbIndex(SUBURBS)
+
+
+def geocode(address: str) -> Optional[Location]:
+    return service_area.locate(address)
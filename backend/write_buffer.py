@@ -0,0 +1,103 @@
+"""Group commit for single-document inserts.
+
+`InsertBuffer.insert` looks like `insert_one` to the caller, but concurrent
+inserts into the same collection are gathered for up to `max_delay`
+seconds, or until `max_docs` are waiting, and written with one unordered
+`insert_many`. Each caller gets back its own outcome. A document that fails
+(a duplicate key, say) raises the same error class `insert_one` would have
+raised, and the rest of its batch is still stored.
+
+Under a burst this trades at most `max_delay` of extra latency for one round
+trip per batch instead of one per document. When traffic is light a lone
+insert waits out the full delay, which is why the buffer is opt-in.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError, WriteError
+
+from metrics import INSERT_BATCH_DOCUMENTS
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_CODES = (11000, 11001, 12582)
+
+
+def write_error(error: dict) -> Exception:
+    """The exception insert_one raises for one entry of a bulk write's writeErrors"""
+    cls = DuplicateKeyError if error.get("code") in DUPLICATE_KEY_CODES else WriteError
+    return cls(error.get("errmsg", "write failed"), error.get("code"), error)
+
+
+class InsertBuffer:
+    def __init__(self, max_docs: int = 100, max_delay: float = 0.005):
+        self.max_docs = max_docs
+        self.max_delay = max_delay
+        # collection name -> (collection, [(doc, future)])
+        self._pending: Dict[str, Tuple[object, List[tuple]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._writes: set = set()
+
+    async def insert(self, collection, doc: dict):
+        """Store `doc` with the next batch for its collection; raises if that document failed"""
+        future = asyncio.get_running_loop().create_future()
+        name = collection.name
+        _, batch = self._pending.setdefault(name, (collection, []))
+        batch.append((doc, future))
+        if len(batch) >= self.max_docs:
+            self._flush(name)
+        elif name not in self._timers:
+            self._timers[name] = asyncio.get_running_loop().call_later(self.max_delay, self._flush, name)
+        # If the caller is cancelled the document is still written, as with an in-flight insert_one
+        await future
+
+    def _flush(self, name: str):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(name, None)
+        if not pending:
+            return
+        task = asyncio.ensure_future(self._write(*pending))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, collection, batch: List[tuple]):
+        INSERT_BATCH_DOCUMENTS.labels(collection.name).observe(len(batch))
+        try:
+            await collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+            concern = e.details.get("writeConcernErrors") or []
+            for index, (_, future) in enumerate(batch):
+                if index in failed:
+                    self._settle(future, write_error(failed[index]))
+                elif concern:
+                    self._settle(future, WriteConcernError(concern[0].get("errmsg"), concern[0].get("code"), concern[0]))
+                else:
+                    self._settle(future, None)
+            return
+        except Exception as e:
+            logger.warning(f"Batched insert of {len(batch)} into {collection.name} failed: {str(e)}")
+            for _, future in batch:
+                self._settle(future, e)
+            return
+        for _, future in batch:
+            self._settle(future, None)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, error: Optional[Exception]):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    async def close(self):
+        """Write whatever is waiting and wait for batches already in flight"""
+        for name in list(self._pending):
+            self._flush(name)
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
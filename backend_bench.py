@@ -0,0 +1,335 @@
+"""Latency and throughput benchmark for the API.
+
+Runs the FastAPI app in-process against an in-memory Mongo (mongomock-motor),
+drives a concurrent mixed workload through httpx's ASGI transport and prints
+RPS plus p50/p95/p99 latency per route as JSON:
+
+    python backend_bench.py --requests 5000 --concurrency 50 --output bench.json
+
+With --payloads it instead reports, per route, the bytes on the wire and the
+CPU time per request for identity, gzip and brotli responses, plus the cost
+of encoding each payload with the stdlib json module versus orjson.
+
+With --dispatch it times the crew dispatch planner on synthetic storm-surge
+days (most calls clustered around a few hard-hit suburbs) of 100 to 600 jobs:
+
+    python backend_bench.py --dispatch --crews 6 --repeat 20
+
+Numbers are only comparable between runs on the same machine; use them to
+catch regressions, not as production capacity estimates.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+# Keep the email provider out of the measurements
+os.environ["RESEND_API_KEY"] = ""
+# Lead lists are admin-only; the simulated office staff use this token
+os.environ.setdefault("ADMIN_API_TOKEN", "bench-admin")
+# Every simulated client shares one address, so lift the per-IP form limit
+os.environ.setdefault("RATE_LIMIT_IP_BURST", "1000000000")
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import server  # noqa: E402
+import suburbs  # noqa: E402
+from dispatch import plan_day  # noqa: E402
+
+ADMIN_HEADERS = {"Authorization": f"Bearer {os.environ['ADMIN_API_TOKEN']}"}
+SERVICES = ["tree-removal", "tree-trimming", "stump-grinding", "emergency", "land-clearing"]
+
+
+def lead_fields(i):
+    return {
+        "name": f"Bench User {i}",
+        "email": f"bench{i}@example.com",
+        "phone": f"04{i:08d}"[:10],
+        "service": SERVICES[i % len(SERVICES)],
+        "address": f"{i % 200 + 1} Crown St, Wollongong NSW 2500",
+    }
+
+
+def bookable_days(count):
+    day = date.today() + timedelta(days=1)
+    days = []
+    while len(days) < count:
+        if day.weekday() not in server.BOOKING_CLOSED_WEEKDAYS:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+class Workload:
+    """One weighted request type; `expected` lists statuses that are not errors"""
+
+    def __init__(self, name, weight, build, expected=(200,)):
+        self.name = name
+        self.weight = weight
+        self.build = build
+        self.expected = set(expected)
+
+
+def make_workloads():
+    counter = itertools.count()
+    days = bookable_days(120)
+    slots = list(itertools.product(days, server.BOOKING_TIME_SLOTS))
+
+    def quote():
+        return "POST", "/api/quotes", {"json": {**lead_fields(next(counter)), "message": "Storm damage"}}
+
+    def booking():
+        day, slot = random.choice(slots)
+        fields = {**lead_fields(next(counter)), "preferred_date": day, "preferred_time": slot}
+        return "POST", "/api/bookings", {"json": fields}
+
+    def quotes_page():
+        return "GET", "/api/quotes", {"params": {"limit": 50, "service": random.choice(SERVICES)}}
+
+    return [
+        Workload("GET /api/services", 20, lambda: ("GET", "/api/services", {})),
+        Workload("GET /api/testimonials", 15, lambda: ("GET", "/api/testimonials", {})),
+        Workload("GET /api/gallery", 15, lambda: ("GET", "/api/gallery", {})),
+        Workload("POST /api/quotes", 15, quote),
+        # A full slot answering 409 is correct behaviour under load
+        Workload("POST /api/bookings", 10, booking, expected=(200, 409)),
+        Workload("GET /api/quotes", 10, quotes_page),
+        Workload("GET /api/bookings", 5, lambda: ("GET", "/api/bookings", {"params": {"limit": 50}})),
+        Workload("GET /api/availability", 10, lambda: ("GET", "/api/availability", {"params": {"from": days[0], "to": days[29]}})),
+    ]
+
+
+async def seed(db, count):
+    now = datetime.now(timezone.utc)
+    docs = [
+        {"id": str(uuid.uuid4()), **lead_fields(i), "message": "", "created_at": now - timedelta(minutes=i)}
+        for i in range(count)
+    ]
+    if docs:
+        await db.quotes.insert_many(docs)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(s[0] for s in samples)
+    return {
+        "count": len(samples),
+        "errors": sum(1 for s in samples if not s[1]),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def payload_routes():
+    days = bookable_days(30)
+    return {
+        "GET /api/services": ("/api/services", {}),
+        "GET /api/testimonials": ("/api/testimonials", {}),
+        "GET /api/gallery": ("/api/gallery", {}),
+        "GET /api/quotes": ("/api/quotes", {"params": {"limit": 100}}),
+        "GET /api/quotes?format=ndjson": ("/api/quotes", {"params": {"limit": 1000, "format": "ndjson"}}),
+        "GET /api/availability": ("/api/availability", {"params": {"from": days[0], "to": days[-1]}}),
+    }
+
+
+def encode_cost_us(payload, encode, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        encode(payload)
+    return round((time.process_time() - started) / repeat * 1e6, 2)
+
+
+async def measure_payloads(http, repeat):
+    """Wire bytes and CPU per request for each encoding, and JSON encoder cost per payload"""
+    report = {}
+    for name, (url, kwargs) in payload_routes().items():
+        row = {}
+        for encoding in ("identity", "gzip", "br"):
+            started = time.process_time()
+            for _ in range(repeat):
+                async with http.stream("GET", url, headers={"Accept-Encoding": encoding}, **kwargs) as response:
+                    wire = b"".join([chunk async for chunk in response.aiter_raw()])
+            row[encoding] = {
+                "bytes": len(wire),
+                "cpu_ms": round((time.process_time() - started) / repeat * 1000, 3),
+                "content_encoding": response.headers.get("content-encoding", "identity"),
+            }
+        for encoding in ("gzip", "br"):
+            saved = row["identity"]["bytes"] - row[encoding]["bytes"]
+            row[encoding]["saved_pct"] = round(100 * saved / row["identity"]["bytes"], 1) if row["identity"]["bytes"] else 0.0
+
+        body = (await http.get(url, headers={"Accept-Encoding": "identity"}, **kwargs)).content
+        if kwargs.get("params", {}).get("format") == "ndjson":
+            payload = [json.loads(line) for line in body.splitlines()]
+        else:
+            payload = json.loads(body)
+        row["encode_us"] = {
+            "json": encode_cost_us(payload, lambda p: json.dumps(p, separators=(",", ":"), ensure_ascii=False).encode(), repeat),
+            "orjson": encode_cost_us(payload, orjson.dumps, repeat),
+        }
+        report[name] = row
+    return report
+
+
+DISPATCH_DAY_SIZES = (100, 300, 600)
+
+
+def storm_day(jobs, rng):
+    """Bookings for a storm-surge day: 70% of calls come from around three hard-hit suburbs"""
+    def nearby(centre):
+        return sorted(suburbs.SUBURBS, key=lambda s: (s.lat - centre.lat) ** 2 + (s.lon - centre.lon) ** 2)[:6]
+
+    hotspots = [nearby(centre) for centre in rng.sample(suburbs.SUBURBS, 3)]
+    bookings = []
+    for i in range(jobs):
+        suburb = rng.choice(rng.choice(hotspots)) if rng.random() < 0.7 else rng.choice(suburbs.SUBURBS)
+        address = f"{rng.randint(1, 250)} Storm St, {suburb.name} NSW {suburb.postcode}"
+        if rng.random() < 0.02:
+            address = f"Lot {rng.randint(1, 40)}, off the highway"
+        bookings.append({
+            "id": f"storm-{i:04d}",
+            "name": f"Storm Caller {i}",
+            "service": "emergency" if rng.random() < 0.6 else rng.choice(SERVICES),
+            "address": address,
+            # Calls pile into the morning windows
+            "preferred_time": rng.choices(server.BOOKING_TIME_SLOTS, weights=[5, 4, 3, 2, 1])[0],
+        })
+    return bookings
+
+
+def measure_dispatch(args):
+    rng = random.Random(args.seed)
+    report = {}
+    for jobs in DISPATCH_DAY_SIZES:
+        timings, distances, routes, fitting = [], [], 0, 0
+        for _ in range(args.repeat):
+            bookings = storm_day(jobs, rng)
+            started = time.perf_counter()
+            plan = plan_day(bookings, args.crews, server.BOOKING_TIME_SLOTS, server.DISPATCH_DEPOT)
+            timings.append(time.perf_counter() - started)
+            distances.append(plan["distance_km"])
+            routes += len(plan["routes"])
+            fitting += sum(1 for route in plan["routes"] if route["fits_window"])
+        timings.sort()
+        report[f"{jobs} jobs"] = {
+            "plan_ms": {
+                "p50": round(percentile(timings, 50) * 1000, 2),
+                "p95": round(percentile(timings, 95) * 1000, 2),
+                "max": round(timings[-1] * 1000, 2),
+            },
+            "mean_distance_km": round(sum(distances) / len(distances), 1),
+            "routes_fitting_window_pct": round(100 * fitting / routes, 1) if routes else 0.0,
+        }
+    return {
+        "config": {"crews": args.crews, "days_per_size": args.repeat, "seed": args.seed, "python": sys.version.split()[0]},
+        "days": report,
+    }
+
+
+async def run(args):
+    random.seed(args.seed)
+    mock_client = AsyncMongoMockClient(tz_aware=True)
+    server.bind_database(mock_client)
+    await seed(server.db, args.seed_leads)
+
+    if args.payloads:
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=ADMIN_HEADERS) as http:
+                routes = await measure_payloads(http, args.repeat)
+        return {
+            "config": {
+                "seed_leads": args.seed_leads,
+                "repeat": args.repeat,
+                "compression_min_bytes": server.COMPRESSION_MIN_BYTES,
+                "python": sys.version.split()[0],
+            },
+            "routes": routes,
+        }
+
+    workloads = make_workloads()
+    weights = [w.weight for w in workloads]
+    results = {w.name: [] for w in workloads}
+    remaining = itertools.count()
+
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=ADMIN_HEADERS) as http:
+
+            async def worker():
+                while next(remaining) < args.requests:
+                    workload = random.choices(workloads, weights)[0]
+                    method, url, kwargs = workload.build()
+                    started = time.perf_counter()
+                    response = await http.request(method, url, **kwargs)
+                    elapsed = time.perf_counter() - started
+                    results[workload.name].append((elapsed, response.status_code in workload.expected))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    all_samples = [s for samples in results.values() for s in samples]
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_leads": args.seed_leads,
+            "seed": args.seed,
+            "python": sys.version.split()[0],
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(all_samples, elapsed),
+        "routes": {name: summarize(samples, elapsed) for name, samples in results.items() if samples},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process API latency benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed-leads", type=int, default=1000, help="quotes inserted before the run")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the workload mix")
+    parser.add_argument("--payloads", action="store_true", help="report response sizes and encoding CPU instead of latency")
+    parser.add_argument("--repeat", type=int, default=50, help="requests per route and encoding with --payloads, days per size with --dispatch")
+    parser.add_argument("--dispatch", action="store_true", help="time the dispatch planner on synthetic storm-surge days")
+    parser.add_argument("--crews", type=int, default=6, help="crews to plan for with --dispatch")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's info/warning logs")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    report = measure_dispatch(args) if args.dispatch else asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    return 1 if report.get("total", {}).get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
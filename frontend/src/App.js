@@ -38,6 +38,25 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Local calendar date as YYYY-MM-DD (toISOString would shift it to UTC)
+const formatDate = (date) => {
+  const month = String(date.getMonth() + 1).padStart(2, '0');
+  const day = String(date.getDate()).padStart(2, '0');
+  return `${date.getFullYear()}-${month}-${day}`;
+};
+
+const BOOKING_WINDOW_DAYS = 60;
+
+// One key per filled-in form, so double submits and retries create a single lead
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// Variant URLs from the API are root-relative; the API may live on another origin
+const absoluteSrcset = (srcset) =>
+  srcset.split(", ").map((entry) => (entry.startsWith("/") ? `${BACKEND_URL}${entry}` : entry)).join(", ");
+
 // Icon mapping
 const iconMap = {
   TreeDeciduous: TreeDeciduous,
@@ -143,6 +162,7 @@ const HeroSection = () => {
     message: ''
   });
   const [loading, setLoading] = useState(false);
+  const [submitKey, setSubmitKey] = useState(newIdempotencyKey);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -153,9 +173,10 @@ const HeroSection = () => {
     
     setLoading(true);
     try {
-      await axios.post(`${API}/quotes`, formData);
+      await axios.post(`${API}/quotes`, formData, { headers: { 'Idempotency-Key': submitKey } });
       toast.success("Quote request submitted! We'll contact you shortly.");
       setFormData({ name: '', email: '', phone: '', service: '', address: '', message: '' });
+      setSubmitKey(newIdempotencyKey());
     } catch (error) {
       toast.error("Failed to submit quote request. Please try again.");
     } finally {
@@ -300,21 +321,7 @@ const HeroSection = () => {
 };
 
 // Services Section
-const ServicesSection = () => {
-  const [services, setServices] = useState([]);
-
-  useEffect(() => {
-    const fetchServices = async () => {
-      try {
-        const response = await axios.get(`${API}/services`);
-        setServices(response.data);
-      } catch (error) {
-        console.error("Failed to fetch services:", error);
-      }
-    };
-    fetchServices();
-  }, []);
-
+const ServicesSection = ({ services }) => {
   return (
     <section id="services" className="py-20 md:py-32 bg-[#F5F5F0] grain-overlay" data-testid="services-section">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 relative z-10">
@@ -358,21 +365,7 @@ const ServicesSection = () => {
 };
 
 // Testimonials Section
-const TestimonialsSection = () => {
-  const [testimonials, setTestimonials] = useState([]);
-
-  useEffect(() => {
-    const fetchTestimonials = async () => {
-      try {
-        const response = await axios.get(`${API}/testimonials`);
-        setTestimonials(response.data);
-      } catch (error) {
-        console.error("Failed to fetch testimonials:", error);
-      }
-    };
-    fetchTestimonials();
-  }, []);
-
+const TestimonialsSection = ({ testimonials }) => {
   return (
     <section id="testimonials" className="py-20 md:py-32 bg-[#1A3C34]" data-testid="testimonials-section">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
@@ -413,21 +406,7 @@ const TestimonialsSection = () => {
 };
 
 // Gallery Section
-const GallerySection = () => {
-  const [gallery, setGallery] = useState([]);
-
-  useEffect(() => {
-    const fetchGallery = async () => {
-      try {
-        const response = await axios.get(`${API}/gallery`);
-        setGallery(response.data);
-      } catch (error) {
-        console.error("Failed to fetch gallery:", error);
-      }
-    };
-    fetchGallery();
-  }, []);
-
+const GallerySection = ({ gallery }) => {
   return (
     <section id="gallery" className="py-20 md:py-32 bg-[#E5E5E0]" data-testid="gallery-section">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
@@ -444,11 +423,23 @@ const GallerySection = () => {
               style={{ animationDelay: `${index * 100}ms` }}
               data-testid={`gallery-item-${item.id}`}
             >
-              <img 
-                src={item.image_url} 
-                alt={item.title}
-                className="w-full h-auto object-cover"
-              />
+              <picture>
+                {(item.image_sources || []).map((source) => (
+                  <source
+                    key={source.type}
+                    type={source.type}
+                    srcSet={absoluteSrcset(source.srcset)}
+                    sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
+                  />
+                ))}
+                <img 
+                  src={item.image_url} 
+                  alt={item.title}
+                  className="w-full h-auto object-cover"
+                  loading="lazy"
+                  decoding="async"
+                />
+              </picture>
               <div className="overlay">
                 <span className="text-xs uppercase tracking-widest text-[#F97316] mb-1">{item.category}</span>
                 <h4 className="text-lg font-bold" style={{ fontFamily: 'Barlow Condensed, sans-serif' }}>{item.title}</h4>
@@ -463,7 +454,7 @@ const GallerySection = () => {
 };
 
 // Booking Section
-const BookingSection = () => {
+const BookingSection = ({ initialAvailability }) => {
   const [selectedDate, setSelectedDate] = useState(undefined);
   const [formData, setFormData] = useState({
     name: '',
@@ -475,14 +466,53 @@ const BookingSection = () => {
     notes: ''
   });
   const [loading, setLoading] = useState(false);
-
-  const timeSlots = [
+  const [submitKey, setSubmitKey] = useState(newIdempotencyKey);
+  const [availability, setAvailability] = useState({});
+  const [timeSlots, setTimeSlots] = useState([
     "8:00 AM - 10:00 AM",
     "10:00 AM - 12:00 PM",
     "12:00 PM - 2:00 PM",
     "2:00 PM - 4:00 PM",
     "4:00 PM - 6:00 PM"
-  ];
+  ]);
+
+  const applyAvailability = (data) => {
+    const byDate = {};
+    data.days.forEach((day) => { byDate[day.date] = day; });
+    setAvailability(byDate);
+    setTimeSlots(data.time_slots);
+  };
+
+  // Refreshes after a submission; the first load comes with the bootstrap document
+  const fetchAvailability = async () => {
+    const from = new Date();
+    const to = new Date();
+    to.setDate(to.getDate() + BOOKING_WINDOW_DAYS);
+    try {
+      const response = await axios.get(`${API}/availability`, {
+        params: { from: formatDate(from), to: formatDate(to) }
+      });
+      applyAvailability(response.data);
+    } catch (error) {
+      console.error("Failed to fetch availability:", error);
+    }
+  };
+
+  useEffect(() => {
+    if (initialAvailability) applyAvailability(initialAvailability);
+  }, [initialAvailability]);
+
+  const isDateFull = (date) => {
+    const day = availability[formatDate(date)];
+    return day !== undefined && !day.available;
+  };
+
+  const slotRemaining = (slot) => {
+    if (!selectedDate) return null;
+    const day = availability[formatDate(selectedDate)];
+    const match = day && day.slots.find((s) => s.time === slot);
+    return match ? match.remaining : null;
+  };
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -495,14 +525,20 @@ const BookingSection = () => {
     try {
       await axios.post(`${API}/bookings`, {
         ...formData,
-        preferred_date: selectedDate.toISOString().split('T')[0]
-      });
+        preferred_date: formatDate(selectedDate)
+      }, { headers: { 'Idempotency-Key': submitKey } });
       toast.success("Booking request submitted! We'll confirm your appointment shortly.");
       setFormData({ name: '', email: '', phone: '', service: '', address: '', preferred_time: '', notes: '' });
+      setSubmitKey(newIdempotencyKey());
       setSelectedDate(undefined);
     } catch (error) {
-      toast.error("Failed to submit booking. Please try again.");
+      if (error.response?.status === 409) {
+        toast.error("That time slot was just booked. Please choose another.");
+      } else {
+        toast.error("Failed to submit booking. Please try again.");
+      }
     } finally {
+      fetchAvailability();
       setLoading(false);
     }
   };
@@ -527,7 +563,7 @@ const BookingSection = () => {
                       mode="single"
                       selected={selectedDate}
                       onSelect={setSelectedDate}
-                      disabled={(date) => date < new Date() || date.getDay() === 0}
+                      disabled={(date) => date < new Date() || date.getDay() === 0 || isDateFull(date)}
                       className="rounded-none"
                       data-testid="booking-calendar"
                     />
@@ -594,7 +630,9 @@ const BookingSection = () => {
                       </SelectTrigger>
                       <SelectContent>
                         {timeSlots.map((slot) => (
-                          <SelectItem key={slot} value={slot}>{slot}</SelectItem>
+                          <SelectItem key={slot} value={slot} disabled={slotRemaining(slot) === 0}>
+                            {slotRemaining(slot) === 0 ? `${slot} (fully booked)` : slot}
+                          </SelectItem>
                         ))}
                       </SelectContent>
                     </Select>
@@ -651,6 +689,7 @@ const ContactSection = () => {
     message: ''
   });
   const [loading, setLoading] = useState(false);
+  const [submitKey, setSubmitKey] = useState(newIdempotencyKey);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -661,9 +700,10 @@ const ContactSection = () => {
 
     setLoading(true);
     try {
-      await axios.post(`${API}/contact`, formData);
+      await axios.post(`${API}/contact`, formData, { headers: { 'Idempotency-Key': submitKey } });
       toast.success("Message sent! We'll get back to you soon.");
       setFormData({ name: '', email: '', phone: '', subject: '', message: '' });
+      setSubmitKey(newIdempotencyKey());
     } catch (error) {
       toast.error("Failed to send message. Please try again.");
     } finally {
@@ -886,6 +926,20 @@ const Footer = () => {
 // Main Home Page
 const Home = () => {
   const [scrolled, setScrolled] = useState(false);
+  const [bootstrap, setBootstrap] = useState(null);
+
+  // One request for everything the page renders on load
+  useEffect(() => {
+    const fetchBootstrap = async () => {
+      try {
+        const response = await axios.get(`${API}/bootstrap`);
+        setBootstrap(response.data);
+      } catch (error) {
+        console.error("Failed to fetch page data:", error);
+      }
+    };
+    fetchBootstrap();
+  }, []);
 
   useEffect(() => {
     const handleScroll = () => {
@@ -899,10 +953,10 @@ const Home = () => {
     <div className="min-h-screen" data-testid="home-page">
       <Navigation scrolled={scrolled} />
       <HeroSection />
-      <ServicesSection />
-      <TestimonialsSection />
-      <GallerySection />
-      <BookingSection />
+      <ServicesSection services={bootstrap?.services || []} />
+      <TestimonialsSection testimonials={bootstrap?.testimonials || []} />
+      <GallerySection gallery={bootstrap?.gallery || []} />
+      <BookingSection initialAvailability={bootstrap?.availability} />
       <ContactSection />
       <Footer />
     </div>
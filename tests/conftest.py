@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+
+@pytest.fixture
+def server_module():
+    """The backend app wired to an in-memory Mongo"""
+    import server
+
+    mock_client = AsyncMongoMockClient(tz_aware=True)
+    original = server.client
+    server.bind_database(mock_client)
+    server.availability_cache.clear()
+    server.rate_limit_store.clear()
+    yield server
+    server.bind_database(original)
+
+
+@pytest.fixture
+def api(server_module):
+    with TestClient(server_module.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_headers(server_module, monkeypatch):
+    """Enable the admin API and return headers that pass require_admin"""
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    return {"Authorization": "Bearer s3cret"}
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import date
+
+from mongomock_motor import AsyncMongoMockClient
+
+from backfill_booking_slots import backfill
+
+MORNING = "8:00 AM - 10:00 AM"
+NOON = "12:00 PM - 2:00 PM"
+
+
+def test_backfill_counts_existing_bookings():
+    async def scenario():
+        db = AsyncMongoMockClient()["test"]
+        await db.bookings.insert_many([
+            {"id": "a", "preferred_date": "2030-03-04", "preferred_time": MORNING},
+            {"id": "b", "preferred_date": "2030-03-04", "preferred_time": NOON},
+            {"id": "c", "preferred_date": "2030-03-04", "preferred_time": NOON},
+            # A slot a post-deploy reservation already created without counting "d"
+            {"id": "d", "preferred_date": "2030-03-05", "preferred_time": MORNING},
+            {"id": "e", "preferred_date": "2030-03-05", "preferred_time": MORNING},
+            {"id": "past", "preferred_date": "2020-01-01", "preferred_time": MORNING},
+            {"id": "bad", "preferred_date": "someday", "preferred_time": MORNING},
+            {"id": "odd", "preferred_date": "2030-03-04", "preferred_time": "whenever"},
+        ])
+        await db.booking_slots.insert_one({"date": "2030-03-05", "time": MORNING, "capacity": 2, "remaining": 1})
+
+        today = date(2030, 1, 1)
+        assert await backfill(db, today, dry_run=True) == {"updated": 1, "created": 2, "unchanged": 0, "skipped": 0}
+        assert await db.booking_slots.count_documents({}) == 1
+
+        assert await backfill(db, today) == {"updated": 1, "created": 2, "unchanged": 0, "skipped": 0}
+        slots = {
+            (slot["date"], slot["time"]): slot["remaining"]
+            async for slot in db.booking_slots.find({}, {"_id": 0})
+        }
+        assert slots == {("2030-03-04", MORNING): 1, ("2030-03-04", NOON): 0, ("2030-03-05", MORNING): 0}
+
+        # Re-running is a no-op
+        assert await backfill(db, today) == {"updated": 0, "created": 0, "unchanged": 3, "skipped": 0}
+
+    asyncio.run(scenario())
+
+
+def test_backfilled_slot_refuses_overbooking(api, server_module):
+    async def seed():
+        await server_module.db.bookings.insert_many([
+            {"id": f"old{i}", "preferred_date": "2030-03-04", "preferred_time": MORNING} for i in range(2)
+        ])
+        await backfill(server_module.db, date(2030, 1, 1))
+
+    asyncio.run(seed())
+    booking = {
+        "name": "Late", "email": "late@example.com", "phone": "0412 345 678", "service": "tree-removal",
+        "address": "1 Crown St, Wollongong NSW 2500", "preferred_date": "2030-03-04", "preferred_time": MORNING,
+    }
+    assert api.post("/api/bookings", json=booking).status_code == 409
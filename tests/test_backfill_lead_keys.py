@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime, timezone
+
+from backfill_lead_keys import backfill
+
+LEAD = {"name": "Legacy Lead", "service": "tree-removal", "address": "1 Crown St, Wollongong NSW 2500", "message": ""}
+
+
+def test_backfill_keys_legacy_leads_in_batches(server_module):
+    async def scenario():
+        await server_module.db.contacts.insert_one({"id": "c", "email": "Old@Example.com", "phone": "+61 412 000 111"})
+        assert (await backfill(server_module.db, dry_run=True))["contacts"] == 1
+        assert "email_key" not in await server_module.db.contacts.find_one({})
+
+        assert await backfill(server_module.db, batch_size=1) == {"quotes": 0, "bookings": 0, "contacts": 1}
+        doc = await server_module.db.contacts.find_one({})
+        assert (doc["email_key"], doc["phone_key"]) == ("old@example.com", "0412000111")
+
+    asyncio.run(scenario())
+
+
+def test_search_finds_leads_stored_before_the_keys(api, server_module, admin_headers):
+    legacy = {**LEAD, "id": "legacy", "email": "legacy@example.com", "phone": "0412 000 111", "created_at": datetime.now(timezone.utc)}
+    asyncio.run(server_module.db.quotes.insert_one(dict(legacy)))
+
+    found = api.get("/api/leads/search", params={"q": "legacy@example.com"}, headers=admin_headers).json()
+    assert [lead["id"] for lead in found] == ["legacy"]
+    assert api.get("/api/leads/search", params={"q": "0412 000 111"}, headers=admin_headers).json() == []
+
+    assert asyncio.run(backfill(server_module.db))["quotes"] == 1
+    assert asyncio.run(backfill(server_module.db))["quotes"] == 0
+    found = api.get("/api/leads/search", params={"q": "0412 000 111"}, headers=admin_headers).json()
+    assert [lead["id"] for lead in found] == ["legacy"]
@@ -0,0 +1,67 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import BaseModel
+
+from catalog import CatalogCache
+
+
+class Item(BaseModel):
+    id: str
+    title: str
+
+
+SEED = [{"id": "a", "title": "First"}, {"id": "b", "title": "Second"}]
+
+
+class NoDatabase:
+    def __getitem__(self, name):
+        raise AssertionError(f"unexpected query on {name}")
+
+
+def worker(db, ttl=30.0):
+    cache = CatalogCache("items", Item, SEED, list, ttl=ttl)
+    cache.db = db
+    return cache
+
+
+def test_seeds_once_and_serves_from_memory():
+    async def scenario():
+        db = AsyncMongoMockClient().db
+        cache = worker(db)
+        await cache.warm()
+        assert [item["title"] for item in await cache.get()] == ["First", "Second"]
+
+        # Items deleted by an admin are not re-seeded by the next worker to start
+        await db["items"].delete_many({})
+        await worker(db).warm()
+        assert await db["items"].count_documents({}) == 0
+
+        cache.db = NoDatabase()
+        for _ in range(100):
+            assert len(await cache.get()) == 2
+
+    asyncio.run(scenario())
+
+
+def test_version_bump_reaches_other_workers_after_ttl():
+    async def scenario():
+        db = AsyncMongoMockClient().db
+        editor, reader = worker(db), worker(db, ttl=0.0)
+        await editor.warm()
+        await reader.warm()
+
+        await editor.upsert(Item(id="c", title="Third"))
+        await editor.upsert(Item(id="a", title="Renamed"), position=5)
+        assert [item["id"] for item in await editor.get()] == ["b", "c", "a"]
+
+        # The first read after the TTL serves the old copy and refreshes in the background
+        assert len(await reader.get()) == 2
+        await reader._refresh
+        assert [item["title"] for item in await reader.get()] == ["Second", "Third", "Renamed"]
+
+        assert await editor.delete("c")
+        assert not await editor.delete("missing")
+        assert editor.version == reader.version + 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import gzip
+import zlib
+
+import brotli
+
+from compression import choose_encoding
+
+
+QUOTE = {
+    "name": "Test User",
+    "email": "test@example.com",
+    "phone": "0412 345 678",
+    "service": "tree-removal",
+    "address": "1 Crown St, Wollongong NSW 2500",
+    "message": "Large gum leaning over the fence",
+}
+
+
+def raw_get(api, url, encoding, headers=None, **kwargs):
+    """Fetch without letting httpx decode the body, so we see the wire bytes"""
+    with api.stream("GET", url, headers={**(headers or {}), "Accept-Encoding": encoding}, **kwargs) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_choose_encoding_honours_quality_values():
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("*, br;q=0") == "gzip"
+
+
+def test_catalog_serves_precompressed_variants(api):
+    plain, plain_body = raw_get(api, "/api/services", "identity")
+    assert "content-encoding" not in plain.headers
+
+    response, body = raw_get(api, "/api/services", "br")
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert brotli.decompress(body) == plain_body
+    assert response.headers["etag"] != plain.headers["etag"]
+
+    cached = api.get("/api/services", headers={"Accept-Encoding": "br", "If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    response, body = raw_get(api, "/api/services", "gzip")
+    assert gzip.decompress(body) == plain_body
+
+
+def test_small_responses_are_not_compressed(api):
+    response, body = raw_get(api, "/api/", "gzip")
+    assert "content-encoding" not in response.headers
+    assert body == b'{"message":"Illawarra Tree Removal API"}'
+
+
+def test_large_lists_are_compressed(api, server_module, admin_headers):
+    for i in range(20):
+        api.post("/api/quotes", json={**QUOTE, "email": f"list{i}@example.com"})
+
+    plain = api.get("/api/quotes", headers={**admin_headers, "Accept-Encoding": "identity"})
+    response, body = raw_get(api, "/api/quotes", "gzip", headers=admin_headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(body) < len(plain.content)
+    assert gzip.decompress(body) == plain.content
+
+
+def test_ndjson_stream_is_compressed_per_chunk(api, admin_headers):
+    for i in range(5):
+        api.post("/api/quotes", json={**QUOTE, "email": f"stream{i}@example.com"})
+
+    response, body = raw_get(api, "/api/quotes", "gzip", headers=admin_headers, params={"format": "ndjson"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = zlib.decompress(body, 31).decode().strip().split("\n")
+    assert len(lines) == 5
+
+
+def test_create_returns_trusted_json(api):
+    response = api.post("/api/quotes", json=QUOTE)
+    body = response.json()
+    assert response.headers["content-type"] == "application/json"
+    assert body["email"] == QUOTE["email"]
+    assert body["created_at"].endswith("Z")
+    assert "dedup_key" not in body
@@ -0,0 +1,78 @@
+import random
+
+from dispatch import distance_matrix, nearest_neighbour, path_length, plan_day, two_opt, window_minutes
+from suburbs import SUBURBS, geocode
+
+SLOTS = ["8:00 AM - 10:00 AM", "10:00 AM - 12:00 PM", "12:00 PM - 2:00 PM"]
+DEPOT = (-34.4250, 150.8930)
+
+
+def test_geocode_prefers_the_suburb_after_the_street():
+    assert geocode("1 Crown St, Wollongong NSW 2500").suburb == "Wollongong"
+    assert geocode("4 Smith St, north wollongong 2500").suburb == "North Wollongong"
+    assert geocode("12 Dapto Rd, Horsley NSW 2530").suburb == "Horsley"
+    # The postcode settles which of two named suburbs is meant
+    assert geocode("3 Kiama St, Albion Park 2527").suburb == "Albion Park"
+
+    by_postcode = geocode("Lot 4 Princes Hwy 2533")
+    assert by_postcode.precision == "postcode" and by_postcode.suburb is None
+    assert geocode("1 George St, Sydney NSW 2000") is None
+    assert geocode("") is None
+
+
+def test_window_minutes():
+    assert window_minutes("8:00 AM - 10:00 AM") == 120
+    assert window_minutes("12:00 PM - 2:00 PM") == 120
+    assert window_minutes("whenever") is None
+
+
+def test_two_opt_never_lengthens_the_path():
+    rng = random.Random(7)
+    for _ in range(20):
+        points = [(rng.uniform(0, 50), rng.uniform(0, 50)) for _ in range(30)]
+        dist = distance_matrix(points)
+        greedy = nearest_neighbour(dist, 0, range(1, len(points)))
+        improved = two_opt(list(greedy), dist)
+        assert improved[0] == 0 and sorted(improved) == list(range(len(points)))
+        assert path_length(improved, dist) <= path_length(greedy, dist) + 1e-9
+
+
+def test_plan_assigns_every_located_job_once():
+    rng = random.Random(3)
+    bookings = [
+        {
+            "id": f"b{i}",
+            "service": "tree-trimming",
+            "address": f"{i} Test St, {suburb.name} NSW {suburb.postcode}",
+            "preferred_time": SLOTS[i % len(SLOTS)],
+        }
+        for i, suburb in enumerate(rng.choices(SUBURBS, k=90))
+    ]
+    bookings.append({"id": "lost", "address": "Somewhere in the bush", "preferred_time": SLOTS[0]})
+
+    plan = plan_day(bookings, 3, SLOTS, DEPOT)
+    assigned = [stop["booking_id"] for route in plan["routes"] for stop in route["stops"]]
+    assert sorted(assigned) == sorted(b["id"] for b in bookings[:-1])
+    assert plan["unlocated"] == [{"booking_id": "lost", "address": "Somewhere in the bush"}]
+    assert [crew["jobs"] for crew in plan["crews"]] == [30, 30, 30]
+    assert [route["window"] for route in plan["routes"][:3]] == SLOTS
+    assert plan["distance_km"] == round(sum(crew["distance_km"] for crew in plan["crews"]), 2)
+
+
+def test_dispatch_plan_route(api, server_module, monkeypatch):
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    admin = {"Authorization": "Bearer s3cret"}
+    assert api.get("/api/dispatch/plan", params={"date": "2030-03-04"}).status_code == 401
+
+    for i, address in enumerate(["1 Lawrence Hargrave Dr, Thirroul NSW 2515", "9 Terralong St, Kiama NSW 2533"]):
+        booking = {
+            "name": f"Crew Test {i}", "email": f"crew{i}@example.com", "phone": f"041234567{i}",
+            "service": "tree-removal", "address": address,
+            "preferred_date": "2030-03-04", "preferred_time": "8:00 AM - 10:00 AM",
+        }
+        assert api.post("/api/bookings", json=booking).status_code == 200
+
+    plan = api.get("/api/dispatch/plan", params={"date": "2030-03-04", "crews": 2}, headers=admin).json()
+    assert plan["date"] == "2030-03-04" and plan["jobs"] == 2
+    suburbs = sorted(route["stops"][0]["suburb"] for route in plan["routes"])
+    assert suburbs == ["Kiama", "Thirroul"]
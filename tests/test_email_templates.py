@@ -0,0 +1,37 @@
+from email_templates import render_notification
+
+BOOKING = {
+    "name": "Jo <script>",
+    "email": "jo@example.com",
+    "phone": "0412 345 678",
+    "service": "tree-trimming",
+    "address": "5 Addison St & Co",
+    "preferred_date": "2030-03-04",
+    "preferred_time": "10:00 AM - 12:00 PM",
+    "notes": "",
+}
+
+
+def test_single_lead_is_escaped_in_html_only():
+    message = render_notification("booking", [BOOKING])
+    assert message["subject"] == "New Booking from Jo <script>"
+    assert "Jo &lt;script&gt;" in message["html"]
+    assert "<script>" not in message["html"]
+    assert "5 Addison St &amp; Co" in message["html"]
+    assert "Address: 5 Addison St & Co" in message["text"]
+    assert "Notes: N/A" in message["text"]
+
+
+def test_subject_cannot_inject_headers():
+    message = render_notification("contact", [{"name": "Jo", "email": "jo@example.com", "subject": "Hi\r\nBcc: x@example.com", "message": "?"}])
+    assert "\n" not in message["subject"]
+    assert "\r" not in message["subject"]
+
+
+def test_digest_lists_every_lead():
+    leads = [{**BOOKING, "name": f"Lead {i}"} for i in range(3)]
+    message = render_notification("booking", leads)
+    assert message["subject"] == "3 New Bookings"
+    for i in range(3):
+        assert f"{i + 1}. Lead {i}" in message["text"]
+        assert f"Lead {i}" in message["html"]
@@ -0,0 +1,109 @@
+import asyncio
+import io
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import images
+from images import DiskLRU, ImageStore
+
+
+def write_source(directory, image_id, size=(1200, 800)):
+    directory.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (34, 120, 60)).save(directory / f"{image_id}.jpg", "JPEG")
+
+
+@pytest.fixture
+def store(tmp_path):
+    write_source(tmp_path / "sources", "gallery-1")
+    return ImageStore(tmp_path / "sources", tmp_path / "cache", widths=(320, 640, 1920))
+
+
+def test_widths_are_bucketed_and_capped_at_the_source(store):
+    source = store.source("gallery-1")
+    assert store.bucket(source, 100) == 320
+    assert store.bucket(source, 321) == 640
+    assert store.bucket(source, None) == 1200
+    assert store.bucket(source, 5000) == 1200
+    assert store.source("../etc/passwd") is None
+    assert store.source("missing") is None
+
+
+def test_sources_list_srcsets_best_format_first(store):
+    digest = store.source("gallery-1").digest
+    avif, webp = store.sources("gallery-1")
+    assert avif["type"] == "image/avif"
+    assert webp["srcset"] == ", ".join(
+        f"/api/images/gallery-1?w={w}&fmt=webp&v={digest} {w}w" for w in (320, 640, 1200)
+    )
+    assert store.sources("missing") is None
+
+
+def test_variants_are_encoded_once_and_cached(store, monkeypatch):
+    calls = []
+    encode = images.encode_variant
+    monkeypatch.setattr(images, "encode_variant", lambda *args: calls.append(args) or encode(*args))
+
+    async def scenario():
+        return await asyncio.gather(*(store.variant("gallery-1", 500, "webp") for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    path, _, width = results[0]
+    assert width == 640
+    with Image.open(path) as image:
+        assert image.format == "WEBP" and image.size == (640, 427)
+
+    asyncio.run(store.variant("gallery-1", 640, "webp"))
+    assert len(calls) == 1
+
+
+def test_variant_reads_the_source_off_the_event_loop(store, monkeypatch):
+    threads = []
+    source = store.source
+    monkeypatch.setattr(store, "source", lambda image_id: threads.append(threading.current_thread()) or source(image_id))
+
+    asyncio.run(store.variant("gallery-1", 320, "webp"))
+    assert threads and threading.main_thread() not in threads
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    assert cache.get("a") is not None
+    cache.put("c", b"x" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 20
+    # Recency is rebuilt from disk by another worker or after a restart
+    assert DiskLRU(tmp_path, max_bytes=25).size == 20
+
+
+def test_image_route_and_catalog_srcsets(server_module, tmp_path, monkeypatch):
+    write_source(tmp_path / "sources", "gallery-1", size=(800, 600))
+    monkeypatch.setattr(server_module, "image_store", ImageStore(tmp_path / "sources", tmp_path / "cache"))
+
+    with TestClient(server_module.app) as api:
+        gallery = api.get("/api/gallery").json()
+        assert gallery[0]["image_id"] == "gallery-1"
+        assert gallery[1]["image_sources"] is None
+        url = gallery[0]["image_sources"][1]["srcset"].split(", ")[0].split(" ")[0]
+
+        response = api.get(url)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "immutable" in response.headers["cache-control"]
+        assert Image.open(io.BytesIO(response.content)).width == 320
+
+        cached = api.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+
+        negotiated = api.get("/api/images/gallery-1", headers={"Accept": "image/avif,image/webp,*/*"})
+        assert negotiated.headers["content-type"] == "image/avif"
+        assert negotiated.headers["vary"] == "Accept"
+        assert "immutable" not in negotiated.headers["cache-control"]
+
+        assert api.get("/api/images/gallery-9").status_code == 404
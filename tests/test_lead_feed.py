@@ -0,0 +1,97 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from lead_feed import LeadFeed, event_id, format_sse, parse_event_id
+
+COLLECTIONS = {"quote": "quotes", "booking": "bookings"}
+START = datetime(2030, 3, 4, 1, tzinfo=timezone.utc)
+
+
+def lead(n, **extra):
+    return {"id": f"lead-{n:03d}", "name": f"Lead {n}", "created_at": START + timedelta(seconds=n), **extra}
+
+
+def encode(doc):
+    return json.dumps(doc, default=str).encode()
+
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+    return fields.get("event"), fields.get("id"), json.loads(fields["data"]) if "data" in fields else None
+
+
+def test_event_ids_round_trip_at_millisecond_precision():
+    doc = lead(1, created_at=START + timedelta(microseconds=1500))
+    assert event_id(doc) == f"{int(START.timestamp() * 1000) + 1}-lead-001"
+    assert parse_event_id(event_id(doc)) == (START + timedelta(milliseconds=1), "lead-001")
+    assert parse_event_id("garbage") is None
+    # Out of range for a datetime, or not ASCII digits at all
+    assert parse_event_id("9" * 30 + "-x") is None
+    assert parse_event_id("9" * 400 + "-x") is None
+    assert parse_event_id("\u00b2-x") is None
+    assert format_sse("quote", b'{"a":1}', id="1-x") == b'id: 1-x\nevent: quote\ndata: {"a":1}\n\n'
+
+
+def test_hub_fans_out_to_every_subscriber_once():
+    async def scenario():
+        feed = LeadFeed(None, COLLECTIONS, hidden_fields=("_id", "email_key"), mode="local")
+        clients = [feed.stream(None, ["quote", "booking"], encode) for _ in range(3)]
+        bookings_only = feed.stream(None, ["booking"], encode)
+        for client in clients + [bookings_only]:
+            assert (await client.__anext__()).startswith(b"retry:")
+
+        feed.publish("quote", [lead(1, email_key="x")])
+        feed.publish("quote", [lead(1, email_key="x")])
+        feed.publish("booking", [lead(2)])
+        for client in clients:
+            assert parse(await client.__anext__())[:2] == ("quote", event_id(lead(1)))
+            assert parse(await client.__anext__())[0] == "booking"
+        event, _, data = parse(await bookings_only.__anext__())
+        assert (event, data["id"]) == ("booking", "lead-002")
+
+        assert len(feed.subscribers) == 4
+        for client in clients + [bookings_only]:
+            await client.aclose()
+        assert not feed.subscribers
+
+    asyncio.run(scenario())
+
+
+def test_last_event_id_replays_then_goes_live():
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True).db
+        await db.quotes.insert_many([lead(1), lead(3)])
+        await db.bookings.insert_one(lead(2))
+        feed = LeadFeed(db, COLLECTIONS, mode="local")
+
+        client = feed.stream(event_id(lead(1)), ["quote", "booking"], encode, heartbeat=0.05)
+        await client.__anext__()
+        replayed = [parse(await client.__anext__()) for _ in range(2)]
+        assert [(event, data["id"]) for event, _, data in replayed] == [("booking", "lead-002"), ("quote", "lead-003")]
+        assert "_id" not in replayed[0][2]
+
+        # Already replayed, so the live copy is skipped
+        feed.publish("quote", [lead(3)])
+        assert await client.__anext__() == b": ping\n\n"
+        feed.publish("quote", [lead(4)])
+        assert parse(await client.__anext__())[2]["id"] == "lead-004"
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_disconnected():
+    async def scenario():
+        feed = LeadFeed(None, COLLECTIONS, mode="local", queue_size=2)
+        client = feed.stream(None, ["quote"], encode)
+        await client.__anext__()
+        feed.publish("quote", [lead(n) for n in range(5)])
+        # The backlog overflowed: what was queued is delivered, then the stream ends
+        received = [parse(chunk)[2]["id"] async for chunk in client]
+        assert received == ["lead-000", "lead-001"]
+        assert not feed.subscribers
+
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+from pymongo import monitoring
+
+from metrics import MongoPoolMetrics
+
+ADDRESS = ("db.internal", 27017)
+
+
+def test_pool_metrics_track_checkouts_and_waiters():
+    listener = MongoPoolMetrics()
+    listener.pool_created(monitoring.PoolCreatedEvent(ADDRESS, {}))
+    for connection_id in (1, 2):
+        listener.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, connection_id))
+    for _ in range(3):
+        listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 2))
+
+    pool = listener.snapshot()["servers"]["db.internal:27017"]
+    assert (pool["open"], pool["checked_out"], pool["waiting"]) == (2, 2, 1)
+
+    listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout"))
+    listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    listener.connection_closed(monitoring.ConnectionClosedEvent(ADDRESS, 1, "idle"))
+    total = listener.snapshot()["total"]
+    assert total == {"open": 1, "checked_out": 1, "waiting": 0, "checkout_failures": 1, "cleared": 0}
+
+    listener.pool_closed(monitoring.PoolClosedEvent(ADDRESS))
+    assert listener.snapshot()["servers"] == {}
@@ -0,0 +1,36 @@
+import asyncio
+from datetime import datetime, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from migrate_datetimes import migrate
+
+
+def test_migrate_converts_string_dates_in_batches():
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True)["test"]
+        await db.quotes.insert_many([
+            {"id": str(i), "created_at": f"2025-01-0{i + 1}T10:00:00+00:00"} for i in range(5)
+        ])
+        await db.bookings.insert_one({"id": "b", "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)})
+        await db.contacts.insert_one({"id": "c", "created_at": "not a date"})
+
+        assert await migrate(db, batch_size=2) == {"quotes": 5, "bookings": 0, "contacts": 0}
+        doc = await db.quotes.find_one({"id": "0"})
+        assert doc["created_at"] == datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+        assert await db.contacts.find_one({"created_at": "not a date"})
+
+        # Re-running is a no-op
+        assert await migrate(db, batch_size=2) == {"quotes": 0, "bookings": 0, "contacts": 0}
+
+    asyncio.run(scenario())
+
+
+def test_dry_run_writes_nothing():
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True)["test"]
+        await db.quotes.insert_one({"id": "1", "created_at": "2025-01-01T10:00:00+00:00"})
+        assert (await migrate(db, dry_run=True))["quotes"] == 1
+        assert isinstance((await db.quotes.find_one({}))["created_at"], str)
+
+    asyncio.run(scenario())
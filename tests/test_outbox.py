@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from email_templates import render_notification
+from outbox import EmailOutbox
+
+LEAD = {"name": "Jo", "email": "jo@example.com", "phone": "0412 345 678", "service": "tree-removal", "address": "1 Crown St"}
+
+
+class FakeEmailSender:
+    """Records sent messages; fails the first `failures` calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def __call__(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("provider unavailable")
+        self.sent.append(message)
+        return {"id": f"fake-{len(self.sent)}"}
+
+
+def make_outbox(sender, **kwargs):
+    collection = AsyncMongoMockClient()["test"]["email_outbox"]
+    kwargs.setdefault("base_delay", 0)
+    return EmailOutbox(collection, sender, render_notification, **kwargs), collection
+
+
+def test_enqueue_does_not_send():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender)
+        await outbox.enqueue("quote", [LEAD])
+        doc = await collection.find_one({})
+        assert doc["status"] == "pending"
+        assert sender.sent == []
+
+    asyncio.run(scenario())
+
+
+def test_dispatch_sends_in_batches():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender, batch_size=3)
+        for i in range(5):
+            await outbox.enqueue("quote", [{**LEAD, "name": f"Lead {i}"}])
+        assert await outbox.dispatch_once() == 3
+        assert await outbox.dispatch_once() == 2
+        assert await outbox.dispatch_once() == 0
+        assert len(sender.sent) == 5
+        assert await collection.count_documents({"status": "sent"}) == 5
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_is_retried_with_backoff():
+    async def scenario():
+        sender = FakeEmailSender(failures=1)
+        outbox, collection = make_outbox(sender, base_delay=60)
+        await outbox.enqueue("quote", [LEAD])
+        await outbox.dispatch_once()
+        doc = await collection.find_one({})
+        assert doc["status"] == "pending"
+        assert doc["attempts"] == 1
+        assert doc["last_error"] == "provider unavailable"
+        # Not due yet, so nothing is claimed
+        assert await outbox.dispatch_once() == 0
+
+        await collection.update_one({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+        assert await outbox.dispatch_once() == 1
+        doc = await collection.find_one({})
+        assert doc["status"] == "sent"
+        assert len(sender.sent) == 1
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_after_max_attempts():
+    async def scenario():
+        sender = FakeEmailSender(failures=10)
+        outbox, collection = make_outbox(sender, max_attempts=2)
+        await outbox.enqueue("quote", [LEAD])
+        await outbox.dispatch_once()
+        await outbox.dispatch_once()
+        doc = await collection.find_one({})
+        assert doc["status"] == "failed"
+        assert doc["attempts"] == 2
+        assert doc["failed_at"] is not None
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_reclaimed():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender)
+        await outbox.enqueue("quote", [LEAD])
+        expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await collection.update_one({}, {"$set": {"status": "sending", "lease_until": expired}})
+        assert await outbox.dispatch_once() == 1
+        assert len(sender.sent) == 1
+
+    asyncio.run(scenario())
+
+
+def test_background_worker_drains_queue():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender, poll_interval=0.05)
+        outbox.start()
+        await outbox.enqueue("quote", [LEAD])
+        for _ in range(50):
+            if sender.sent:
+                break
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+        assert len(sender.sent) == 1
+
+    asyncio.run(scenario())
+
+
+def test_stop_with_drain_sends_due_rows_first():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender, batch_size=2, poll_interval=60)
+        for i in range(5):
+            await outbox.enqueue("contact", [{**LEAD, "email": f"drain{i}@example.com"}])
+        outbox.start()
+        await outbox.stop(drain=True)
+        assert len(sender.sent) == 5
+        assert await collection.count_documents({"status": "pending"}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_rendered_at_dispatch():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, _ = make_outbox(sender)
+        await outbox.enqueue("quote", [LEAD])
+        await outbox.dispatch_once()
+        message = sender.sent[0]
+        assert message["subject"] == "New Quote Request from Jo"
+        assert "jo@example.com" in message["html"]
+        assert "Email: jo@example.com" in message["text"]
+
+    asyncio.run(scenario())
+
+
+def test_same_kind_rows_coalesce_into_digest():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender, digest_threshold=3)
+        for i in range(4):
+            await outbox.enqueue("quote", [{**LEAD, "name": f"Lead {i}"}])
+        await outbox.enqueue("contact", [{**LEAD, "subject": "Permit", "message": "?"}])
+
+        assert await outbox.dispatch_once() == 5
+        subjects = sorted(message["subject"] for message in sender.sent)
+        assert subjects == ["4 New Quote Requests", "Contact: Permit"]
+        assert await collection.count_documents({"status": "sent"}) == 5
+
+    asyncio.run(scenario())
+
+
+def test_prerendered_rows_are_sent_as_is():
+    async def scenario():
+        sender = FakeEmailSender()
+        outbox, collection = make_outbox(sender)
+        await outbox.enqueue("quote", [LEAD])
+        await collection.update_one({}, {"$unset": {"kind": "", "leads": ""}, "$set": {"subject": "Old", "html": "<p>old</p>"}})
+        await outbox.dispatch_once()
+        assert sender.sent[0]["subject"] == "Old"
+
+    asyncio.run(scenario())
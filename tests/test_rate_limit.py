@@ -0,0 +1,47 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from rate_limit import MemoryRateLimitStore, MongoRateLimitStore, RateLimit
+
+
+def test_bucket_allows_burst_then_refills():
+    limit = RateLimit(burst=3, per_hour=3600)
+    tat = None
+    for _ in range(3):
+        allowed, tat, _ = limit.evaluate(tat, 1000.0)
+        assert allowed
+    allowed, _, retry_after = limit.evaluate(tat, 1000.0)
+    assert not allowed
+    assert retry_after == 1.0
+    # One token refills per second
+    assert limit.evaluate(tat, 1001.0)[0]
+
+
+def test_memory_store_evicts_oldest_keys():
+    async def scenario():
+        store = MemoryRateLimitStore(max_keys=2)
+        limit = RateLimit(burst=1, per_hour=1)
+        assert (await store.hit("a", limit))[0]
+        assert not (await store.hit("a", limit))[0]
+        await store.hit("b", limit)
+        await store.hit("c", limit)
+        # "a" was evicted, so it starts with a full bucket again
+        assert (await store.hit("a", limit))[0]
+
+    asyncio.run(scenario())
+
+
+def test_mongo_store_shares_buckets():
+    async def scenario():
+        collection = AsyncMongoMockClient()["test"]["rate_limits"]
+        first, second = MongoRateLimitStore(collection), MongoRateLimitStore(collection)
+        limit = RateLimit(burst=2, per_hour=1)
+        assert (await first.hit("ip:1", limit))[0]
+        assert (await second.hit("ip:1", limit))[0]
+        allowed, retry_after = await first.hit("ip:1", limit)
+        assert not allowed
+        assert retry_after > 0
+        assert await collection.count_documents({}) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,141 @@
+import itertools
+
+import pytest
+from uvicorn import Config
+
+import serve
+
+drained = []
+
+
+def record_drain():
+    drained.append(True)
+
+
+def failing_drain():
+    raise RuntimeError("no database")
+
+
+class FakeProcess:
+    """Stands in for a worker process; `stubborn` ones ignore SIGTERM"""
+
+    pids = itertools.count(1000)
+
+    def __init__(self, stubborn=False):
+        self.pid = next(self.pids)
+        self.exitcode = None
+        self.alive = False
+        self.stubborn = stubborn
+        self.events = []
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def die(self, code=1):
+        self.alive, self.exitcode = False, code
+
+    def join(self, timeout=None):
+        self.events.append(("join", timeout))
+
+    def terminate(self):
+        self.events.append("terminate")
+        if not self.stubborn:
+            self.die(0)
+
+    def kill(self):
+        self.events.append("kill")
+        self.die(-9)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(serve.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    spawned = []
+
+    def get_subprocess(config, target, sockets):
+        spawned.append(FakeProcess())
+        return spawned[-1]
+
+    monkeypatch.setattr(serve, "get_subprocess", get_subprocess)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    supervisor = serve.Supervisor(Config("server:app"), target=None, sockets=[], workers=1, stop_timeout=5)
+    supervisor.spawned = spawned
+    return supervisor
+
+
+def test_workers_that_keep_failing_restart_with_growing_backoff(supervisor, clock):
+    supervisor.spawn(0)
+    for delay in (2, 4, 8):
+        supervisor.spawned[-1].die()
+        clock.now += 1
+        supervisor.check_workers()
+        assert supervisor.processes[0] is None
+        clock.now += delay - 0.5
+        supervisor.check_workers()
+        assert supervisor.processes[0] is None
+        clock.now += 0.5
+        supervisor.check_workers()
+        assert supervisor.processes[0] is supervisor.spawned[-1] and supervisor.spawned[-1].alive
+
+    # A worker that ran for a while before dying is restarted at once and resets the backoff
+    clock.now += 120
+    supervisor.spawned[-1].die()
+    supervisor.check_workers()
+    assert supervisor.failures[0] == 0
+    supervisor.check_workers()
+    assert len(supervisor.spawned) == 5 and supervisor.spawned[-1].alive
+
+
+def test_backoff_is_capped(supervisor, clock):
+    supervisor.failures[0] = 10
+    supervisor.spawn(0)
+    supervisor.spawned[-1].die()
+    supervisor.check_workers()
+    assert supervisor.restart_at[0] == clock.now + 60
+
+
+def test_shutdown_kills_workers_that_miss_the_deadline(supervisor, clock):
+    polite, stubborn = FakeProcess(), FakeProcess(stubborn=True)
+    finished = FakeProcess()
+    for slot, process in enumerate((polite, stubborn, finished)):
+        process.start()
+        supervisor.processes[slot] = process
+    finished.die(0)
+    supervisor.processes[3] = None
+
+    supervisor.shutdown()
+    assert polite.events[0] == "terminate" and "kill" not in polite.events
+    assert stubborn.events[0] == "terminate" and "kill" in stubborn.events
+    assert ("join", 5) in stubborn.events
+    assert finished.events == []
+    assert not stubborn.alive
+
+
+def test_drain_hook_runs_once_and_failures_do_not_block_exit():
+    drained.clear()
+    server = serve.WorkerServer(Config("server:app"), drain_hook="tests.test_serve:record_drain")
+    server.handle_exit(None, None)
+    server.handle_exit(None, None)
+    assert drained == [True]
+    assert server.should_exit
+
+    failing = serve.WorkerServer(Config("server:app"), drain_hook="tests.test_serve:failing_drain")
+    failing.handle_exit(None, None)
+    assert failing.should_exit
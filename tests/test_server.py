@@ -0,0 +1,505 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import timedelta
+
+import pytest
+
+
+QUOTE = {
+    "name": "Test User",
+    "email": "test@example.com",
+    "phone": "0412 345 678",
+    "service": "tree-removal",
+    "address": "1 Crown St, Wollongong NSW 2500",
+    "message": "Large gum leaning over the fence",
+}
+
+
+def test_root(api):
+    assert api.get("/api/").json() == {"message": "Illawarra Tree Removal API"}
+
+
+@pytest.mark.parametrize("path,count", [("services", 5), ("testimonials", 5), ("gallery", 4)])
+def test_catalog_revalidation(api, path, count):
+    response = api.get(f"/api/{path}")
+    assert response.status_code == 200
+    assert len(response.json()) == count
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+
+    cached = api.get(f"/api/{path}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    stale = api.get(f"/api/{path}", headers={"If-None-Match": '"not-it"'})
+    assert stale.status_code == 200
+
+
+def test_create_quote(api, admin_headers):
+    response = api.post("/api/quotes", json=QUOTE)
+    assert response.status_code == 200
+    assert response.json()["id"]
+    assert api.get("/api/quotes", headers=admin_headers).json()[0]["email"] == QUOTE["email"]
+
+
+CONTACT = {
+    "name": "Test User",
+    "email": "test@example.com",
+    "phone": "0412 345 678",
+    "subject": "Council permit",
+    "message": "Do you handle council permits?",
+}
+
+
+BOOKING = {
+    "name": "Test User",
+    "email": "test@example.com",
+    "phone": "0412 345 678",
+    "service": "tree-trimming",
+    "address": "5 Addison St, Shellharbour NSW 2529",
+    "preferred_date": "2030-03-04",
+    "preferred_time": "10:00 AM - 12:00 PM",
+    "notes": "",
+}
+
+
+def test_quotes_keyset_pagination(api, admin_headers):
+    created = [
+        api.post("/api/quotes", json={**QUOTE, "email": f"lead{i}@example.com"}).json()["id"] for i in range(5)
+    ]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = api.get("/api/quotes", params=params, headers=admin_headers)
+        assert response.status_code == 200
+        seen.extend(q["id"] for q in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(set(seen))
+
+
+def test_cursor_header_is_exposed_to_other_origins(api, admin_headers):
+    for i in range(2):
+        api.post("/api/quotes", json={**QUOTE, "email": f"cors{i}@example.com"})
+    response = api.get("/api/quotes", params={"limit": 1}, headers={**admin_headers, "Origin": "https://office.example.com"})
+    assert response.headers.get("x-next-cursor")
+    exposed = response.headers["access-control-expose-headers"].lower()
+    assert "x-next-cursor" in exposed and "idempotent-replayed" in exposed
+
+
+def test_lead_lists_require_admin(api, server_module, monkeypatch):
+    api.post("/api/quotes", json=QUOTE)
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    assert api.get("/api/quotes").status_code == 401
+    assert api.get("/api/bookings", params={"format": "ndjson"}).status_code == 401
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "")
+    assert api.get("/api/quotes").status_code == 403
+
+
+def test_quotes_invalid_cursor(api, admin_headers):
+    assert api.get("/api/quotes", params={"cursor": "not-a-cursor"}, headers=admin_headers).status_code == 400
+
+
+def test_bookings_filters(api, admin_headers):
+    api.post("/api/bookings", json=BOOKING)
+    api.post("/api/bookings", json={**BOOKING, "service": "stump-grinding"})
+
+    response = api.get("/api/bookings", params={"service": "stump-grinding", "status": "pending"}, headers=admin_headers)
+    assert [b["service"] for b in response.json()] == ["stump-grinding"]
+    assert api.get("/api/bookings", params={"date_to": "2000-01-01T00:00:00Z"}, headers=admin_headers).json() == []
+    assert len(api.get("/api/bookings", params={"date_from": "2000-01-01T00:00:00Z"}, headers=admin_headers).json()) == 2
+
+
+def test_bookings_ndjson_stream(api, admin_headers):
+    for slot in ["8:00 AM - 10:00 AM", "10:00 AM - 12:00 PM", "12:00 PM - 2:00 PM"]:
+        api.post("/api/bookings", json={**BOOKING, "preferred_time": slot})
+
+    response = api.get("/api/bookings", params={"format": "ndjson"}, headers=admin_headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.strip().split("\n")
+    assert len(lines) == 3
+
+
+def test_booking_slot_capacity(api, server_module, admin_headers):
+    for i in range(server_module.BOOKING_CREWS_PER_SLOT):
+        assert api.post("/api/bookings", json={**BOOKING, "email": f"crew{i}@example.com"}).status_code == 200
+
+    full = api.post("/api/bookings", json={**BOOKING, "email": "late@example.com"})
+    assert full.status_code == 409
+    assert len(api.get("/api/bookings", headers=admin_headers).json()) == server_module.BOOKING_CREWS_PER_SLOT
+
+    availability = api.get("/api/availability", params={"from": "2030-03-03", "to": "2030-03-04"}).json()
+    sunday, monday = availability["days"]
+    assert not sunday["available"]
+    slots = {s["time"]: s["remaining"] for s in monday["slots"]}
+    assert slots[BOOKING["preferred_time"]] == 0
+    assert slots["8:00 AM - 10:00 AM"] == server_module.BOOKING_CREWS_PER_SLOT
+
+
+@pytest.mark.parametrize("change", [
+    {"preferred_date": "2020-01-06"},
+    {"preferred_date": "2030-03-03"},
+    {"preferred_date": "next tuesday"},
+    {"preferred_time": "midnight"},
+])
+def test_booking_rejects_unbookable_slots(api, change):
+    assert api.post("/api/bookings", json={**BOOKING, **change}).status_code == 422
+
+
+def test_availability_range_validation(api):
+    assert api.get("/api/availability", params={"from": "2030-03-04", "to": "2030-03-01"}).status_code == 400
+    assert api.get("/api/availability", params={"from": "2030-01-01", "to": "2031-01-01"}).status_code == 400
+
+
+def test_metrics_endpoint(api, admin_headers):
+    api.get("/api/services")
+    api.get("/api/quotes", params={"limit": 5}, headers=admin_headers)
+
+    body = api.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/services"}' in body
+    assert 'http_requests_total{method="GET",route="/api/services",status="200"}' in body
+    assert 'lead_list_documents_count{collection="quotes",format="json"}' in body
+    assert "http_requests_in_flight" in body
+
+
+def test_bulk_requires_a_partner_token(api, server_module, monkeypatch):
+    rows = [{**QUOTE, "name": f"Flood {i}"} for i in range(3)]
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "")
+    monkeypatch.setattr(server_module, "PARTNER_API_TOKENS", [])
+    assert api.post("/api/quotes/bulk", json=rows).status_code == 403
+
+    monkeypatch.setattr(server_module, "PARTNER_API_TOKENS", ["feed-a", "feed-b"])
+    assert api.post("/api/quotes/bulk", json=rows).status_code == 401
+    assert api.post("/api/bookings/bulk", json=[BOOKING], headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert asyncio.run(server_module.db.quotes.count_documents({})) == 0
+
+    assert api.post("/api/quotes/bulk", json=rows, headers={"Authorization": "Bearer feed-b"}).json()["created"] == 3
+
+
+def test_quotes_bulk_json(api, server_module, admin_headers):
+    queued = []
+
+    async def fake_queue(kind, leads):
+        queued.append((kind, len(leads)))
+
+    server_module.queue_notification, original = fake_queue, server_module.queue_notification
+    try:
+        rows = [{**QUOTE, "name": f"Lead {i}"} for i in range(3)] + [{"name": "missing fields"}]
+        response = api.post("/api/quotes/bulk", json=rows, headers=admin_headers)
+    finally:
+        server_module.queue_notification = original
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["received"], body["created"], body["failed"]) == (4, 3, 1)
+    assert [r["status"] for r in body["results"]] == ["created", "created", "created", "invalid"]
+    assert len(api.get("/api/quotes", headers=admin_headers).json()) == 3
+    assert queued == [("quote", 3)]
+
+
+def test_bookings_bulk_ndjson(api, server_module, admin_headers):
+    rows = [BOOKING] * (server_module.BOOKING_CREWS_PER_SLOT + 1) + [{**BOOKING, "preferred_time": "midnight"}]
+    lines = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    response = api.post(
+        "/api/bookings/bulk",
+        content=lines.encode(),
+        headers={**admin_headers, "Content-Type": "application/x-ndjson"},
+    )
+
+    statuses = [r["status"] for r in response.json()["results"]]
+    assert statuses == ["created"] * server_module.BOOKING_CREWS_PER_SLOT + ["rejected", "rejected", "invalid"]
+
+
+def test_bulk_rejects_non_array(api, admin_headers):
+    assert api.post("/api/quotes/bulk", json={"not": "a list"}, headers=admin_headers).status_code == 400
+
+
+def test_idempotency_key_replays_original(api, admin_headers):
+    headers = {"Idempotency-Key": "form-submit-1"}
+    first = api.post("/api/quotes", json=QUOTE, headers=headers)
+    retry = api.post("/api/quotes", json={**QUOTE, "email": "other@example.com"}, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+    assert len(api.get("/api/quotes", headers=admin_headers).json()) == 1
+
+
+def test_duplicate_submission_is_suppressed(api):
+    first = api.post("/api/contact", json=CONTACT)
+    again = api.post("/api/contact", json={**CONTACT, "email": " TEST@example.com ", "phone": "+61 412 345 678"})
+
+    assert again.json()["id"] == first.json()["id"]
+    assert "dedup_key" not in again.json()
+
+    different = api.post("/api/contact", json={**CONTACT, "subject": "Another question"})
+    assert different.json()["id"] != first.json()["id"]
+
+
+def test_duplicate_booking_does_not_take_another_crew(api, server_module, admin_headers):
+    for _ in range(server_module.BOOKING_CREWS_PER_SLOT + 1):
+        assert api.post("/api/bookings", json=BOOKING).status_code == 200
+    assert len(api.get("/api/bookings", headers=admin_headers).json()) == 1
+    assert api.post("/api/bookings", json={**BOOKING, "email": "second@example.com"}).status_code == 200
+
+
+def test_form_rate_limit_by_email(api, server_module):
+    burst = server_module.RATE_LIMIT_EMAIL.burst
+    for i in range(burst):
+        assert api.post("/api/contact", json={**CONTACT, "subject": f"Question {i}"}).status_code == 200
+
+    limited = api.post("/api/quotes", json={**QUOTE, "email": " Test@Example.com"})
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+
+
+def test_form_rate_limit_rejects_before_validation(api, server_module):
+    for _ in range(server_module.RATE_LIMIT_IP.burst):
+        api.post("/api/quotes", json={"name": "incomplete"})
+    assert api.post("/api/quotes", json={"name": "incomplete"}).status_code == 429
+
+
+def test_form_body_size_limit(api, server_module):
+    oversized = {**CONTACT, "message": "x" * server_module.FORM_MAX_BODY_BYTES}
+    assert api.post("/api/contact", json=oversized).status_code == 413
+
+
+def test_search_requires_admin(api, server_module, monkeypatch):
+    api.post("/api/contact", json=CONTACT)
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    assert api.get("/api/leads/search", params={"q": "0412345678"}).status_code == 401
+    response = api.get("/api/leads/search", params={"q": "0412345678"}, headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
+
+
+def test_search_by_email_and_phone_across_lead_types(api, admin_headers):
+    api.post("/api/quotes", json=QUOTE)
+    api.post("/api/bookings", json=BOOKING)
+    api.post("/api/contact", json=CONTACT)
+    api.post("/api/quotes", json={**QUOTE, "email": "someone@example.com", "phone": "0299 999 999"})
+
+    by_email = api.get("/api/leads/search", params={"q": " TEST@example.com "}, headers=admin_headers).json()
+    assert sorted(r["type"] for r in by_email) == ["booking", "contact", "quote"]
+    assert all("phone_key" not in r for r in by_email)
+
+    by_phone = api.get("/api/leads/search", params={"q": "+61 412 345"}, headers=admin_headers).json()
+    assert len(by_phone) == 3
+    assert api.get("/api/leads/search", params={"q": "0299 999"}, headers=admin_headers).json()[0]["email"] == "someone@example.com"
+
+
+def test_search_paginates_with_cursor(api, admin_headers):
+    for i in range(5):
+        api.post("/api/contact", json={**CONTACT, "subject": f"Question {i}"})
+
+    first = api.get("/api/leads/search", params={"q": "0412345678", "limit": 3}, headers=admin_headers)
+    assert len(first.json()) == 3
+    rest = api.get("/api/leads/search", params={"q": "0412345678", "limit": 3, "cursor": first.headers["x-next-cursor"]}, headers=admin_headers)
+    assert len(rest.json()) == 2
+    assert "x-next-cursor" not in rest.headers
+    assert {r["id"] for r in first.json()}.isdisjoint(r["id"] for r in rest.json())
+    assert api.get("/api/leads/search", params={"q": "0412345678", "cursor": "abc"}, headers=admin_headers).status_code == 400
+
+
+def test_delivered_outbox_rows_expire(server_module):
+    indexes = {index.document["name"]: index.document for index in server_module.INDEXES["email_outbox"]}
+    assert indexes["sent_ttl"]["expireAfterSeconds"] == server_module.EMAIL_OUTBOX_SENT_TTL_SECONDS
+    assert indexes["sent_ttl"]["partialFilterExpression"] == {"status": "sent"}
+    assert indexes["failed_ttl"]["key"] == {"failed_at": 1}
+    assert indexes["failed_ttl"]["partialFilterExpression"] == {"status": "failed"}
+
+
+def test_search_filter_routes_free_text_to_text_index(server_module):
+    assert server_module.search_filter("Jane Smith Figtree") == ({"$text": {"$search": "Jane Smith Figtree"}}, True)
+    assert server_module.search_filter("Jane@Example.com") == (
+        {"$or": [{"email_key": "jane@example.com"}, {"email": {"$in": ["Jane@Example.com", "jane@example.com"]}}]},
+        False,
+    )
+    assert server_module.search_filter("(02) 4229") == ({"phone_key": {"$regex": "^024229"}}, False)
+    # Too few digits to be a phone number, so treated as text (e.g. a street number)
+    assert server_module.search_filter("12 Crown")[1]
+
+
+def test_stats_endpoints_read_rollups(api, server_module, admin_headers):
+    for route in ("/api/stats/leads", "/api/stats/conversion", "/api/stats/slots"):
+        assert api.get(route).status_code == 401
+    api.post("/api/quotes", json=QUOTE)
+    api.post("/api/quotes", json={**QUOTE, "email": "second@example.com"})
+    api.post("/api/bookings", json=BOOKING)
+    today = server_module.business_today().isoformat()
+    params = {"from": today, "to": today}
+
+    leads = api.get("/api/stats/leads", params={**params, "kind": "quote"}, headers=admin_headers).json()
+    assert leads == [{"day": today, "kind": "quote", "service": "tree-removal", "count": 2}]
+    conversion = api.get("/api/stats/conversion", params=params, headers=admin_headers).json()
+    assert conversion["total"] == {"quotes": 2, "bookings": 1, "conversion_rate": 0.5}
+    slots = api.get("/api/stats/slots", params=params, headers=admin_headers).json()
+    assert slots == [{"weekday": 0, "time": BOOKING["preferred_time"], "count": 1}]
+
+    assert api.get("/api/stats/leads", params={"from": today, "to": "2000-01-01"}, headers=admin_headers).status_code == 400
+
+
+def test_lead_stream_requires_admin_or_stream_token(api, server_module, admin_headers, monkeypatch):
+    # Unknown types fail after authentication, so 400 means the request was let in
+    params = {"types": "invoice"}
+    assert api.get("/api/leads/stream", params=params).status_code == 401
+    assert api.get("/api/leads/stream", params={**params, "token": "9999999999.forged"}).status_code == 401
+    assert api.get("/api/leads/stream", params=params, headers=admin_headers).status_code == 400
+
+    assert api.post("/api/leads/stream/token").status_code == 401
+    issued = api.post("/api/leads/stream/token", headers=admin_headers).json()
+    assert api.get("/api/leads/stream", params={**params, "token": issued["token"]}).status_code == 400
+
+    expired = server_module.sign_stream_token(int(time.time()) - 1)
+    assert api.get("/api/leads/stream", params={**params, "token": expired}).status_code == 401
+    # Rotating the admin token revokes issued stream tokens
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "rotated")
+    assert api.get("/api/leads/stream", params={**params, "token": issued["token"]}).status_code == 401
+
+
+def test_lead_stream_rejects_unknown_types(api, admin_headers):
+    response = api.get("/api/leads/stream", params={"types": "quote,invoice"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert "invoice" in response.json()["detail"]
+
+
+def test_health_and_readiness_probes(api, server_module, monkeypatch):
+    health = api.get("/healthz")
+    assert health.status_code == 200
+    assert "pool" in health.json()
+
+    ready = api.get("/readyz").json()
+    assert ready["status"] == "ok"
+    assert ready["mongo_rtt_ms"] >= 0
+
+    async def unreachable():
+        raise ConnectionError("no primary")
+
+    monkeypatch.setattr(server_module, "ping_mongo", unreachable)
+    failing = api.get("/readyz")
+    assert failing.status_code == 503
+    assert failing.json()["problems"] == ["ping failed: no primary"]
+
+
+def test_drain_fails_readiness_and_ends_lead_streams(api, server_module, monkeypatch):
+    monkeypatch.setattr(server_module, "draining", False)
+    subscription = server_module.lead_feed.subscribe()
+    try:
+        server_module.begin_drain()
+        assert subscription.queue.get_nowait() is None
+    finally:
+        server_module.lead_feed.unsubscribe(subscription)
+    response = api.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["problems"] == ["shutting down"]
+
+
+def test_catalog_admin_writes(api, server_module, monkeypatch):
+    item = {"title": "Hedge Trimming", "description": "Neat hedges", "icon": "Scissors", "image": "https://example.com/h.jpg"}
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "")
+    assert api.put("/api/admin/catalogs/services/hedges", json=item).status_code == 403
+
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    assert api.put("/api/admin/catalogs/services/hedges", json=item, headers={"Authorization": "Bearer nope"}).status_code == 401
+    admin = {"Authorization": "Bearer s3cret"}
+    before = api.get("/api/services")
+
+    created = api.put("/api/admin/catalogs/services/hedges", json=item, headers=admin)
+    assert created.json()["id"] == "hedges"
+    after = api.get("/api/services")
+    assert after.json()[-1]["title"] == "Hedge Trimming"
+    assert after.headers["etag"] != before.headers["etag"]
+
+    assert api.put("/api/admin/catalogs/services/bad", json={"title": "x"}, headers=admin).status_code == 422
+    assert api.put("/api/admin/catalogs/invoices/x", json=item, headers=admin).status_code == 422
+    assert api.delete("/api/admin/catalogs/services/hedges", headers=admin).status_code == 204
+    assert api.delete("/api/admin/catalogs/services/hedges", headers=admin).status_code == 404
+    assert len(api.get("/api/services").json()) == 5
+
+
+def test_export_streams_csv_and_ndjson(api, server_module, monkeypatch):
+    monkeypatch.setattr(server_module, "ADMIN_API_TOKEN", "s3cret")
+    monkeypatch.setattr(server_module, "EXPORT_CHUNK_BYTES", 100)
+    admin = {"Authorization": "Bearer s3cret"}
+    assert api.get("/api/export/contacts").status_code == 401
+
+    created = [
+        api.post("/api/contact", json={**CONTACT, "email": f"export{i}@example.com", "message": f"Line one\nline {i}, \"quoted\""}).json()
+        for i in range(3)
+    ]
+    # Leads created in the same millisecond are ordered by id
+    created.sort(key=lambda lead: (lead["created_at"], lead["id"]))
+
+    response = api.get("/api/export/contacts", headers=admin)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert 'filename="contacts-' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == [lead["id"] for lead in created]
+    assert rows[2]["message"] == created[2]["message"]
+    assert "\n" in rows[2]["message"] and '"quoted"' in rows[2]["message"]
+    assert rows[0]["created_at"].endswith("Z")
+
+    since = created[1]["created_at"]
+    lines = api.get("/api/export/contacts", params={"format": "ndjson", "since": since}, headers=admin).text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [lead["id"] for lead in created if lead["created_at"] >= since]
+
+    with api.stream("GET", "/api/export/contacts", headers={**admin, "Accept-Encoding": "gzip"}) as raw:
+        assert raw.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(b"".join(raw.iter_raw())).decode() == response.text
+
+    assert api.get("/api/export/invoices", headers=admin).status_code == 422
+
+
+def test_csv_value_only_quotes_formulas(server_module):
+    assert server_module.csv_value("+61 (2) 4229-0000") == "+61 (2) 4229-0000"
+    assert server_module.csv_value("-5") == "-5"
+    assert server_module.csv_value("-1+cmd|' /C calc'!A0") == "'-1+cmd|' /C calc'!A0"
+    assert server_module.csv_value("+SUM(1,2)") == "'+SUM(1,2)"
+    assert server_module.csv_value("\t=1") == "'\t=1"
+
+
+def test_export_neutralises_spreadsheet_formulas(api, admin_headers):
+    formula = '=HYPERLINK("http://x","a")'
+    api.post("/api/contact", json={**CONTACT, "name": formula, "subject": "@SUM(A1:A2)", "phone": "+61 412 345 678"})
+
+    row = next(csv.DictReader(io.StringIO(api.get("/api/export/contacts", headers=admin_headers).text)))
+    assert row["name"] == "'" + formula
+    assert row["subject"] == "'@SUM(A1:A2)"
+    assert row["phone"] == "+61 412 345 678"
+    assert row["email"] == CONTACT["email"]
+
+    ndjson = api.get("/api/export/contacts", params={"format": "ndjson"}, headers=admin_headers).text
+    assert json.loads(ndjson)["name"] == formula
+
+
+def test_bootstrap_combines_catalogs_and_availability(api, server_module):
+    response = api.get("/api/bootstrap")
+    assert response.status_code == 200
+    document = response.json()
+    assert [len(document[name]) for name in ("services", "testimonials", "gallery")] == [5, 5, 4]
+    assert len(document["availability"]["days"]) == server_module.BOOTSTRAP_AVAILABILITY_DAYS
+    assert response.headers["cache-control"] == f"public, max-age={int(server_module.AVAILABILITY_CACHE_TTL)}"
+    assert api.get("/api/bootstrap", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+    day = next(
+        day for day in (server_module.business_today() + timedelta(days=n) for n in range(1, 8))
+        if server_module.is_bookable_day(day)
+    )
+    assert api.post("/api/bookings", json={**BOOKING, "preferred_date": day.isoformat()}).status_code == 200
+    updated = api.get("/api/bootstrap", headers={"If-None-Match": response.headers["etag"]})
+    assert updated.status_code == 200
+    assert updated.json()["version"] != document["version"]
+    slots = next(d for d in updated.json()["availability"]["days"] if d["date"] == day.isoformat())["slots"]
+    assert min(slot["remaining"] for slot in slots) == server_module.BOOKING_CREWS_PER_SLOT - 1
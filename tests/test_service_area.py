@@ -0,0 +1,73 @@
+import timeit
+
+from suburbs import SUBURBS, SuburbIndex, normalize, service_area
+
+
+def names(suburbs):
+    return [suburb.name for suburb in suburbs]
+
+
+def test_normalize_expands_shorthand():
+    assert normalize("  Mt  Keira, NSW ") == "mount keira"
+    assert normalize("Nth Wollongong") == "north wollongong"
+    assert normalize(None) == ""
+
+
+def test_prefix_search_ranks_first_words_first():
+    matches = names(service_area.search("wollo"))
+    assert matches[0] == "Wollongong"
+    # Later words of a name autocomplete too, after names that start with the prefix
+    assert "North Wollongong" in matches
+    assert matches.index("Wollongong") < matches.index("North Wollongong")
+    assert service_area.search("zzz") == [] and service_area.search("") == []
+    assert len(service_area.search("s", limit=3)) == 3
+
+
+def test_postcode_hits_and_prefixes():
+    exact = service_area.exact("2533")
+    assert exact and {suburb.postcode for suburb in exact} == {"2533"}
+    assert names(exact) == names(service_area.by_postcode["2533"])
+    assert all(suburb.postcode.startswith("253") for suburb in service_area.search("253"))
+    assert service_area.exact("2000") == []
+
+
+def test_locate_matches_whole_names_only():
+    index = SuburbIndex(SUBURBS)
+    assert index.locate("4 Smith St, nth wollongong 2500").suburb == "North Wollongong"
+    assert index.locate("1 Dapto Rd, Horsley NSW 2530").zone == "dapto"
+    # "Wollongongs" is not a suburb, so only the postcode places the address
+    assert index.locate("Wollongongs Pty Ltd 2500").precision == "postcode"
+
+
+def test_lookups_stay_fast():
+    per_call = min(timeit.repeat(lambda: service_area.search("north wol"), number=1000, repeat=3)) / 1000
+    assert per_call < 0.0005
+
+
+def test_service_area_route(api):
+    body = api.get("/api/service-area", params={"q": "Kiama"}).json()
+    assert body["serviced"] is True
+    assert body["exact"] == [{"suburb": "Kiama", "postcode": "2533", "zone": "kiama"}]
+    assert body["matches"][0]["suburb"] == "Kiama"
+
+    address = api.get("/api/service-area", params={"q": "9 Terralong St, Kiama NSW 2533"}).json()
+    assert address["serviced"] is True and address["exact"][0]["suburb"] == "Kiama"
+
+    outside = api.get("/api/service-area", params={"q": "Parramatta"}).json()
+    assert outside["serviced"] is False and outside["matches"] == []
+    assert api.get("/api/service-area", params={"q": ""}).status_code == 422
+
+
+def test_leads_are_tagged_with_their_zone(api, admin_headers):
+    quote = {
+        "name": "Zone Test", "email": "zone@example.com", "phone": "0412 345 678",
+        "service": "tree-removal", "address": "4 Smith St, Nth Wollongong NSW 2500",
+    }
+    created = api.post("/api/quotes", json=quote).json()
+    assert (created["suburb"], created["postcode"], created["zone"]) == ("North Wollongong", "2500", "wollongong")
+
+    away = api.post("/api/quotes", json={**quote, "email": "away@example.com", "address": "1 George St, Sydney NSW 2000"}).json()
+    assert away["zone"] is None
+
+    listed = api.get("/api/quotes", params={"zone": "wollongong"}, headers=admin_headers).json()
+    assert [lead["id"] for lead in listed] == [created["id"]]
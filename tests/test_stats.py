@@ -0,0 +1,69 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from mongomock_motor import AsyncMongoMockClient
+
+from stats import LeadRollups
+
+SYDNEY = ZoneInfo("Australia/Sydney")
+
+
+def lead(created_at, service="tree-removal", **extra):
+    return {"id": f"{service}-{created_at.isoformat()}", "service": service, "created_at": created_at, **extra}
+
+
+def test_day_bounds_follow_daylight_saving():
+    rollups = LeadRollups(None, SYDNEY)
+    # Sydney daylight saving ends on 6 April 2025, so that day is 25 hours long
+    start, end = rollups.day_bounds(date(2025, 4, 6))
+    assert start == datetime(2025, 4, 5, 13, tzinfo=timezone.utc)
+    assert end - start == timedelta(hours=25)
+
+
+def test_record_counts_by_business_day_and_slot():
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True).db
+        rollups = LeadRollups(db, SYDNEY)
+        # 20:00 UTC is already the next morning in Sydney
+        evening = datetime(2030, 3, 3, 20, tzinfo=timezone.utc)
+        await rollups.record("quote", [lead(evening), lead(evening), lead(evening, "stump-grinding")])
+        await rollups.record("booking", [lead(evening, preferred_date="2030-03-11", preferred_time="8:00 AM - 10:00 AM")])
+
+        daily = await rollups.daily_counts(date(2030, 3, 4), date(2030, 3, 4))
+        assert daily == [
+            {"day": "2030-03-04", "kind": "booking", "service": "tree-removal", "count": 1},
+            {"day": "2030-03-04", "kind": "quote", "service": "stump-grinding", "count": 1},
+            {"day": "2030-03-04", "kind": "quote", "service": "tree-removal", "count": 2},
+        ]
+        conversion = await rollups.conversion(date(2030, 3, 1), date(2030, 3, 31))
+        assert conversion["total"] == {"quotes": 3, "bookings": 1, "conversion_rate": 0.3333}
+        assert conversion["services"][0] == {"service": "stump-grinding", "quotes": 1, "bookings": 0, "conversion_rate": 0.0}
+        slots = await rollups.busiest_slots(date(2030, 3, 1), date(2030, 3, 31))
+        assert slots == [{"weekday": 0, "time": "8:00 AM - 10:00 AM", "count": 1}]
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_day_replaces_drifted_counts():
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True).db
+        rollups = LeadRollups(db, SYDNEY)
+        morning = datetime(2030, 3, 4, 1, tzinfo=timezone.utc)
+        await db.quotes.insert_many([lead(morning), lead(morning + timedelta(hours=1))])
+        await db.bookings.insert_one(lead(morning, preferred_date="2030-03-12", preferred_time="10:00 AM - 12:00 PM"))
+        await db.contacts.insert_one({"id": "c1", "created_at": morning})
+        # A missed increment and a stale row from a lead that no longer exists
+        await rollups.record("quote", [lead(morning)])
+        await rollups.record("quote", [lead(morning, "land-clearing")])
+
+        assert await rollups.rebuild_day(date(2030, 3, 4)) == 3
+        daily = await rollups.daily_counts(date(2030, 3, 4), date(2030, 3, 4))
+        assert [(row["kind"], row["service"], row["count"]) for row in daily] == [
+            ("booking", "tree-removal", 1),
+            ("contact", "", 1),
+            ("quote", "tree-removal", 2),
+        ]
+        assert (await rollups.busiest_slots(date(2030, 3, 4), date(2030, 3, 4)))[0]["weekday"] == 1
+
+    asyncio.run(scenario())
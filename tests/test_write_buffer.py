@@ -0,0 +1,99 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from write_buffer import InsertBuffer
+
+
+class RecordingCollection:
+    """Counts insert_many round trips on a mongomock collection"""
+
+    def __init__(self, collection, fail=None):
+        self.collection = collection
+        self.name = collection.name
+        self.fail = fail
+        self.batches = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append(len(docs))
+        if self.fail:
+            raise self.fail
+        return await self.collection.insert_many(docs, ordered=ordered)
+
+
+async def leads_collection(**kwargs):
+    collection = AsyncMongoMockClient()["test"]["quotes"]
+    await collection.create_index("id", unique=True)
+    return RecordingCollection(collection, **kwargs)
+
+
+def test_concurrent_inserts_share_one_round_trip():
+    async def scenario():
+        collection = await leads_collection()
+        buffer = InsertBuffer(max_docs=100, max_delay=0.01)
+        await asyncio.gather(*(buffer.insert(collection, {"id": str(i)}) for i in range(25)))
+        assert collection.batches == [25]
+        assert await collection.collection.count_documents({}) == 25
+
+    asyncio.run(scenario())
+
+
+def test_full_batch_is_written_without_waiting():
+    async def scenario():
+        collection = await leads_collection()
+        buffer = InsertBuffer(max_docs=10, max_delay=60)
+        await asyncio.wait_for(asyncio.gather(*(buffer.insert(collection, {"id": str(i)}) for i in range(20))), 1)
+        assert collection.batches == [10, 10]
+
+    asyncio.run(scenario())
+
+
+def test_each_caller_gets_its_own_outcome():
+    async def scenario():
+        collection = await leads_collection()
+        await collection.collection.insert_one({"id": "taken"})
+        buffer = InsertBuffer(max_docs=100, max_delay=0.01)
+        results = await asyncio.gather(
+            *(buffer.insert(collection, {"id": lead_id}) for lead_id in ("a", "taken", "b")),
+            return_exceptions=True,
+        )
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], DuplicateKeyError)
+        assert await collection.collection.count_documents({}) == 3
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_fails_every_caller():
+    async def scenario():
+        collection = await leads_collection(fail=ConnectionError("primary stepped down"))
+        buffer = InsertBuffer(max_docs=100, max_delay=0.01)
+        results = await asyncio.gather(*(buffer.insert(collection, {"id": str(i)}) for i in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_close_writes_pending_inserts():
+    async def scenario():
+        collection = await leads_collection()
+        buffer = InsertBuffer(max_docs=100, max_delay=60)
+        pending = asyncio.ensure_future(buffer.insert(collection, {"id": "late"}))
+        await asyncio.sleep(0)
+        await buffer.close()
+        await pending
+        assert collection.batches == [1]
+
+    asyncio.run(scenario())
+
+
+def test_lead_routes_use_the_buffer(api, server_module, monkeypatch, admin_headers):
+    monkeypatch.setattr(server_module, "lead_insert_buffer", InsertBuffer(max_docs=100, max_delay=0.001))
+    quote = {
+        "name": "Buffered", "email": "buffered@example.com", "phone": "0412 345 678",
+        "service": "tree-removal", "address": "1 Crown St, Wollongong NSW 2500",
+    }
+    response = api.post("/api/quotes", json=quote)
+    assert response.status_code == 200
+    assert api.get("/api/quotes", headers=admin_headers).json()[0]["id"] == response.json()["id"]